@@ -0,0 +1,128 @@
+"""大量の未処理アラートを抱えた状態でのアラートスケジューラーの負荷を計測する
+
+    python benchmarks/alert_scheduler_bench.py [--alerts 100000] [--idle 5] [--baseline 7a4859f]
+
+通常優先度のアラート（送信時刻前）を登録し、登録・解決にかかる時間、待機中の
+スケジューラーのCPU時間、送信時刻に達した高優先度アラートが送信されるまでの遅延を計測する。
+--baselineを指定すると、そのリビジョンのsrc/alert_system.pyで全件を走査する
+1回分のチェックにかかるCPU時間も計測する。
+"""
+import argparse
+import asyncio
+import importlib.util
+import logging
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.alert_system import AlertSystem, PendingAlert  # noqa: E402
+from src.chatwork_api import ChatWorkMessage, ChatWorkAccount  # noqa: E402
+from src.task_analyzer import MessageAnalysis  # noqa: E402
+
+
+def load_baseline(revision: str):
+    """指定したリビジョンのalert_systemをsrcパッケージ内のモジュールとして読み込む"""
+    source = subprocess.check_output(["git", "show", f"{revision}:src/alert_system.py"], cwd=ROOT)
+    spec = importlib.util.spec_from_loader("src._baseline_alert_system", loader=None)
+    module = importlib.util.module_from_spec(spec)
+    module.__package__ = "src"
+    exec(compile(source, f"{revision}:src/alert_system.py", "exec"), module.__dict__)
+    return module
+
+
+def make_alerts(count: int, rooms: int = 200) -> list:
+    """送信時刻前の通常優先度アラートを生成（受信順に直近1分間へ分散）"""
+    analysis = MessageAnalysis(True, "normal", [], [], [])
+    start = datetime.now() - timedelta(minutes=1)
+    return [
+        (f"{index % rooms}_{index}", PendingAlert(
+            ChatWorkMessage(str(index), str(index % rooms), ChatWorkAccount(index % 500, "user"), "確認お願いします", 0, 0),
+            analysis, start + timedelta(microseconds=index * 60_000_000 // count)
+        ))
+        for index in range(count)
+    ]
+
+
+async def run_current(alerts: list, idle: float):
+    system = AlertSystem(None, None)
+
+    started = time.perf_counter()
+    for alert_id, alert in alerts:
+        system._add_alert(alert_id, alert)
+    insert = (time.perf_counter() - started) / len(alerts)
+
+    scheduler = asyncio.create_task(system.start_scheduler())
+    await asyncio.sleep(0.1)
+    cpu = time.process_time()
+    await asyncio.sleep(idle)
+    idle_cpu = time.process_time() - cpu
+
+    # 送信時刻に達した高優先度アラートを追加し、送信されるまでの時間を計測
+    sent_at = []
+    send_digest = system._send_digest
+
+    async def record_send(room_id, digest):
+        sent_at.append(time.perf_counter())
+        await send_digest(room_id, digest)
+
+    system._send_digest = record_send
+    urgent = PendingAlert(
+        ChatWorkMessage("urgent", "urgent-room", ChatWorkAccount(1, "user"), "至急確認お願いします", 0, 0),
+        MessageAnalysis(True, "high", [], [], []),
+        datetime.now() - timedelta(hours=1)
+    )
+    added = time.perf_counter()
+    system._add_alert("urgent-room_urgent", urgent)
+    while not sent_at and time.perf_counter() - added < 5:
+        await asyncio.sleep(0.0001)
+
+    half = alerts[:len(alerts) // 2]
+    started = time.perf_counter()
+    for alert_id, _ in half:
+        system._remove_alert(alert_id)
+    remove = (time.perf_counter() - started) / len(half)
+
+    await system.stop()
+    await scheduler
+
+    print(f"insert:          {insert * 1e6:8.2f} us/alert")
+    print(f"resolve:         {remove * 1e6:8.2f} us/alert")
+    print(f"idle scheduler:  {idle_cpu * 1e3:8.2f} ms CPU over {idle:g}s with {len(alerts)} pending")
+    if sent_at:
+        print(f"due alert sent:  {(sent_at[0] - added) * 1e3:8.2f} ms after it was added")
+    else:
+        print("due alert sent:  not sent within 5s")
+
+
+async def run_baseline(alerts: list, revision: str):
+    module = load_baseline(revision)
+    system = module.AlertSystem(None, None)
+    for alert_id, alert in alerts:
+        system.pending_alerts[alert_id] = alert
+
+    cpu = time.process_time()
+    await system._check_pending_alerts()
+    print(f"baseline check:  {(time.process_time() - cpu) * 1e3:8.2f} ms CPU per scan of {len(alerts)} ({revision})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--alerts", type=int, default=100_000)
+    parser.add_argument("--idle", type=float, default=5.0, help="待機中のCPU時間を計測する秒数")
+    parser.add_argument("--baseline", help="比較対象のgitリビジョン（例: 7a4859f）")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    alerts = make_alerts(args.alerts)
+    asyncio.run(run_current(alerts, args.idle))
+    if args.baseline:
+        asyncio.run(run_baseline(alerts, args.baseline))
+
+
+if __name__ == "__main__":
+    main()
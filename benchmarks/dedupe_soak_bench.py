@@ -0,0 +1,81 @@
+"""処理済みメッセージIDの重複排除セットを長期間動かしたときの件数とメモリを計測する
+
+    python benchmarks/dedupe_soak_bench.py [--days 30] [--per-hour 2000] [--ttl-hours 24]
+
+模擬時刻で1時間ごとにper_hour件のメッセージIDを処理済みとして追加し、
+periodic_cleanupと同じく毎時evictする。一定間隔で件数・バケット数・
+おおよそのメモリ使用量・プロセスのRSSを表示する。
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.dedupe import TimeBucketedDedupe  # noqa: E402
+
+START = 1_700_000_000  # 模擬時刻の起点（UNIX時刻）
+
+
+def current_rss_mib() -> float:
+    """現在のRSS（/procがない環境ではピーク値）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def message_id(index: int) -> str:
+    """processed_messagesと同じ「ルームID_メッセージID」形式のキー"""
+    return f"{100000 + index % 50}_{1700000000000000000 + index:019d}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--per-hour", type=int, default=2000)
+    parser.add_argument("--ttl-hours", type=int, default=24)
+    parser.add_argument("--report-hours", type=int, default=120, help="途中経過を表示する間隔（時間）")
+    args = parser.parse_args()
+
+    dedupe = TimeBucketedDedupe(args.ttl_hours * 3600)
+    hours = args.days * 24
+    add_time = evict_time = 0.0
+    evicted = 0
+    index = 0
+
+    print(f"{'hour':>6} {'entries':>9} {'buckets':>8} {'memory MiB':>11} {'RSS MiB':>8}")
+    for hour in range(hours):
+        started = time.perf_counter()
+        for offset in range(args.per_hour):
+            key = message_id(index)
+            # ポーリングと同じく処理前に処理済みかを確認する
+            if key not in dedupe:
+                dedupe.add(key, START + hour * 3600 + offset * 3600 / args.per_hour)
+            index += 1
+        add_time += time.perf_counter() - started
+
+        started = time.perf_counter()
+        evicted += len(dedupe.evict(START + hour * 3600 + 3599))
+        evict_time += time.perf_counter() - started
+
+        if hour % args.report_hours == 0 or hour == hours - 1:
+            status = dedupe.get_status()
+            print(f"{hour:>6} {status['entries']:>9} {status['buckets']:>8} "
+                  f"{status['memory_bytes'] / 2 ** 20:>11.1f} {current_rss_mib():>8.1f}")
+
+    # 保持期間内のIDは残り、期限切れのIDは破棄されている
+    assert message_id(index - 1) in dedupe
+    assert message_id(0) not in dedupe
+
+    print(f"{index} ids added over {args.days} days, {evicted} evicted "
+          f"(an unbounded set would hold {index})")
+    print(f"check+add {add_time / index * 1e6:.2f} us/id, evict {evict_time / hours * 1e3:.2f} ms/hour")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""TaskAnalyzerの1メッセージあたりの分析時間を計測する
+
+    python benchmarks/task_analyzer_bench.py [--messages 3000] [--baseline e86c0d2]
+
+業務チャットを模した日本語メッセージを生成して分析する。--baselineを指定すると、
+そのリビジョンのsrc/task_analyzer.pyをgitから読み込んで同じメッセージを分析し、
+分析結果が一致することを確認したうえで速度を比較する。
+"""
+import argparse
+import asyncio
+import importlib.util
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.chatwork_api import ChatWorkMessage, ChatWorkAccount  # noqa: E402
+from src.task_analyzer import TaskAnalyzer, analysis_to_dict  # noqa: E402
+
+NOW = datetime(2026, 3, 10, 9, 30)
+
+GREETINGS = ["お疲れ様です。", "おはようございます。", "お世話になっております。", "", "", "皆さん、"]
+REQUESTS = [
+    "{date}までに資料の作成をお願いします",
+    "{date}中にレビューをお願いします。{estimate}くらいで終わると思います",
+    "本番環境の障害対応をしてください！至急です！",
+    "新機能の設計を検討してください",
+    "テストの結果を確認してもらえますか？",
+    "見積もりの調査をお願いしたいです",
+    "API仕様の修正を依頼します",
+    "議事録の共有です",
+    "先日の件、対応完了しました",
+    "デプロイ手順を教えてもらえますか",
+    "なるべく早く実装をお願いします",
+    "お手すきで確認をお願いします",
+]
+REMARKS = [
+    "ありがとうございます！", "助かりました", "問題が発生しています", "スケジュールが遅れています",
+    "よろしくお願いします。", "いつでも大丈夫です", "どうしましょうか？", "了解です", "",
+]
+BULLETS = ["ログの確認", "設定ファイルのバックアップ", "関係者への連絡", "手順書の更新作業", "負荷テストの実施"]
+DATES = ["今日", "明日", "今週", "来週", "3月15日", "4/2", "2026年3月20日", "20日"]
+ESTIMATES = ["2時間", "30分", "3日", "1週間"]
+
+
+def generate_corpus(count: int, seed: int = 1) -> list:
+    """業務チャットを模したメッセージ本文を生成"""
+    rng = random.Random(seed)
+    bodies = []
+    for _ in range(count):
+        lines = []
+        if rng.random() < 0.4:
+            lines.append(" ".join(f"[To:{rng.randint(1000, 1020)}]" for _ in range(rng.randint(1, 3))) + " さん")
+        lines.append(rng.choice(GREETINGS))
+        for _ in range(rng.randint(1, 3)):
+            lines.append(rng.choice(REQUESTS).format(date=rng.choice(DATES), estimate=rng.choice(ESTIMATES)))
+        if rng.random() < 0.3:
+            lines.extend(f"{rng.choice('・-*●')} {rng.choice(BULLETS)}をお願いします" for _ in range(rng.randint(2, 4)))
+        lines.append(rng.choice(REMARKS))
+        bodies.append("\n".join(lines))
+    return bodies
+
+
+def load_baseline(revision: str):
+    """指定したリビジョンのTaskAnalyzerをsrcパッケージ内のモジュールとして読み込む"""
+    source = subprocess.check_output(["git", "show", f"{revision}:src/task_analyzer.py"], cwd=ROOT)
+    spec = importlib.util.spec_from_loader("src._baseline_task_analyzer", loader=None)
+    module = importlib.util.module_from_spec(spec)
+    module.__package__ = "src"
+    exec(compile(source, f"{revision}:src/task_analyzer.py", "exec"), module.__dict__)
+
+    # 期限の基準時刻を固定する（旧実装は解析のたびにdatetime.now()を参照する）
+    class FixedDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return NOW
+
+    module.datetime = FixedDatetime
+    return module.TaskAnalyzer(None)
+
+
+def to_message(index: int, body: str) -> ChatWorkMessage:
+    return ChatWorkMessage(str(index), "1", ChatWorkAccount(1, "bench"), body, 0, 0)
+
+
+def measure(functions: list, repeat: int) -> list:
+    """(関数, 入力)ごとの1件あたりの平均CPU秒数（repeat回の最小値）
+
+    共有環境での負荷の変動が片方だけに偏らないよう、各関数を交互に実行する。
+    """
+    best = [float("inf")] * len(functions)
+    for _ in range(repeat):
+        for index, (function, items) in enumerate(functions):
+            start = time.process_time()
+            function(items)
+            best[index] = min(best[index], (time.process_time() - start) / len(items))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", help="比較対象のgitリビジョン（例: e86c0d2）")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    bodies = generate_corpus(args.messages)
+    analyzer = TaskAnalyzer(None)
+
+    def run_current(items):
+        return [analyzer._analyze_body(body, NOW) for body in items]
+
+    if not args.baseline:
+        current, = measure([(run_current, bodies)], args.repeat)
+        print(f"current:  {current * 1e6:8.1f} us/message ({len(bodies)} messages)")
+        return
+
+    baseline_analyzer = load_baseline(args.baseline)
+    messages = [to_message(index, body) for index, body in enumerate(bodies)]
+
+    def run_baseline(items):
+        async def analyze_all():
+            return [await baseline_analyzer.analyze(message) for message in items]
+        return asyncio.run(analyze_all())
+
+    expected = [analysis_to_dict(analysis) for analysis in run_baseline(messages)]
+    actual = [analysis_to_dict(analysis) for analysis in run_current(bodies)]
+    mismatches = [index for index, (a, b) in enumerate(zip(expected, actual)) if a != b]
+
+    current, baseline = measure([(run_current, bodies), (run_baseline, messages)], args.repeat)
+    print(f"current:  {current * 1e6:8.1f} us/message ({len(bodies)} messages)")
+    print(f"identical results: {len(bodies) - len(mismatches)}/{len(bodies)}")
+    if mismatches:
+        index = mismatches[0]
+        print(f"first mismatch #{index}:\n{bodies[index]}\nbaseline: {expected[index]}\ncurrent:  {actual[index]}")
+    print(f"baseline: {baseline * 1e6:8.1f} us/message ({args.baseline})")
+    print(f"speedup:  {baseline / current:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
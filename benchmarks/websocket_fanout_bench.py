@@ -0,0 +1,118 @@
+"""ダッシュボード向けWebSocket配信の負荷を計測する
+
+    python benchmarks/websocket_fanout_bench.py [--clients 500] [--slow 10] [--events 300]
+
+送信に時間のかかるクライアントを含む多数の模擬クライアントを接続し、イベントログに
+イベントを発行したときの発行側の所要時間、イベントあたりのJSON変換回数、
+遅くないクライアントが全イベントを受け取れたか、遅いクライアントの扱いを
+slow_client_policyごとに計測する。
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # api_serverは起動ディレクトリからstaticを配信する
+
+import web.api_server as api_server  # noqa: E402
+from src.event_log import DashboardEventLog, NEW_MESSAGE  # noqa: E402
+
+
+class SimulatedWebSocket:
+    """1フレームの送信にdelay秒かかるクライアント"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.received = 0
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame: str):
+        await asyncio.sleep(self.delay)
+        self.received += 1
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+
+
+class CountingJSON:
+    """api_serverのjson.dumpsの呼び出し回数を数える"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def dumps(self, *args, **kwargs):
+        self.calls += 1
+        return json.dumps(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(json, name)
+
+
+async def run(policy: str, clients: int, slow: int, events: int, slow_delay: float, queue_size: int):
+    counter = CountingJSON()
+    api_server.json = counter
+    try:
+        log = DashboardEventLog()
+        manager = api_server.WebSocketManager()
+        manager.attach(log, queue_size=queue_size, slow_client_policy=policy)
+        sockets = [SimulatedWebSocket(slow_delay if index < slow else 0) for index in range(clients)]
+        for websocket in sockets:
+            await manager.connect(websocket)
+            manager.go_live(websocket, 0)
+
+        latencies = []
+        for index in range(events):
+            started = time.perf_counter()
+            log.publish(NEW_MESSAGE, {"room_id": "1", "message_id": str(index), "body": "x" * 200})
+            latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0)  # 発行側の処理の合間に送信タスクを動かす
+
+        # 遅くないクライアントの送信キューが空になり、送信中のフレームも届くまで待つ
+        started = time.perf_counter()
+        fast_clients = [manager.clients[websocket] for websocket in sockets[slow:]]
+        while any(client.queue.qsize() for client in fast_clients):
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.01)
+        drain = time.perf_counter() - started
+
+        fast = [websocket.received for websocket in sockets[slow:]]
+        status = manager.get_status()
+        print(f"[{policy}] {clients} clients ({slow} taking {slow_delay * 1000:g} ms per send), {events} events")
+        print(f"  publish:            p50 {statistics.median(latencies) * 1e3:.3f} ms / max {max(latencies) * 1e3:.3f} ms")
+        print(f"  json.dumps/event:   {counter.calls / events:.2f}")
+        print(f"  fast clients:       received {min(fast)}..{max(fast)} of {events} events")
+        print(f"  slow clients:       {sum(websocket.closed for websocket in sockets[:slow])} disconnected, "
+              f"{status['dropped_frames']} frames dropped")
+        print(f"  fast clients drain: {drain * 1e3:.0f} ms after the last event")
+
+        for websocket in list(manager.clients):
+            manager.disconnect(websocket)
+    finally:
+        api_server.json = json
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--slow", type=int, default=10, help="送信に時間のかかるクライアント数")
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="遅いクライアントの1フレームの送信秒数")
+    parser.add_argument("--events", type=int, default=300)
+    parser.add_argument("--queue-size", type=int, default=256)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    for policy in ("disconnect", "drop"):
+        asyncio.run(run(policy, args.clients, args.slow, args.events, args.slow_delay, args.queue_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""ローカル検証用に署名付きのChatWork Webhookイベントを送信する
+
+    python scripts/send_webhook_event.py <token> <room_id> <本文> [--url http://127.0.0.1:8000/webhook/chatwork]
+
+ChatWorkと同じ形式のmessage_createdイベントを組み立て、Webhookトークンで
+署名して/webhook/chatworkに送信し、応答のステータスを表示する。
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.webhook import compute_signature  # noqa: E402
+
+
+async def send_fake_event(url: str, webhook_token: str, room_id: str, body: str,
+                          account_id: int = 0, message_id: str = "1") -> int:
+    """署名付きのmessage_createdイベントを送信"""
+    now = int(time.time())
+    payload = {
+        "webhook_setting_id": "local",
+        "webhook_event_type": "message_created",
+        "webhook_event_time": now,
+        "webhook_event": {
+            "message_id": message_id,
+            "room_id": int(room_id),
+            "account_id": account_id,
+            "body": body,
+            "send_time": now,
+            "update_time": 0
+        }
+    }
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = {
+        "Content-Type": "application/json",
+        "X-ChatWorkWebhookSignature": compute_signature(webhook_token, data)
+    }
+
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, data=data, headers=headers) as response:
+            return response.status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("token", help="CHATWORK_WEBHOOK_TOKENと同じWebhookトークン")
+    parser.add_argument("room_id")
+    parser.add_argument("body")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/webhook/chatwork")
+    parser.add_argument("--account-id", type=int, default=0)
+    parser.add_argument("--message-id", default="1")
+    args = parser.parse_args()
+
+    status = asyncio.run(send_fake_event(
+        args.url, args.token, args.room_id, args.body, args.account_id, args.message_id
+    ))
+    print(f"Webhook response: {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,19 @@
 import asyncio
+import bisect
+import hashlib
+import heapq
+import itertools
 import logging
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 import json
 
-from .chatwork_api import ChatWorkAPI, ChatWorkMessage
-from .task_analyzer import MessageAnalysis
+from .chatwork_api import ChatWorkAPI, ChatWorkMessage, message_to_dict, message_from_dict
+from .task_analyzer import MessageAnalysis, analysis_to_dict, analysis_from_dict
+from .storage import StateStore
+from .outbound_queue import OutboundMessageQueue, PRIORITY_RANKS
+from .event_log import DashboardEventLog, ALERT_SCHEDULED, ALERT_RESOLVED, ALERT_ESCALATED
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +29,45 @@ class PendingAlert:
     escalation_level: int = 0
 
 
+def alert_to_record(alert: PendingAlert) -> Dict:
+    """PendingAlertを保存用の辞書に変換"""
+    return {
+        "message": message_to_dict(alert.message),
+        "analysis": analysis_to_dict(alert.analysis),
+        "added_at": alert.added_at.isoformat(),
+        "alerts_sent": alert.alerts_sent,
+        "last_alert_at": alert.last_alert_at.isoformat() if alert.last_alert_at else None,
+        "escalation_level": alert.escalation_level
+    }
+
+
+def alert_to_view(alert_id: str, alert: PendingAlert) -> Dict:
+    """PendingAlertをAPIレスポンス・イベント用の辞書に変換"""
+    return {
+        "alert_id": alert_id,
+        "room_id": alert.message.room_id,
+        "message_id": alert.message.message_id,
+        "sender": alert.message.account.name,
+        "body": alert.message.body[:200],
+        "priority": alert.analysis.priority,
+        "added_at": alert.added_at.isoformat(),
+        "alerts_sent": alert.alerts_sent,
+        "escalation_level": alert.escalation_level
+    }
+
+
+def alert_from_record(record: Dict) -> PendingAlert:
+    """保存用の辞書からPendingAlertを復元"""
+    return PendingAlert(
+        message=message_from_dict(record["message"]),
+        analysis=analysis_from_dict(record["analysis"]),
+        added_at=datetime.fromisoformat(record["added_at"]),
+        alerts_sent=record["alerts_sent"],
+        last_alert_at=datetime.fromisoformat(record["last_alert_at"]) if record["last_alert_at"] else None,
+        escalation_level=record["escalation_level"]
+    )
+
+
 @dataclass
 class AlertConfig:
     """アラート設定"""
@@ -30,16 +76,34 @@ class AlertConfig:
     low_priority_threshold_hours: int = 24
     escalation_intervals: List[int] = field(default_factory=lambda: [60, 180, 360])  # 分
     max_escalation_level: int = 3
+    digest_window_seconds: int = 60  # この秒数以内に送信時刻を迎える同じルームのアラートはまとめて送信
 
 
 class AlertSystem:
     """アラートシステム"""
     
-    def __init__(self, chatwork_api: ChatWorkAPI, config):
+    def __init__(self, chatwork_api: ChatWorkAPI, config, store: Optional[StateStore] = None,
+                 outbound: Optional[OutboundMessageQueue] = None, events: Optional[DashboardEventLog] = None):
         self.chatwork_api = chatwork_api
         self.config = config
+        self.store = store or StateStore()
+        self.outbound = outbound or OutboundMessageQueue(chatwork_api, store=self.store)
+        self.events = events
         self.alert_config = AlertConfig()
         self.pending_alerts: Dict[str, PendingAlert] = {}
+        # (ルームID, 送信者アカウントID) -> アラートID。[To:]による返信の照合用
+        self._alerts_by_sender: Dict[Tuple[str, int], Set[str]] = {}
+        self.auto_resolved_count = 0
+        self.own_account_id: Optional[int] = None  # APIトークンのアカウント（お知らせの送信者）
+        # サマリー用の集計（追加・削除時に更新）と、優先度別に追加日時順で並べた索引
+        self._priority_counts: Dict[str, int] = {"high": 0, "normal": 0, "low": 0}
+        self._room_counts: Dict[str, int] = {}
+        self._alerts_by_added: Dict[str, List[Tuple[datetime, str]]] = {"high": [], "normal": [], "low": []}
+        # 次回送信時刻をキーにしたヒープ（古いエントリはバージョンで無効化）
+        self._due_heap: List[Tuple[datetime, int, str]] = []
+        self._due_versions: Dict[str, int] = {}
+        self._versions = itertools.count(1)
+        self._wakeup = asyncio.Event()  # 送信時刻の早いアラートが追加された場合にスケジューラーを起こす
         self.is_running = False
         self.scheduler_task = None
         
@@ -50,6 +114,8 @@ class AlertSystem:
             self.alert_config.normal_priority_threshold_hours = config.normal_priority_threshold_hours
         if hasattr(config, 'low_priority_threshold_hours'):
             self.alert_config.low_priority_threshold_hours = config.low_priority_threshold_hours
+        if hasattr(config, 'alert_digest_window_seconds'):
+            self.alert_config.digest_window_seconds = config.alert_digest_window_seconds
     
     async def schedule_alert(self, message: ChatWorkMessage, analysis: MessageAnalysis):
         """アラートをスケジュール"""
@@ -62,7 +128,9 @@ class AlertSystem:
                 added_at=datetime.now()
             )
             
-            self.pending_alerts[alert_id] = pending_alert
+            self._add_alert(alert_id, pending_alert)
+            self.store.put("pending_alerts", alert_id, alert_to_record(pending_alert))
+            self._publish(ALERT_SCHEDULED, alert_id, pending_alert)
             
             logger.info(f"Scheduled alert for message {alert_id} with priority {analysis.priority}")
             
@@ -74,18 +142,136 @@ class AlertSystem:
         alert_id = f"{room_id}_{message_id}"
         
         if alert_id in self.pending_alerts:
-            del self.pending_alerts[alert_id]
+            self._remove_alert(alert_id, reason="replied")
             logger.info(f"Marked alert {alert_id} as replied")
     
+    def resolve_replies(self, message: ChatWorkMessage) -> List[str]:
+        """受信したメッセージが返信にあたる未処理アラートを解決（解決したアラートIDを返す）
+        
+        [rp aid=送信者 to=ルームID-メッセージID] は返信先のアラートを直接解決する。
+        [To:送信者] は、アラートのメッセージの宛先になっていたアカウントが送った場合にだけ、
+        同じルームでその送信者から届いている未処理アラートを解決する。
+        [qt]・[info]内のタグ、送信者本人のメッセージ、APIトークンのアカウント自身の
+        メッセージ（お知らせの投稿など）は返信とみなさない。
+        """
+        sender_id = message.account.account_id
+        if self.own_account_id is not None and sender_id == self.own_account_id:
+            return []
+        
+        markup = message.markup
+        resolved = []
+        
+        for reply in markup.replies:
+            alert_id = f"{reply.room_id}_{reply.message_id}"
+            alert = self.pending_alerts.get(alert_id)
+            if (alert and alert.message.account.account_id == reply.account_id
+                    and reply.account_id != sender_id):
+                resolved.append(alert_id)
+        
+        for account_id in set(markup.reply_mentions):
+            if account_id == sender_id:
+                continue
+            for alert_id in self._alerts_by_sender.get((message.room_id, account_id), ()):
+                alert = self.pending_alerts[alert_id]
+                if sender_id in alert.analysis.mentions and alert.message.send_time <= message.send_time:
+                    resolved.append(alert_id)
+        
+        for alert_id in dict.fromkeys(resolved):
+            self._remove_alert(alert_id, reason="auto_resolved")
+            self.auto_resolved_count += 1
+            logger.info(f"Resolved alert {alert_id} by reply {message.room_id}_{message.message_id}")
+        
+        return resolved
+    
+    def _add_alert(self, alert_id: str, alert: PendingAlert):
+        """アラートを追加して索引に登録"""
+        if alert_id in self.pending_alerts:
+            self._remove_alert(alert_id, persist=False)
+        
+        self.pending_alerts[alert_id] = alert
+        key = (alert.message.room_id, alert.message.account.account_id)
+        self._alerts_by_sender.setdefault(key, set()).add(alert_id)
+        
+        priority = alert.analysis.priority
+        self._priority_counts[priority] = self._priority_counts.get(priority, 0) + 1
+        self._room_counts[alert.message.room_id] = self._room_counts.get(alert.message.room_id, 0) + 1
+        bisect.insort(self._alerts_by_added.setdefault(priority, []), (alert.added_at, alert_id))
+        
+        self._schedule(alert_id, alert)
+    
+    def _remove_alert(self, alert_id: str, persist: bool = True, reason: Optional[str] = None):
+        """アラートを削除して索引から外す（reasonを指定すると解決イベントを通知）"""
+        alert = self.pending_alerts.pop(alert_id)
+        self._due_versions.pop(alert_id, None)  # ヒープ上のエントリは取り出し時に破棄
+        key = (alert.message.room_id, alert.message.account.account_id)
+        alert_ids = self._alerts_by_sender.get(key)
+        if alert_ids is not None:
+            alert_ids.discard(alert_id)
+            if not alert_ids:
+                del self._alerts_by_sender[key]
+        
+        self._priority_counts[alert.analysis.priority] -= 1
+        room_id = alert.message.room_id
+        self._room_counts[room_id] -= 1
+        if not self._room_counts[room_id]:
+            del self._room_counts[room_id]
+        ordered = self._alerts_by_added[alert.analysis.priority]
+        index = bisect.bisect_left(ordered, (alert.added_at, alert_id))
+        if index < len(ordered) and ordered[index][1] == alert_id:
+            del ordered[index]
+        
+        if persist:
+            self.store.delete("pending_alerts", alert_id)
+        if reason:
+            self._publish(ALERT_RESOLVED, alert_id, alert, reason=reason)
+    
+    def _publish(self, event_type: str, alert_id: str, alert: PendingAlert, **extra):
+        """アラートの変化と最新のサマリーをダッシュボードに通知"""
+        if self.events is None:
+            return
+        self.events.publish(event_type, {
+            "alert": alert_to_view(alert_id, alert),
+            "summary": self.build_summary(),
+            **extra
+        })
+    
+    async def restore_state(self):
+        """永続化された未処理アラートを読み込み"""
+        await self.load_own_account()
+        records = await self.store.load("pending_alerts")
+        
+        for alert_id, record in records.items():
+            try:
+                self._add_alert(alert_id, alert_from_record(record))
+            except Exception as e:
+                logger.error(f"Error restoring alert {alert_id}: {e}")
+                self.store.delete("pending_alerts", alert_id)
+        
+        logger.info(f"Restored {len(self.pending_alerts)} pending alerts")
+    
+    async def load_own_account(self):
+        """APIトークンのアカウントIDを取得（自分の投稿を返信とみなさないため）"""
+        try:
+            me = await self.chatwork_api.get_me()
+            self.own_account_id = int(me["account_id"])
+        except Exception as e:
+            logger.warning(f"Could not resolve own account id, own messages may resolve alerts: {e}")
+    
     async def start_scheduler(self):
-        """アラートスケジューラーを開始"""
+        """アラートスケジューラーを開始（次のアラートの送信時刻まで待機）"""
         self.is_running = True
         logger.info("Starting alert scheduler...")
         
         while self.is_running:
             try:
                 await self._check_pending_alerts()
-                await asyncio.sleep(60)  # 1分ごとにチェック
+                
+                delay = self._seconds_until_next_due()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
                 
             except Exception as e:
                 logger.error(f"Error in alert scheduler: {e}")
@@ -94,42 +280,96 @@ class AlertSystem:
     async def stop(self):
         """アラートシステムを停止"""
         self.is_running = False
+        self._wakeup.set()
         if self.scheduler_task:
             self.scheduler_task.cancel()
         logger.info("Alert system stopped")
     
     async def _check_pending_alerts(self):
-        """未処理アラートをチェック"""
+        """送信時刻に達したアラートをルームごとにまとめて送信"""
         current_time = datetime.now()
-        alerts_to_send = []
+        horizon = current_time + timedelta(seconds=self.alert_config.digest_window_seconds)
+        candidates = []
+        due_rooms = set()
         
-        for alert_id, alert in self.pending_alerts.items():
-            if self._should_send_alert(alert, current_time):
-                alerts_to_send.append((alert_id, alert))
+        # 送信時刻に達したアラートと、まとめる期間内に送信時刻を迎えるアラートを取り出す
+        while self._due_heap and self._due_heap[0][0] <= horizon:
+            entry = heapq.heappop(self._due_heap)
+            due_at, version, alert_id = entry
+            if self._due_versions.get(alert_id) != version:
+                continue  # 解決済み・再スケジュール済みのエントリ
+            candidates.append(entry)
+            if due_at <= current_time:
+                due_rooms.add(self.pending_alerts[alert_id].message.room_id)
         
-        # アラートを送信
-        for alert_id, alert in alerts_to_send:
-            await self._send_alert(alert_id, alert)
+        digests: Dict[str, List[Tuple[str, PendingAlert]]] = {}
+        for entry in candidates:
+            alert_id = entry[2]
+            alert = self.pending_alerts[alert_id]
+            if alert.message.room_id in due_rooms:
+                del self._due_versions[alert_id]
+                digests.setdefault(alert.message.room_id, []).append((alert_id, alert))
+            else:
+                # 送信時刻に達したアラートがないルームは予定どおりの時刻まで待つ
+                heapq.heappush(self._due_heap, entry)
+        
+        # アラートを送信（送信に失敗した場合は1分後に再試行）
+        retry_at = current_time + timedelta(seconds=60)
+        for room_id, alerts in digests.items():
+            await self._send_digest(room_id, alerts)
+            for alert_id, alert in alerts:
+                if alert_id in self.pending_alerts:
+                    self._schedule(alert_id, alert, not_before=retry_at)
     
-    def _should_send_alert(self, alert: PendingAlert, current_time: datetime) -> bool:
-        """アラートを送信すべきか判定"""
-        time_since_added = current_time - alert.added_at
+    def _schedule(self, alert_id: str, alert: PendingAlert, not_before: Optional[datetime] = None):
+        """次回の送信時刻でヒープに登録（送信予定がない場合は登録しない）"""
+        due_at = self._next_due_at(alert)
+        if due_at is None:
+            self._due_versions.pop(alert_id, None)
+            return
+        if not_before and due_at < not_before:
+            due_at = not_before
+        
+        version = next(self._versions)
+        self._due_versions[alert_id] = version
+        heapq.heappush(self._due_heap, (due_at, version, alert_id))
         
-        # 初回アラートの閾値チェック
+        # 無効化済みのエントリが溜まった場合は作り直す
+        if len(self._due_heap) > 2 * len(self._due_versions) + 64:
+            self._due_heap = [
+                entry for entry in self._due_heap if self._due_versions.get(entry[2]) == entry[1]
+            ]
+            heapq.heapify(self._due_heap)
+        
+        if self._due_heap[0][1] == version:
+            self._wakeup.set()
+    
+    def _next_due_at(self, alert: PendingAlert) -> Optional[datetime]:
+        """アラートを次に送信すべき時刻"""
+        # 初回アラートは優先度別の閾値
         if alert.alerts_sent == 0:
-            threshold = self._get_threshold_for_priority(alert.analysis.priority)
-            return time_since_added >= threshold
+            return alert.added_at + self._get_threshold_for_priority(alert.analysis.priority)
         
-        # エスカレーションチェック
+        # エスカレーション
         if alert.last_alert_at and alert.escalation_level < self.alert_config.max_escalation_level:
             escalation_interval = timedelta(
                 minutes=self.alert_config.escalation_intervals[
                     min(alert.escalation_level, len(self.alert_config.escalation_intervals) - 1)
                 ]
             )
-            return (current_time - alert.last_alert_at) >= escalation_interval
+            return alert.last_alert_at + escalation_interval
         
-        return False
+        return None
+    
+    def _seconds_until_next_due(self) -> Optional[float]:
+        """次のアラートの送信時刻までの秒数（予定がない場合はNone）"""
+        while self._due_heap:
+            due_at, version, alert_id = self._due_heap[0]
+            if self._due_versions.get(alert_id) != version:
+                heapq.heappop(self._due_heap)
+                continue
+            return max((due_at - datetime.now()).total_seconds(), 0.0)
+        return None
     
     def _get_threshold_for_priority(self, priority: str) -> timedelta:
         """優先度に応じた閾値を取得"""
@@ -140,24 +380,85 @@ class AlertSystem:
         else:  # low
             return timedelta(hours=self.alert_config.low_priority_threshold_hours)
     
-    async def _send_alert(self, alert_id: str, alert: PendingAlert):
-        """アラートを送信"""
+    async def _send_digest(self, room_id: str, alerts: List[Tuple[str, PendingAlert]]):
+        """ルームのアラートを1通のメッセージにまとめて送信キューに追加"""
         try:
-            message_text = await self._generate_alert_message(alert)
+            if len(alerts) == 1:
+                message_text = await self._generate_alert_message(alerts[0][1])
+            else:
+                message_text = await self._generate_digest_message(alerts)
             
-            # アラートメッセージを送信（ChatWorkへの投稿は無効化）
-            # await self.chatwork_api.send_message(alert.message.room_id, message_text)
-            logger.info(f"Alert generated (not sent): {message_text[:100]}...")
+            priority = min(
+                (alert.analysis.priority for _, alert in alerts),
+                key=lambda p: PRIORITY_RANKS.get(p, PRIORITY_RANKS["normal"])
+            )
+            self.outbound.enqueue(room_id, message_text, priority, key=self._digest_key(room_id, alerts))
             
             # アラート記録を更新
-            alert.alerts_sent += 1
-            alert.last_alert_at = datetime.now()
-            alert.escalation_level += 1
-            
-            logger.info(f"Sent alert {alert_id} (attempt {alert.alerts_sent})")
+            sent_at = datetime.now()
+            for alert_id, alert in alerts:
+                alert.alerts_sent += 1
+                alert.last_alert_at = sent_at
+                alert.escalation_level += 1
+                self.store.put("pending_alerts", alert_id, alert_to_record(alert))
+                self._publish(ALERT_ESCALATED, alert_id, alert)
+                logger.info(f"Sent alert {alert_id} (attempt {alert.alerts_sent})")
             
         except Exception as e:
-            logger.error(f"Error sending alert {alert_id}: {e}")
+            logger.error(f"Error sending alerts for room {room_id}: {e}")
+    
+    @staticmethod
+    def _digest_key(room_id: str, alerts: List[Tuple[str, PendingAlert]]) -> str:
+        """送信キューの冪等キー（同じアラートの同じ回のお知らせは同じキーになる）"""
+        parts = sorted(f"{alert_id}#{alert.alerts_sent}" for alert_id, alert in alerts)
+        return f"alert:{room_id}:" + hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+    
+    async def _generate_digest_message(self, alerts: List[Tuple[str, PendingAlert]]) -> str:
+        """複数のアラートをまとめたメッセージを生成"""
+        priority_emoji = {
+            "high": "🚨",
+            "normal": "⚠️",
+            "low": "ℹ️"
+        }
+        
+        # 優先度の高い順、同じ優先度は古い順
+        ordered = sorted(
+            (alert for _, alert in alerts),
+            key=lambda a: (PRIORITY_RANKS.get(a.analysis.priority, PRIORITY_RANKS["normal"]), a.added_at)
+        )
+        emoji = priority_emoji.get(ordered[0].analysis.priority, "⚠️")
+        now = datetime.now()
+        
+        sections = []
+        for i, alert in enumerate(ordered, 1):
+            message = alert.message
+            escalation_text = f" (エスカレーション {alert.escalation_level}回目)" if alert.escalation_level > 0 else ""
+            original_message = message.body[:50]
+            if len(message.body) > 50:
+                original_message += "..."
+            sections.append(
+                f"{i}. {priority_emoji.get(alert.analysis.priority, '⚠️')} {message.account.name}"
+                f"（経過時間: {self._format_time_elapsed(now - alert.added_at)}、"
+                f"優先度: {alert.analysis.priority}）{escalation_text}\n"
+                f"{original_message}\n"
+                f"分析結果: {alert.analysis.summary}"
+            )
+        
+        alert_message = (
+            f"[info][title]{emoji} 未返信メッセージのお知らせ（{len(ordered)}件）[/title]"
+            + "\n\n".join(sections)
+            + "[/info]"
+        )
+        
+        # 全アラートのメンションを重複なく追加
+        mentions = list(dict.fromkeys(
+            account_id for alert in ordered for account_id in alert.analysis.mentions
+        ))
+        if mentions:
+            mention_text = " ".join(f"[To:{account_id}]" for account_id in mentions)
+            alert_message = mention_text + "\n\n" + alert_message
+        
+        return alert_message
     
     async def _generate_alert_message(self, alert: PendingAlert) -> str:
         """アラートメッセージを生成"""
@@ -238,33 +539,23 @@ class AlertSystem:
     
     async def get_pending_alerts_summary(self) -> Dict:
         """未処理アラートのサマリーを取得"""
+        return self.build_summary()
+    
+    def build_summary(self) -> Dict:
+        """集計済みの値からサマリーを組み立て（アラート数に依存しない）"""
         summary = {
             "total": len(self.pending_alerts),
-            "by_priority": {"high": 0, "normal": 0, "low": 0},
-            "by_room": {},
-            "oldest_alert": None
+            "by_priority": dict(self._priority_counts),
+            "by_room": dict(self._room_counts),
+            "oldest_alert": None,
+            "auto_resolved": self.auto_resolved_count
         }
         
-        oldest_time = None
-        oldest_alert = None
-        
-        for alert in self.pending_alerts.values():
-            # 優先度別カウント
-            priority = alert.analysis.priority
-            summary["by_priority"][priority] += 1
-            
-            # ルーム別カウント
-            room_id = alert.message.room_id
-            if room_id not in summary["by_room"]:
-                summary["by_room"][room_id] = 0
-            summary["by_room"][room_id] += 1
-            
-            # 最古のアラート
-            if oldest_time is None or alert.added_at < oldest_time:
-                oldest_time = alert.added_at
-                oldest_alert = alert
-        
-        if oldest_alert:
+        # 最古のアラートは各優先度の索引の先頭のうち最も古いもの
+        heads = [ordered[0] for ordered in self._alerts_by_added.values() if ordered]
+        if heads:
+            _, alert_id = min(heads)
+            oldest_alert = self.pending_alerts[alert_id]
             summary["oldest_alert"] = {
                 "room_id": oldest_alert.message.room_id,
                 "message_id": oldest_alert.message.message_id,
@@ -275,6 +566,27 @@ class AlertSystem:
         
         return summary
     
+    def get_alerts_page(self, limit: int, priority: Optional[str] = None,
+                        after: Optional[Tuple[datetime, str]] = None) -> Tuple[List[Tuple[str, PendingAlert]], int]:
+        """追加日時の古い順に最大limit件のアラートと、条件に一致する総数を取得
+        
+        afterには前のページの最後のアラートの (追加日時, アラートID) を指定する。
+        """
+        if priority is not None:
+            indexes = [self._alerts_by_added.get(priority, [])]
+        else:
+            indexes = list(self._alerts_by_added.values())
+        total = sum(len(ordered) for ordered in indexes)
+        
+        # 各優先度の索引をafterの直後から読み、追加日時順にマージする
+        starts = [bisect.bisect_right(ordered, after) if after else 0 for ordered in indexes]
+        entries = itertools.islice(heapq.merge(*(
+            map(ordered.__getitem__, range(start, len(ordered)))
+            for ordered, start in zip(indexes, starts)
+        )), limit)
+        
+        return [(alert_id, self.pending_alerts[alert_id]) for _, alert_id in entries], total
+    
     async def force_check_alerts(self) -> List[str]:
         """強制的にアラートチェックを実行"""
         try:
@@ -292,7 +604,7 @@ class AlertSystem:
         for alert_id, alert in list(self.pending_alerts.items()):
             if alert.added_at < cutoff_time:
                 old_alerts.append(alert_id)
-                del self.pending_alerts[alert_id]
+                self._remove_alert(alert_id, reason="expired")
         
         if old_alerts:
             logger.info(f"Cleared {len(old_alerts)} old alerts")
@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from datetime import date
+
+from .storage import StateStore
+
+logger = logging.getLogger(__name__)
+
+# 永続化に使う名前空間
+STORE_NAMESPACE = "analysis_cache"
+
+
+def normalize_body(body: str) -> str:
+    """キャッシュキーと分析に使う本文の正規化（NFC・改行コード統一・前後の空白除去）"""
+    return unicodedata.normalize("NFC", body).replace("\r\n", "\n").replace("\r", "\n").strip()
+
+
+class AnalysisCache:
+    """正規化した本文のハッシュをキーにした分析結果のLRUキャッシュ
+
+    キーには分析ルールのバージョンを含めるため、ルールが変わると古い結果は
+    参照されなくなる。「今日」「明日」など日付に依存する期限を含む結果は
+    分析した日付を記録し、日付が変わった時点で無効化する。
+    storeを渡すとキャッシュの内容を永続化し、再起動後も再利用する。
+    """
+
+    def __init__(self, max_entries: int = 1000, store: Optional[StateStore] = None):
+        self.max_entries = max_entries
+        self.store = store or StateStore()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    @staticmethod
+    def make_key(rules_version: str, body: str) -> str:
+        """キャッシュキー（正規化済みの本文とルールバージョンのハッシュ）"""
+        return hashlib.sha256(f"{rules_version}\0{body}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str, today: date) -> Optional[Dict[str, Any]]:
+        """キャッシュされた分析結果（辞書）を取得"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry["date"] is not None and entry["date"] != today.isoformat():
+            # 日付に依存する期限の解釈が変わるため無効化
+            self._remove(key)
+            self.expired += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry["analysis"]
+
+    def put(self, key: str, rules_version: str, analysis: Dict[str, Any], analyzed_on: Optional[date]):
+        """分析結果を保存（analyzed_onは日付に依存する結果の場合のみ指定）"""
+        if self.max_entries <= 0:
+            return
+
+        entry = {
+            "rules_version": rules_version,
+            "date": analyzed_on.isoformat() if analyzed_on else None,
+            "analysis": analysis,
+            "cached_at": time.time()
+        }
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self.store.put(STORE_NAMESPACE, key, entry)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        del self._entries[key]
+        self.store.delete(STORE_NAMESPACE, key)
+
+    async def restore_state(self, rules_version: str):
+        """永続化されたキャッシュを読み込み（ルールバージョンが異なるものは破棄）"""
+        stored = await self.store.load(STORE_NAMESPACE)
+
+        current = []
+        for key, entry in stored.items():
+            if entry.get("rules_version") == rules_version:
+                current.append((key, entry))
+            else:
+                self.store.delete(STORE_NAMESPACE, key)
+
+        # 古い順に追加して上限を超えた分は破棄
+        current.sort(key=lambda item: item[1].get("cached_at", 0))
+        for key, entry in current[-self.max_entries:] if self.max_entries > 0 else []:
+            self._entries[key] = entry
+        for key, _ in current[:max(len(current) - self.max_entries, 0)]:
+            self.store.delete(STORE_NAMESPACE, key)
+
+        logger.info(f"Restored {len(self._entries)} cached analyses")
+
+    def get_status(self) -> Dict[str, Any]:
+        """キャッシュの統計を取得"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "expired": self.expired
+        }
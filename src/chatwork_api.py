@@ -1,11 +1,20 @@
 import aiohttp
 import asyncio
+import heapq
+import itertools
 import logging
-from typing import List, Dict, Optional, Any
-from dataclasses import dataclass
+from typing import List, Dict, Optional, Any, Tuple
+from dataclasses import dataclass, asdict
 from datetime import datetime
 import json
-import re
+import time
+
+from .rate_limiter import RateLimiter
+from .chatwork_markup import ParsedMarkup, DELETE_TAGS, parse_markup
+from .storage import StateStore
+from .read_model import MessageReadModel
+from .metadata_cache import MetadataCache
+from .event_log import DashboardEventLog, MESSAGE_DELETED
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +36,62 @@ class ChatWorkMessage:
     body: str
     send_time: int
     update_time: int
+    
+    @property
+    def markup(self) -> ParsedMarkup:
+        """本文のマークアップの構文木（初回参照時に解析してキャッシュ、フィールドには含めない）"""
+        parsed = self.__dict__.get("_markup")
+        if parsed is None or parsed.source is not self.body:
+            parsed = parse_markup(self.body)
+            self.__dict__["_markup"] = parsed
+        return parsed
+
+
+def message_to_dict(message: ChatWorkMessage) -> Dict[str, Any]:
+    """ChatWorkMessageを保存用の辞書に変換"""
+    return asdict(message)
+
+
+def message_from_dict(data: Dict[str, Any]) -> ChatWorkMessage:
+    """保存用の辞書からChatWorkMessageを復元"""
+    return ChatWorkMessage(**{**data, "account": ChatWorkAccount(**data["account"])})
+
+
+# ルームごとにキャッシュするメッセージ数（全件取得で返る最新件数と同じ）
+MESSAGE_CACHE_SIZE = 100
+
+
+def cached_message_key(room_id: str, message_id: str) -> str:
+    """キャッシュしたメッセージを1件ずつ永続化する際のキー"""
+    return f"{room_id}/{message_id}"
+
+
+def deleted_log_key(deleted_info: Dict[str, Any]) -> Tuple[str, str, str]:
+    """削除ログの並び順のキー (削除時刻, ルームID, メッセージID)"""
+    return (deleted_info.get("deleted_at", ""), str(deleted_info.get("room_id", "")), str(deleted_info["message_id"]))
+
+
+@dataclass
+class RoomCursor:
+    """ルーム別の既読位置（処理済みメッセージIDの最大値）"""
+    high_watermark: int = 0
+    
+    def advance(self, messages: List[ChatWorkMessage]) -> List[ChatWorkMessage]:
+        """未処理のメッセージを取り出して既読位置を進める
+        
+        APIはメッセージIDの昇順で返すため、末尾から遡って既読位置以下の
+        メッセージに当たった時点で走査を打ち切る。順序が前後していても
+        既読位置は取り出したメッセージIDの最大値に進め、後退させない。
+        """
+        start = len(messages)
+        while start > 0 and int(messages[start - 1].message_id) > self.high_watermark:
+            start -= 1
+        
+        new_messages = messages[start:]
+        if new_messages:
+            self.high_watermark = max(int(message.message_id) for message in new_messages)
+        
+        return new_messages
 
 
 @dataclass
@@ -45,13 +110,25 @@ class ChatWorkTask:
 class ChatWorkAPI:
     """ChatWork API クライアント"""
     
-    def __init__(self, api_token: str):
+    def __init__(self, api_token: str, rate_limiter: Optional[RateLimiter] = None,
+                 max_rate_limit_retries: int = 3, delta_polling: bool = False,
+                 full_reconcile_interval: int = 300, store: Optional[StateStore] = None,
+                 metadata_ttls: Optional[Dict[str, float]] = None, events: Optional[DashboardEventLog] = None):
         self.api_token = api_token
         self.base_url = "https://api.chatwork.com/v2"
         self.session = None
-        self.last_message_ids = {}  # ルーム別の最後のメッセージID
+        self.rate_limiter = rate_limiter or RateLimiter()  # 同一トークンの全リクエストで共有
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.cursors: Dict[str, RoomCursor] = {}  # ルーム別の既読位置
         self.deleted_messages = {}  # 削除されたメッセージの履歴
         self.cached_messages = {}  # ルーム別のメッセージキャッシュ
+        self.delta_polling = delta_polling  # force=0で差分のみ取得するモード
+        self.full_reconcile_interval = full_reconcile_interval  # 差分モード時の全件照合間隔（秒）
+        self.last_full_sync = {}  # ルーム別の最終全件取得時刻（monotonic）
+        self.store = store or StateStore()  # 既読位置・キャッシュ・削除ログの永続化先
+        self.read_model = MessageReadModel()  # ダッシュボード表示用（取得したメッセージを反映）
+        self.metadata_cache = MetadataCache(metadata_ttls)  # ルーム一覧・コンタクト・メンバーのキャッシュ
+        self.events = events  # 削除検出をダッシュボードに通知
         
     async def __aenter__(self):
         await self._ensure_session()
@@ -82,150 +159,253 @@ class ChatWorkAPI:
         
         url = f"{self.base_url}{endpoint}"
         
-        try:
-            async with self.session.request(method, url, **kwargs) as response:
-                if response.status == 200:
-                    return await response.json()
-                elif response.status == 401:
-                    raise Exception("Unauthorized: Invalid API token")
-                elif response.status == 429:
-                    # レート制限の場合は待機
-                    await asyncio.sleep(60)
-                    raise Exception("Rate limit exceeded")
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"API Error {response.status}: {error_text}")
+        for attempt in range(self.max_rate_limit_retries + 1):
+            # 送信前にレート制限の枠を確保
+            await self.rate_limiter.acquire()
+            
+            try:
+                async with self.session.request(method, url, **kwargs) as response:
+                    self.rate_limiter.update_from_headers(response.headers)
                     
-        except aiohttp.ClientError as e:
-            logger.error(f"HTTP Client Error: {e}")
-            raise Exception(f"Network error: {e}")
+                    if response.status == 200:
+                        return await response.json()
+                    elif response.status == 204:
+                        # 差分取得で新着がない場合など
+                        return None
+                    elif response.status == 401:
+                        raise Exception("Unauthorized: Invalid API token")
+                    elif response.status == 429:
+                        # レート制限の場合はリセット後に再試行
+                        self.rate_limiter.on_rate_limited(response.headers)
+                        logger.warning(f"Rate limited on {method} {endpoint} "
+                                       f"(attempt {attempt + 1}/{self.max_rate_limit_retries + 1})")
+                        continue
+                    else:
+                        error_text = await response.text()
+                        raise Exception(f"API Error {response.status}: {error_text}")
+                        
+            except aiohttp.ClientError as e:
+                logger.error(f"HTTP Client Error: {e}")
+                raise Exception(f"Network error: {e}")
+        
+        raise Exception("Rate limit exceeded")
     
     async def get_me(self) -> Dict[str, Any]:
         """自分の情報を取得"""
         return await self._request("GET", "/me")
     
-    async def get_rooms(self) -> List[Dict[str, Any]]:
-        """ルーム一覧を取得（カテゴリ情報付き）"""
+    async def get_rooms(self, use_cache: bool = True) -> List[Dict[str, Any]]:
+        """ルーム一覧を取得（カテゴリ情報付き）
+        
+        キャッシュの有効期間内は前回の結果を返す。ルームの更新時刻を使う監視ループなど
+        最新の一覧が必要な場合はuse_cache=Falseで取得する（取得結果はキャッシュに反映される）。
+        """
         try:
-            rooms = await self._request("GET", "/rooms")
-            
-            # 基本的なルーム情報のみを返す（高速化）
-            enhanced_rooms = []
-            for room in rooms:
-                try:
-                    room_with_category = room.copy()
-                    # 基本的なタイプ情報のみでカテゴリを決定
-                    room_with_category['category'] = self._determine_basic_category(room)
-                    enhanced_rooms.append(room_with_category)
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to categorize room {room['room_id']}: {e}")
-                    room_with_category = room.copy()
-                    room_with_category['category'] = 'others'
-                    enhanced_rooms.append(room_with_category)
-            
-            return enhanced_rooms
-            
+            return await self.metadata_cache.get("rooms", "", self._fetch_rooms, fresh=not use_cache)
         except Exception as e:
             logger.error(f"Error getting rooms: {e}")
             return []
     
+    async def _fetch_rooms(self) -> List[Dict[str, Any]]:
+        """ルーム一覧をAPIから取得してカテゴリを付与"""
+        rooms = await self._request("GET", "/rooms")
+        
+        # 基本的なルーム情報のみを返す（高速化）
+        enhanced_rooms = []
+        for room in rooms:
+            try:
+                room_with_category = room.copy()
+                # 基本的なタイプ情報のみでカテゴリを決定
+                room_with_category['category'] = self._determine_basic_category(room)
+                enhanced_rooms.append(room_with_category)
+                
+            except Exception as e:
+                logger.warning(f"Failed to categorize room {room['room_id']}: {e}")
+                room_with_category = room.copy()
+                room_with_category['category'] = 'others'
+                enhanced_rooms.append(room_with_category)
+        
+        self.read_model.update_room_names(enhanced_rooms)
+        return enhanced_rooms
+    
     async def get_room_info(self, room_id: str) -> Dict[str, Any]:
         """ルーム情報を取得"""
         return await self._request("GET", f"/rooms/{room_id}")
     
     async def get_messages(self, room_id: str, force: int = 0) -> List[ChatWorkMessage]:
-        """メッセージ一覧を取得（削除検出機能付き）"""
+        """メッセージ一覧を取得（削除検出機能付き）
+        
+        取得に失敗した場合は空のリストを返す。詳細はfetch_messagesを参照。
+        """
         try:
-            params = {"force": force}
-            data = await self._request("GET", f"/rooms/{room_id}/messages", params=params)
-            
-            # 現在のメッセージIDセットを作成
-            current_message_ids = set()
-            messages = []
-            deleted_tag_messages = []  # [delete]タグ付きメッセージ
-            
-            for msg_data in data:
-                message_id = msg_data["message_id"]
-                body = msg_data["body"]
-                
-                # [delete]タグを含むメッセージを検出
-                if "[delete]" in body or "[deleted]" in body:
-                    # [delete]タグ付きメッセージとして記録
-                    account = ChatWorkAccount(
-                        account_id=msg_data["account"]["account_id"],
-                        name=msg_data["account"]["name"],
-                        avatar_image_url=msg_data["account"].get("avatar_image_url")
-                    )
-                    
-                    deleted_tag_message = ChatWorkMessage(
-                        message_id=message_id,
-                        room_id=room_id,
-                        account=account,
-                        body=body,
-                        send_time=msg_data["send_time"],
-                        update_time=msg_data["update_time"]
-                    )
-                    deleted_tag_messages.append(deleted_tag_message)
-                    # 通常のメッセージリストからは除外
-                    continue
-                
-                current_message_ids.add(message_id)
-                
-                account = ChatWorkAccount(
-                    account_id=msg_data["account"]["account_id"],
-                    name=msg_data["account"]["name"],
-                    avatar_image_url=msg_data["account"].get("avatar_image_url")
-                )
-                
-                message = ChatWorkMessage(
-                    message_id=message_id,
-                    room_id=room_id,
-                    account=account,
-                    body=body,
-                    send_time=msg_data["send_time"],
-                    update_time=msg_data["update_time"]
-                )
-                messages.append(message)
-            
-            # [delete]タグ付きメッセージを削除ログに追加
-            if deleted_tag_messages:
-                await self._add_deleted_tag_messages_to_log(room_id, deleted_tag_messages)
-            
+            return await self.fetch_messages(room_id, force=force)
+        except Exception as e:
+            logger.error(f"Error getting messages for room {room_id}: {e}")
+            return []
+    
+    async def fetch_messages(self, room_id: str, force: int = 0) -> List[ChatWorkMessage]:
+        """メッセージ一覧を取得（削除検出機能付き）
+        
+        force=1の場合は最新100件を取得してキャッシュを置き換え、削除検出を行う。
+        force=0の場合は未取得の差分のみが返るため、キャッシュに追記するだけで
+        削除検出は行わない。取得に失敗した場合は例外を送出する。
+        """
+        params = {"force": force}
+        data = await self._request("GET", f"/rooms/{room_id}/messages", params=params) or []
+        
+        # 現在のメッセージIDセットを作成
+        current_message_ids = set()
+        messages = []
+        deleted_tag_messages = []  # [delete]タグ付きメッセージ
+        
+        for msg_data in data:
+            account = ChatWorkAccount(
+                account_id=msg_data["account"]["account_id"],
+                name=msg_data["account"]["name"],
+                avatar_image_url=msg_data["account"].get("avatar_image_url")
+            )
+            
+            message = ChatWorkMessage(
+                message_id=msg_data["message_id"],
+                room_id=room_id,
+                account=account,
+                body=msg_data["body"],
+                send_time=msg_data["send_time"],
+                update_time=msg_data["update_time"]
+            )
+            
+            # [delete]タグを含むメッセージは削除ログに回し、通常のメッセージリストからは除外
+            if message.markup.has_delete:
+                deleted_tag_messages.append(message)
+                continue
+            
+            current_message_ids.add(message.message_id)
+            messages.append(message)
+        
+        # [delete]タグ付きメッセージを削除ログに追加
+        if deleted_tag_messages:
+            await self._add_deleted_tag_messages_to_log(room_id, deleted_tag_messages)
+        
+        if force:
             # 削除されたメッセージを検出
             await self._detect_deleted_messages(room_id, current_message_ids)
             
-            # メッセージキャッシュを更新
+            # メッセージキャッシュを置き換え、変更のあったメッセージだけを永続化
+            previous_cache = self.cached_messages.get(room_id, {})
             self.cached_messages[room_id] = {msg.message_id: msg for msg in messages}
-            
-            return messages
-            
-        except Exception as e:
-            logger.error(f"Error getting messages for room {room_id}: {e}")
-            return []
+            self._persist_cache_changes(
+                room_id,
+                [msg for msg in messages if self._is_cache_update(previous_cache, msg)],
+                [message_id for message_id in previous_cache if message_id not in current_message_ids]
+            )
+            self.last_full_sync[room_id] = time.monotonic()
+        else:
+            # 差分をキャッシュに追記（全件取得と同じく最新MESSAGE_CACHE_SIZE件まで保持）
+            cache = self.cached_messages.get(room_id, {})
+            changed = [msg for msg in messages if self._is_cache_update(cache, msg)]
+            self._persist_cache_changes(room_id, changed, self._add_to_cache(room_id, changed))
+        
+        self.read_model.ingest(room_id, messages, replace=bool(force), updated_at=time.time())
+        
+        return messages
     
     async def get_new_messages(self, room_id: str) -> List[ChatWorkMessage]:
-        """新しいメッセージのみを取得"""
-        try:
-            all_messages = await self.get_messages(room_id, force=1)
-            
-            # 前回チェック以降の新しいメッセージのみを抽出
-            last_message_id = self.last_message_ids.get(room_id)
-            new_messages = []
-            
-            for message in all_messages:
-                if last_message_id is None or message.message_id > last_message_id:
-                    new_messages.append(message)
-            
-            # 最新のメッセージIDを更新
-            if all_messages:
-                self.last_message_ids[room_id] = max(msg.message_id for msg in all_messages)
-            
-            return new_messages
-            
-        except Exception as e:
-            logger.error(f"Error getting new messages for room {room_id}: {e}")
-            return []
+        """新しいメッセージのみを取得
+        
+        メッセージ一覧の取得は1回だけ行い、その結果を削除検出・キャッシュ更新・
+        新着抽出のすべてに使う。呼び出し側で別途get_messagesを呼ぶ必要はない。
+        差分モードではforce=0で差分のみを取得し、全件照合（削除検出）は
+        full_reconcile_intervalごとに行う。
+        取得に失敗した場合は例外を送出する（空の応答と区別するため）。
+        """
+        force = 1 if self.needs_full_sync(room_id) else 0
+        all_messages = await self.fetch_messages(room_id, force=force)
+        
+        # 前回チェック以降の新しいメッセージのみを抽出して既読位置を進める
+        cursor = self.cursors.setdefault(room_id, RoomCursor())
+        new_messages = cursor.advance(all_messages)
+        
+        if new_messages:
+            self.store.put("cursors", room_id, cursor.high_watermark)
+        
+        return new_messages
+    
+    def record_pushed_message(self, message: ChatWorkMessage):
+        """Webhookなどで受信したメッセージをキャッシュに反映
+        
+        既読位置は進めない。Webhookの取りこぼしを後続の照合ポーリングで拾えるよう、
+        受信済みメッセージの重複は呼び出し側の処理済みチェックで除外する。
+        """
+        room_id = message.room_id
+        if self._is_cache_update(self.cached_messages.get(room_id, {}), message):
+            self._persist_cache_changes(room_id, [message], self._add_to_cache(room_id, [message]))
+        self.read_model.ingest(room_id, [message])
+    
+    @staticmethod
+    def _is_cache_update(cache: Dict[str, ChatWorkMessage], message: ChatWorkMessage) -> bool:
+        """キャッシュにないか、編集されたメッセージか"""
+        cached = cache.get(message.message_id)
+        return cached is None or cached.update_time != message.update_time
+    
+    def _add_to_cache(self, room_id: str, messages: List[ChatWorkMessage]) -> List[str]:
+        """メッセージをキャッシュに追記し、上限を超えた古いメッセージを捨てる（捨てたIDを返す）"""
+        cache = self.cached_messages.setdefault(room_id, {})
+        for msg in messages:
+            cache[msg.message_id] = msg
+        
+        evicted = []
+        while len(cache) > MESSAGE_CACHE_SIZE:
+            evicted.append(cache.pop(next(iter(cache))).message_id)
+        return evicted
+    
+    def _persist_cache_changes(self, room_id: str, changed: List[ChatWorkMessage], removed: List[str]):
+        """キャッシュの変更をメッセージ単位で永続化（ルーム全体は書き直さない）"""
+        for message_id in removed:
+            self.store.delete("cached_message", cached_message_key(room_id, message_id))
+        for msg in changed:
+            if msg.message_id in self.cached_messages.get(room_id, {}):
+                self.store.put("cached_message", cached_message_key(room_id, msg.message_id), message_to_dict(msg))
+    
+    async def restore_state(self):
+        """永続化された既読位置・キャッシュ・削除ログを読み込み"""
+        for room_id, high_watermark in (await self.store.load("cursors")).items():
+            self.cursors[room_id] = RoomCursor(int(high_watermark))
+        
+        restored: Dict[str, List[Dict[str, Any]]] = {}
+        for key, data in (await self.store.load("cached_message")).items():
+            restored.setdefault(key.split("/", 1)[0], []).append(data)
+        
+        # 以前の形式（ルームごとに全件を1つの値として保存）はメッセージ単位に移行する
+        for room_id, messages in (await self.store.load("cached_messages")).items():
+            if room_id not in restored:
+                restored[room_id] = messages
+                for data in messages:
+                    self.store.put("cached_message", cached_message_key(room_id, data["message_id"]), data)
+            self.store.delete("cached_messages", room_id)
+        
+        for room_id, messages in restored.items():
+            # 保存順は保持されないため、送信日時・メッセージIDの順に並べ直す
+            messages.sort(key=lambda data: (data["send_time"], len(str(data["message_id"])), str(data["message_id"])))
+            self.cached_messages[room_id] = {
+                data["message_id"]: message_from_dict(data) for data in messages[-MESSAGE_CACHE_SIZE:]
+            }
+            self.read_model.ingest(room_id, self.cached_messages[room_id].values())
+        
+        for room_id, deleted_log in (await self.store.load("deleted_messages")).items():
+            self.deleted_messages[room_id] = sorted(deleted_log, key=deleted_log_key)
+        
+        logger.info(f"Restored state for {len(self.cached_messages)} rooms")
+    
+    def needs_full_sync(self, room_id: str) -> bool:
+        """全件取得（force=1）による照合が必要か判定"""
+        if not self.delta_polling:
+            return True
+        
+        last_sync = self.last_full_sync.get(room_id)
+        if last_sync is None:
+            return True
+        
+        return time.monotonic() - last_sync >= self.full_reconcile_interval
     
     async def send_message(self, room_id: str, message: str, self_unread: bool = False) -> Dict[str, Any]:
         """メッセージを送信"""
@@ -235,7 +415,10 @@ class ChatWorkAPI:
                 "self_unread": "1" if self_unread else "0"
             }
             
-            return await self._request("POST", f"/rooms/{room_id}/messages", data=data)
+            result = await self._request("POST", f"/rooms/{room_id}/messages", data=data)
+            # 送信したメッセージを次の読み取りで取得し直す
+            self.read_model.invalidate(room_id)
+            return result
             
         except Exception as e:
             logger.error(f"Error sending message to room {room_id}: {e}")
@@ -346,7 +529,9 @@ class ChatWorkAPI:
     async def get_room_members(self, room_id: str) -> List[Dict[str, Any]]:
         """ルームメンバー一覧を取得"""
         try:
-            return await self._request("GET", f"/rooms/{room_id}/members")
+            return await self.metadata_cache.get(
+                "members", room_id, lambda: self._request("GET", f"/rooms/{room_id}/members")
+            )
         except Exception as e:
             logger.error(f"Error getting members for room {room_id}: {e}")
             return []
@@ -355,7 +540,7 @@ class ChatWorkAPI:
         """メッセージを引用"""
         try:
             # ChatWorkの引用フォーマットを使用
-            quoted_body = re.sub(r'\[.*?\]', '', original_body).strip()  # マークアップを除去
+            quoted_body = parse_markup(original_body).plain_text.strip()  # マークアップを除去
             if len(quoted_body) > 100:
                 quoted_body = quoted_body[:100] + "..."
             
@@ -384,6 +569,7 @@ class ChatWorkAPI:
                 self.deleted_messages[room_id] = []
             
             current_time = datetime.now().isoformat()
+            detected = []
             
             for message_id in deleted_message_ids:
                 deleted_message = self.cached_messages[room_id].get(message_id)
@@ -397,10 +583,26 @@ class ChatWorkAPI:
                         "deleted_at": current_time
                     }
                     self.deleted_messages[room_id].append(deleted_info)
+                    detected.append(deleted_info)
                     logger.info(f"Detected deleted message {message_id} in room {room_id}")
             
-            # 古い削除ログを制限（最新100件まで保持）
-            self.deleted_messages[room_id] = self.deleted_messages[room_id][-100:]
+            self._store_deleted_log(room_id)
+            self._publish_deleted(detected)
+    
+    def _store_deleted_log(self, room_id: str):
+        """削除ログを削除時刻順に並べ、古いものを制限（最新100件まで保持）して保存"""
+        deleted_log = self.deleted_messages[room_id]
+        deleted_log.sort(key=deleted_log_key)  # 末尾に追加した分だけ並べ替える
+        self.deleted_messages[room_id] = deleted_log[-100:]
+        self.store.put("deleted_messages", room_id, self.deleted_messages[room_id])
+    
+    def _publish_deleted(self, deleted_infos: List[Dict[str, Any]]):
+        """削除ログへの追加をダッシュボードに通知"""
+        if self.events is None or not deleted_infos:
+            return
+        total = sum(len(msgs) for msgs in self.deleted_messages.values())
+        for deleted_info in deleted_infos:
+            self.events.publish(MESSAGE_DELETED, {**deleted_info, "total_deleted_messages": total})
     
     async def get_deleted_messages(self, room_id: str = None) -> Dict[str, List[Dict]]:
         """削除されたメッセージのログを取得"""
@@ -409,12 +611,42 @@ class ChatWorkAPI:
         else:
             return self.deleted_messages.copy()
     
+    def page_deleted_messages(self, limit: Optional[int] = None,
+                              before: Optional[Tuple[str, str, str]] = None) -> List[Dict[str, Any]]:
+        """全ルームの削除ログを新しい順に最大limit件取得
+        
+        beforeには前のページの最後の削除ログのdeleted_log_keyを指定する。ルームごとの削除ログは
+        削除時刻順に並んでいるため、各ルームのbeforeより前の位置から逆順に読んでマージする。
+        """
+        streams = []
+        for deleted_log in self.deleted_messages.values():
+            end = len(deleted_log) if before is None else self._bisect_deleted_log(deleted_log, tuple(before))
+            streams.append(map(deleted_log.__getitem__, range(end - 1, -1, -1)))
+        
+        merged = heapq.merge(*streams, key=deleted_log_key, reverse=True)
+        return list(itertools.islice(merged, limit))
+    
+    @staticmethod
+    def _bisect_deleted_log(deleted_log: List[Dict[str, Any]], key: Tuple[str, str, str]) -> int:
+        """削除ログのうちkeyより前（古い）ものの件数"""
+        low, high = 0, len(deleted_log)
+        while low < high:
+            middle = (low + high) // 2
+            if deleted_log_key(deleted_log[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
     async def clear_deleted_messages_log(self, room_id: str = None):
         """削除メッセージログをクリア"""
         if room_id:
             if room_id in self.deleted_messages:
                 del self.deleted_messages[room_id]
+                self.store.delete("deleted_messages", room_id)
         else:
+            for cleared_room_id in self.deleted_messages:
+                self.store.delete("deleted_messages", cleared_room_id)
             self.deleted_messages.clear()
     
     async def _add_deleted_tag_messages_to_log(self, room_id: str, deleted_tag_messages: List[ChatWorkMessage]):
@@ -423,10 +655,11 @@ class ChatWorkAPI:
             self.deleted_messages[room_id] = []
         
         current_time = datetime.now().isoformat()
+        added = []
         
         for message in deleted_tag_messages:
             # メッセージ本文から[delete]タグを除去
-            clean_body = message.body.replace("[delete]", "").replace("[deleted]", "").strip()
+            clean_body = message.markup.to_markup(exclude=DELETE_TAGS).strip()
             
             deleted_info = {
                 "message_id": message.message_id,
@@ -441,10 +674,11 @@ class ChatWorkAPI:
             # 重複チェック（同じメッセージIDが既にログにある場合はスキップ）
             if not any(log["message_id"] == message.message_id for log in self.deleted_messages[room_id]):
                 self.deleted_messages[room_id].append(deleted_info)
+                added.append(deleted_info)
                 logger.info(f"Added [delete] tagged message {message.message_id} to deletion log")
         
-        # 古い削除ログを制限（最新100件まで保持）
-        self.deleted_messages[room_id] = self.deleted_messages[room_id][-100:]
+        self._store_deleted_log(room_id)
+        self._publish_deleted(added)
     
     def _determine_basic_category(self, room: Dict[str, Any]) -> str:
         """基本的なルーム情報からカテゴリを推定（高速版）"""
@@ -579,8 +813,7 @@ class ChatWorkAPI:
     async def get_contacts(self) -> List[Dict[str, Any]]:
         """コンタクト一覧を取得"""
         try:
-            response = await self._request('GET', '/contacts')
-            return response
+            return await self.metadata_cache.get("contacts", "", lambda: self._request('GET', '/contacts'))
         except Exception as e:
             logger.error(f"Error getting contacts: {e}")
             return []
@@ -599,6 +832,7 @@ class ChatWorkAPI:
             }
             
             response = await self._request('POST', '/rooms', data=data)
+            self.metadata_cache.invalidate("rooms")
             return response
         except Exception as e:
             logger.error(f"Error creating room: {e}")
@@ -616,6 +850,7 @@ class ChatWorkAPI:
             }
             
             response = await self._request('PUT', f'/rooms/{room_id}/members', data=data)
+            self.metadata_cache.invalidate("members", room_id)
             return response
         except Exception as e:
             logger.error(f"Error updating room members: {e}")
@@ -0,0 +1,179 @@
+import re
+from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass, field
+
+# 子要素を持つタグ（[/tag]で閉じる）
+CONTAINER_TAGS = ("qt", "info", "title", "code")
+
+# 単独で使うタグ
+EMPTY_TAGS = ("to", "toall", "rp", "qtmeta", "hr", "picon", "piconname", "preview", "download", "delete", "deleted")
+
+# 削除済みを示すタグ
+DELETE_TAGS = ("delete", "deleted")
+
+# 既知のタグのみをマークアップとして扱う（[重要] のような通常の括弧書きは本文のまま）。
+# IDと属性値は次の「[」で打ち切り、閉じられていないタグが続く本文でも走査を線形時間に保つ
+TAG_PATTERN = re.compile(
+    r'\[(/?)(' + '|'.join(sorted(CONTAINER_TAGS + EMPTY_TAGS, key=len, reverse=True)) + r')'
+    r'(?::([^\[\]\s]*))?((?:\s+[A-Za-z_]+=[^\s\[\]]*)*)\s*\]',
+    re.IGNORECASE
+)
+ATTR_PATTERN = re.compile(r'([A-Za-z_]+)=([^\s\[\]]*)')
+
+
+@dataclass
+class MarkupNode:
+    """マークアップの構文木のノード（tagが"text"の場合はtextに本文）"""
+    tag: str
+    attrs: Dict[str, str] = field(default_factory=dict)
+    children: List["MarkupNode"] = field(default_factory=list)
+    text: str = ""
+    raw: str = ""  # 開始タグの原文
+    raw_close: str = ""  # 終了タグの原文（閉じられていない場合は空）
+
+
+@dataclass
+class ReplyRef:
+    """[rp aid=... to=ルームID-メッセージID] の返信先"""
+    account_id: int
+    room_id: Optional[str]
+    message_id: Optional[str]
+
+
+@dataclass
+class ParsedMarkup:
+    """本文の構文木と、構文木から1回の走査で導出した情報"""
+    source: str
+    root: MarkupNode
+    mentions: List[int] = field(default_factory=list)  # 引用外の[To:]の宛先（出現順）
+    to_all: bool = False
+    replies: List[ReplyRef] = field(default_factory=list)  # 引用・[info]外の[rp]
+    reply_mentions: List[int] = field(default_factory=list)  # 引用・[info]外の[To:]の宛先（返信の判定用）
+    has_delete: bool = False  # 引用・コード外に[delete]/[deleted]がある
+    analysis_text: str = ""  # 引用を除きタグを外した本文（分析用、[To:]は残す）
+    plain_text: str = ""  # 引用も含めタグを外した本文
+
+    def to_markup(self, exclude: Tuple[str, ...] = ()) -> str:
+        """構文木からマークアップを復元（excludeのタグは除く）"""
+        parts = []
+        stack: List[object] = [self.root]
+
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item)
+                continue
+
+            if item.tag == "text":
+                parts.append(item.text)
+                continue
+            if item.tag in exclude:
+                continue
+
+            # 開始タグ・子要素・終了タグの順に出力されるよう逆順に積む
+            stack.append(item.raw_close)
+            stack.extend(reversed(item.children))
+            stack.append(item.raw)
+
+        return "".join(parts)
+
+
+def _text_node(text: str) -> MarkupNode:
+    return MarkupNode(tag="text", text=text)
+
+
+def parse_markup(body: str) -> ParsedMarkup:
+    """ChatWorkのマークアップを構文木に変換（本文の長さに対して線形時間）"""
+    root = MarkupNode(tag="root")
+    stack = [root]
+    open_counts = {tag: 0 for tag in CONTAINER_TAGS}
+    position = 0
+
+    for match in TAG_PATTERN.finditer(body):
+        closing = match.group(1) == "/"
+        tag = match.group(2).lower()
+
+        # [code]内のタグは本文として扱う
+        if stack[-1].tag == "code" and not (closing and tag == "code"):
+            continue
+
+        if match.start() > position:
+            stack[-1].children.append(_text_node(body[position:match.start()]))
+        position = match.end()
+
+        if closing:
+            if open_counts.get(tag):
+                # 閉じられていない内側のタグもここで閉じる
+                while stack[-1].tag != tag:
+                    open_counts[stack.pop().tag] -= 1
+                stack.pop().raw_close = match.group(0)
+                open_counts[tag] -= 1
+            else:
+                stack[-1].children.append(_text_node(match.group(0)))
+            continue
+
+        attrs = dict(ATTR_PATTERN.findall(match.group(4) or ""))
+        if match.group(3) is not None:
+            attrs["id"] = match.group(3)
+
+        node = MarkupNode(tag=tag, attrs=attrs, raw=match.group(0))
+        stack[-1].children.append(node)
+        if tag in CONTAINER_TAGS:
+            stack.append(node)
+            open_counts[tag] += 1
+
+    if position < len(body):
+        stack[-1].children.append(_text_node(body[position:]))
+
+    parsed = ParsedMarkup(source=body, root=root)
+    _collect(parsed)
+    return parsed
+
+
+def _collect(parsed: ParsedMarkup):
+    """構文木を1回走査してメンション・返信先・削除タグ・テキストを導出"""
+    analysis_parts = []
+    plain_parts = []
+    # (ノード, 引用内か, [info]内か)。[code]内のタグは解析時に本文として扱われている
+    stack = [(child, False, False) for child in reversed(parsed.root.children)]
+
+    while stack:
+        node, in_quote, in_info = stack.pop()
+        tag = node.tag
+
+        if tag == "text":
+            plain_parts.append(node.text)
+            if not in_quote:
+                analysis_parts.append(node.text)
+        elif tag == "to":
+            if not in_quote and node.attrs.get("id", "").isdigit():
+                account_id = int(node.attrs["id"])
+                parsed.mentions.append(account_id)
+                analysis_parts.append(f"[To:{account_id}]")
+                if not in_info:
+                    parsed.reply_mentions.append(account_id)
+        elif tag == "toall":
+            parsed.to_all = parsed.to_all or not in_quote
+        elif tag == "rp":
+            if not in_quote and not in_info and node.attrs.get("aid", "").isdigit():
+                room_id, _, message_id = node.attrs.get("to", "").partition("-")
+                parsed.replies.append(ReplyRef(
+                    account_id=int(node.attrs["aid"]),
+                    room_id=room_id or None,
+                    message_id=message_id or None
+                ))
+        elif tag in DELETE_TAGS:
+            parsed.has_delete = parsed.has_delete or not in_quote
+        elif tag == "hr":
+            stack.append((_text_node("\n"), in_quote, in_info))
+        elif tag in CONTAINER_TAGS:
+            if tag == "title":
+                # タイトルは独立した行として扱う
+                stack.append((_text_node("\n"), in_quote, in_info))
+            stack.extend(
+                (child, in_quote or tag == "qt", in_info or tag == "info")
+                for child in reversed(node.children)
+            )
+
+    parsed.analysis_text = "".join(analysis_parts)
+    parsed.plain_text = "".join(plain_parts)
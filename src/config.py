@@ -1,5 +1,5 @@
 import os
-from typing import List, Optional
+from typing import List, Dict, Optional
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -25,16 +25,63 @@ class Config:
     monitored_rooms: List[str] = None
     monitoring_interval: int = int(os.getenv("MONITORING_INTERVAL_SECONDS", "30"))
     error_retry_interval: int = int(os.getenv("ERROR_RETRY_INTERVAL_SECONDS", "60"))
+    polling_concurrency: int = int(os.getenv("POLLING_CONCURRENCY", "1"))  # 1の場合は逐次ポーリング
+    room_check_timeout: int = int(os.getenv("ROOM_CHECK_TIMEOUT_SECONDS", "60"))
+    processed_message_ttl_hours: int = int(os.getenv("PROCESSED_MESSAGE_TTL_HOURS", "24"))
+    delta_polling: bool = os.getenv("DELTA_POLLING", "false").lower() == "true"
+    full_reconcile_interval: int = int(os.getenv("FULL_RECONCILE_INTERVAL_SECONDS", "300"))
+    activity_driven_polling: bool = os.getenv("ACTIVITY_DRIVEN_POLLING", "false").lower() == "true"
+    adaptive_polling: bool = os.getenv("ADAPTIVE_POLLING", "false").lower() == "true"
+    poll_tiers: Optional[Dict[str, List[int]]] = None  # カテゴリ別の [最短間隔, 最長間隔]（秒）
+    status_tick_seconds: float = float(os.getenv("STATUS_TICK_SECONDS", "10"))  # ダッシュボードへのステータス配信間隔
+    ws_client_queue_size: int = int(os.getenv("WS_CLIENT_QUEUE_SIZE", "256"))  # WebSocketクライアントごとの送信キューの上限
+    ws_slow_client_policy: str = os.getenv("WS_SLOW_CLIENT_POLICY", "disconnect")  # 送信キューが満杯の場合: disconnect / drop
+    
+    # Webhook設定
+    webhook_token: str = os.getenv("CHATWORK_WEBHOOK_TOKEN", "")
+    webhook_rooms: List[str] = None  # Webhookで受信するルーム（ポーリングは照合のみ）
+    webhook_reconcile_interval: int = int(os.getenv("WEBHOOK_RECONCILE_INTERVAL_SECONDS", "600"))
+    
+    # APIレート制限設定
+    rate_limit_max_retries: int = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3"))
+    
+    # メタデータキャッシュ設定（秒、0でキャッシュしない）
+    rooms_cache_ttl_seconds: int = int(os.getenv("ROOMS_CACHE_TTL_SECONDS", "30"))
+    contacts_cache_ttl_seconds: int = int(os.getenv("CONTACTS_CACHE_TTL_SECONDS", "300"))
+    members_cache_ttl_seconds: int = int(os.getenv("MEMBERS_CACHE_TTL_SECONDS", "120"))
+    read_model_ttl_seconds: int = int(os.getenv("READ_MODEL_TTL_SECONDS", "30"))  # 監視対象外のルームのメッセージを取得し直す間隔
     
     # アラート設定
     high_priority_threshold_minutes: int = int(os.getenv("HIGH_PRIORITY_THRESHOLD_MINUTES", "30"))
     normal_priority_threshold_hours: int = int(os.getenv("NORMAL_PRIORITY_THRESHOLD_HOURS", "2"))
     low_priority_threshold_hours: int = int(os.getenv("LOW_PRIORITY_THRESHOLD_HOURS", "24"))
+    alert_digest_window_seconds: int = int(os.getenv("ALERT_DIGEST_WINDOW_SECONDS", "60"))
+    alert_delivery_enabled: bool = os.getenv("ALERT_DELIVERY_ENABLED", "false").lower() == "true"
+    outbound_rate_reserve: int = int(os.getenv("OUTBOUND_RATE_RESERVE", "30"))  # 通常・低優先度の送信時に残すレート制限の枠
+    outbound_max_attempts: int = int(os.getenv("OUTBOUND_MAX_ATTEMPTS", "5"))
     
     # AI分析設定
     openai_api_key: Optional[str] = os.getenv("OPENAI_API_KEY")
     anthropic_api_key: Optional[str] = os.getenv("ANTHROPIC_API_KEY")
     ai_provider: str = os.getenv("AI_PROVIDER", "builtin")  # "openai", "anthropic", "builtin"
+    llm_model: Optional[str] = os.getenv("LLM_MODEL")  # 未指定の場合はプロバイダーごとの既定モデル
+    llm_base_url: Optional[str] = os.getenv("LLM_BASE_URL")  # OpenAI互換サーバーのURL
+    llm_escalation_threshold: float = float(os.getenv("LLM_ESCALATION_THRESHOLD", "0.4"))
+    llm_escalation_min_chars: int = int(os.getenv("LLM_ESCALATION_MIN_CHARS", "15"))
+    llm_batch_size: int = int(os.getenv("LLM_BATCH_SIZE", "8"))
+    llm_batch_wait_ms: int = int(os.getenv("LLM_BATCH_WAIT_MS", "50"))
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+    llm_latency_budget_seconds: float = float(os.getenv("LLM_LATENCY_BUDGET_SECONDS", "3"))
+    analysis_executor: str = os.getenv("ANALYSIS_EXECUTOR", "inline")  # "inline", "process"
+    analysis_pool_threshold: int = int(os.getenv("ANALYSIS_POOL_THRESHOLD", "8"))  # プロセスプールに切り替える分析待ち件数
+    analysis_pool_workers: int = int(os.getenv("ANALYSIS_POOL_WORKERS", "2"))
+    analysis_cache_size: int = int(os.getenv("ANALYSIS_CACHE_SIZE", "1000"))  # 0でキャッシュ無効
+    analysis_cache_persist: bool = os.getenv("ANALYSIS_CACHE_PERSIST", "false").lower() == "true"
+    
+    # 永続化設定
+    storage_backend: str = os.getenv("STORAGE_BACKEND", "sqlite")  # "sqlite", "none"
+    storage_path: str = os.getenv("STORAGE_PATH", "data/chatwork_ai_manager.db")
+    storage_flush_interval: float = float(os.getenv("STORAGE_FLUSH_INTERVAL_SECONDS", "2"))
     
     # ログ設定
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
@@ -49,6 +96,18 @@ class Config:
             else:
                 self.monitored_rooms = []
         
+        # Webhook受信ルームの設定
+        if self.webhook_rooms is None:
+            rooms_str = os.getenv("WEBHOOK_ROOMS", "")
+            self.webhook_rooms = [room.strip() for room in rooms_str.split(",") if room.strip()]
+        
+        # カテゴリ別ポーリング間隔の設定（JSON形式）
+        if self.poll_tiers is None:
+            tiers_str = os.getenv("POLL_TIERS", "")
+            if tiers_str:
+                import json
+                self.poll_tiers = json.loads(tiers_str)
+        
         # 設定検証
         if not self.chatwork_token:
             raise ValueError("CHATWORK_API_TOKEN is required")
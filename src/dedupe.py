@@ -0,0 +1,89 @@
+import logging
+import sys
+import time
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TimeBucketedDedupe:
+    """時間バケット単位で古いキーを破棄する重複排除セット
+
+    キーは追加時刻ごとのバケットに振り分けられ、max_age_secondsを過ぎた
+    バケットはevictでまとめて破棄される。所属判定はO(1)、破棄は
+    期限切れバケット内のキー数に比例する。
+
+    件数の上限は設けない。保持件数は「保持期間内に追加されたキー数」で頭打ちになり、
+    追加されるのは実際に処理したメッセージ（ポーリング1回あたりルームごとに最大100件）
+    だけであるため、処理量に比例した大きさを超えて増えることはない
+    （1時間2000件・24時間保持で約4.8万件・約7.5MiB、benchmarks/dedupe_soak_bench.py）。
+    """
+
+    def __init__(self, max_age_seconds: int = 86400, bucket_seconds: int = 3600):
+        self.max_age_seconds = max_age_seconds
+        self.bucket_seconds = bucket_seconds
+        self._entries: Dict[str, int] = {}  # キー -> バケット番号
+        self._buckets: Dict[int, List[str]] = {}  # バケット番号 -> キー一覧
+        self._bucket_key_bytes: Dict[int, int] = {}  # バケット番号 -> キー文字列のバイト数の合計
+        self._key_bytes = 0  # 全バケットのキー文字列のバイト数の合計
+        self.evicted_count = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: str, timestamp: Optional[float] = None):
+        """キーを追加（既存のキーは新しい時刻のバケットに移す）"""
+        bucket = int((timestamp if timestamp is not None else time.time()) // self.bucket_seconds)
+        if self._entries.get(key) == bucket:
+            return
+
+        self._entries[key] = bucket
+        self._buckets.setdefault(bucket, []).append(key)
+        size = sys.getsizeof(key)
+        self._bucket_key_bytes[bucket] = self._bucket_key_bytes.get(bucket, 0) + size
+        self._key_bytes += size
+
+    def update(self, items: Iterable[Tuple[str, float]]):
+        """(キー, 追加時刻)の組をまとめて追加"""
+        for key, timestamp in items:
+            self.add(key, timestamp)
+
+    def evict(self, now: Optional[float] = None) -> List[str]:
+        """期限切れのバケットを破棄して破棄したキーを返す"""
+        now = now if now is not None else time.time()
+        cutoff_bucket = int((now - self.max_age_seconds) // self.bucket_seconds)
+        evicted = []
+
+        for bucket in [b for b in self._buckets if b < cutoff_bucket]:
+            self._key_bytes -= self._bucket_key_bytes.pop(bucket, 0)
+            for key in self._buckets.pop(bucket):
+                # 新しいバケットに移動済みのキーは残す
+                if self._entries.get(key) == bucket:
+                    del self._entries[key]
+                    evicted.append(key)
+
+        self.evicted_count += len(evicted)
+        return evicted
+
+    def memory_bytes(self) -> int:
+        """おおよそのメモリ使用量（バイト）
+
+        キー文字列の分は追加・破棄時に集計済みのため、計算はバケット数に比例する。
+        """
+        size = sys.getsizeof(self._entries) + sys.getsizeof(self._buckets) + self._key_bytes
+        for bucket, keys in self._buckets.items():
+            size += sys.getsizeof(keys) + sys.getsizeof(bucket)
+        return size
+
+    def get_status(self) -> Dict[str, Any]:
+        """件数とメモリ使用量を取得"""
+        return {
+            "entries": len(self._entries),
+            "buckets": len(self._buckets),
+            "max_age_seconds": self.max_age_seconds,
+            "evicted": self.evicted_count,
+            "memory_bytes": self.memory_bytes()
+        }
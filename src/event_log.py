@@ -0,0 +1,83 @@
+import itertools
+import logging
+import uuid
+from collections import deque
+from typing import Dict, List, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# WebSocketで配信するイベントのプロトコルバージョン
+PROTOCOL_VERSION = 1
+
+# イベント種別
+NEW_MESSAGE = "new_message"
+ALERT_SCHEDULED = "alert_scheduled"
+ALERT_RESOLVED = "alert_resolved"
+ALERT_ESCALATED = "alert_escalated"
+MESSAGE_DELETED = "message_deleted"
+ROOM_STATE = "room_state"
+STATUS_TICK = "status_tick"
+
+
+class DashboardEventLog:
+    """ダッシュボードに配信する差分イベントの連番付きログ
+
+    イベントには起動ごとに一意なepochの中で単調増加するseqを付与し、直近max_events件を
+    保持する。再接続したクライアントは最後に受け取ったepochとseqから続きを受け取れる。
+    ログから消えた範囲やepochが異なる場合はスナップショットから取り直す。
+    ステータスのように次の値で置き換わるイベントはseqを付けずログにも残さない。
+    """
+
+    def __init__(self, max_events: int = 1000):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self._events: deque = deque(maxlen=max_events)
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+
+    def publish(self, event_type: str, data: Dict[str, Any], transient: bool = False) -> Dict[str, Any]:
+        """イベントを記録して購読者に通知（購読者の処理は待たない）"""
+        event = {"type": event_type, "data": data}
+        if not transient:
+            self.seq += 1
+            event["seq"] = self.seq
+            self._events.append(event)
+
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Error delivering {event_type} event: {e}")
+
+        return event
+
+    def since(self, seq: int, epoch: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """seqより後のイベント（続きを返せない場合はNone）"""
+        if epoch != self.epoch or seq < 0 or seq > self.seq:
+            return None
+        if seq == self.seq:
+            return []
+        if not self._events or self._events[0]["seq"] > seq + 1:
+            return None
+        return list(itertools.islice(self._events, seq + 1 - self._events[0]["seq"], None))
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """イベントの購読を登録"""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """イベントの購読を解除"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def get_status(self) -> Dict[str, Any]:
+        """ログの状態を取得"""
+        return {
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "retained": len(self._events),
+            "oldest_seq": self._events[0]["seq"] if self._events else None
+        }
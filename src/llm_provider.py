@@ -0,0 +1,310 @@
+import abc
+import asyncio
+import json
+import logging
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, datetime
+
+from .task_analyzer import MessageAnalysis, TaskInfo
+
+logger = logging.getLogger(__name__)
+
+# LLMに渡す分析指示
+SYSTEM_PROMPT = """あなたはChatWorkのメッセージを分析するアシスタントです。
+入力はメッセージのJSON配列です。各メッセージについて返信の要否・優先度・タスク・質問・感情・要約を判定し、
+入力と同じ件数のJSON配列のみを出力してください（説明文は不要）。
+各要素の形式:
+{"index": 入力の番号, "requires_reply": true または false, "priority": "high" | "normal" | "low",
+ "tasks": [{"description": "タスク内容", "assignees": [担当者のアカウントID], "priority": "high" | "normal" | "low", "deadline": "YYYY-MM-DD" または null}],
+ "questions": ["質問文"], "sentiment": "positive" | "negative" | "neutral", "summary": "30文字以内の要約"}
+本文中の [To:数字] は宛先のアカウントIDです。期限の「今日」「明日」などは基準日から計算してください。"""
+
+# LLMの結果に付与する信頼度
+LLM_CONFIDENCE_SCORE = 0.9
+
+PRIORITIES = ("high", "normal", "low")
+SENTIMENTS = ("positive", "negative", "neutral")
+
+
+class LLMProvider(abc.ABC):
+    """LLMプロバイダーの基底クラス"""
+
+    name = "base"
+
+    @abc.abstractmethod
+    async def complete(self, system: str, prompt: str) -> str:
+        """指示とプロンプトを送信して応答テキストを取得"""
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI Chat Completions API（base_urlを指定すると互換サーバーにも接続可能）"""
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str], model: str = "gpt-3.5-turbo", base_url: Optional[str] = None):
+        from openai import AsyncOpenAI
+
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url or None)
+        self.model = model
+
+    async def complete(self, system: str, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0
+        )
+        return response.choices[0].message.content or ""
+
+
+class AnthropicProvider(LLMProvider):
+    """Anthropic Text Completions API（anthropic 0.7系のSDKに合わせる）"""
+
+    name = "anthropic"
+
+    def __init__(self, api_key: Optional[str], model: str = "claude-2.1"):
+        from anthropic import AsyncAnthropic, HUMAN_PROMPT, AI_PROMPT
+
+        self.client = AsyncAnthropic(api_key=api_key)
+        self.model = model
+        self.human_prompt = HUMAN_PROMPT
+        self.ai_prompt = AI_PROMPT
+
+    async def complete(self, system: str, prompt: str) -> str:
+        response = await self.client.completions.create(
+            model=self.model,
+            prompt=f"{self.human_prompt} {system}\n\n{prompt}{self.ai_prompt}",
+            max_tokens_to_sample=2048,
+            temperature=0
+        )
+        return response.completion
+
+
+def build_batch_prompt(bodies: List[str], now: datetime) -> str:
+    """複数メッセージを1回のリクエストにまとめる"""
+    messages = [{"index": index, "body": body} for index, body in enumerate(bodies)]
+    return f"基準日: {now.strftime('%Y-%m-%d')}\n\n{json.dumps(messages, ensure_ascii=False)}"
+
+
+def parse_batch_response(text: str) -> Dict[int, Dict[str, Any]]:
+    """応答テキストからメッセージ番号ごとの結果を取り出す"""
+    start = text.find('[')
+    end = text.rfind(']')
+    if start < 0 or end < start:
+        raise ValueError("LLM response does not contain a JSON array")
+
+    items = json.loads(text[start:end + 1])
+    return {
+        int(item["index"]): item
+        for item in items
+        if isinstance(item, dict) and isinstance(item.get("index"), (int, str)) and str(item["index"]).isdigit()
+    }
+
+
+def _parse_date(value: Any) -> Optional[int]:
+    """YYYY-MM-DD形式の期限をタイムスタンプに変換"""
+    if not value:
+        return None
+    try:
+        deadline = datetime.strptime(str(value), "%Y-%m-%d")
+        return int(deadline.replace(hour=23, minute=59, second=59).timestamp())
+    except ValueError:
+        return None
+
+
+def merge_llm_result(builtin: MessageAnalysis, data: Dict[str, Any]) -> MessageAnalysis:
+    """LLMの結果で組み込み分析の結果を補正（不正な値は組み込み分析の値を使う）"""
+    tasks = []
+    for task in data.get("tasks") or []:
+        if not isinstance(task, dict) or not task.get("description"):
+            continue
+        tasks.append(TaskInfo(
+            description=str(task["description"]),
+            assignees=[int(a) for a in task.get("assignees") or [] if str(a).isdigit()],
+            deadline=_parse_date(task.get("deadline")),
+            priority=task.get("priority") if task.get("priority") in PRIORITIES else "normal"
+        ))
+
+    deadlines = [task.deadline for task in tasks if task.deadline]
+
+    return MessageAnalysis(
+        requires_reply=bool(data.get("requires_reply", builtin.requires_reply)),
+        priority=data.get("priority") if data.get("priority") in PRIORITIES else builtin.priority,
+        tasks=tasks,
+        questions=[str(question) for question in data.get("questions") or []],
+        mentions=list(builtin.mentions),
+        deadline=min(deadlines) if deadlines else builtin.deadline,
+        sentiment=data.get("sentiment") if data.get("sentiment") in SENTIMENTS else builtin.sentiment,
+        summary=str(data.get("summary") or builtin.summary),
+        confidence_score=max(builtin.confidence_score, LLM_CONFIDENCE_SCORE)
+    )
+
+
+class LLMEscalator:
+    """信頼度の低い分析結果だけをLLMで再分析する
+
+    エスカレーションされたメッセージはbatch_wait秒またはbatch_size件まで溜めて
+    1回のリクエストにまとめ、同時リクエスト数はmax_concurrencyまでに制限する。
+    latency_budget秒以内に結果が得られない場合やエラーの場合は組み込み分析の
+    結果をそのまま返す（遅れて届いた結果は破棄される）。
+    """
+
+    def __init__(self, provider: LLMProvider, threshold: float = 0.4, min_chars: int = 15,
+                 batch_size: int = 8, batch_wait: float = 0.05, max_concurrency: int = 2,
+                 latency_budget: float = 3.0, request_timeout: float = 30.0):
+        self.provider = provider
+        self.threshold = threshold
+        self.min_chars = min_chars
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.latency_budget = latency_budget
+        self.request_timeout = request_timeout
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._queue: List[Tuple[str, MessageAnalysis, datetime, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._requests: set = set()
+        self.in_flight = 0
+        self.escalated = 0
+        self.refined = 0
+        self.fallback_timeout = 0
+        self.fallback_error = 0
+        self.batches = 0
+        self.batched_messages = 0
+        self.total_latency = 0.0
+
+    def should_escalate(self, body: str, analysis: MessageAnalysis) -> bool:
+        """LLMで再分析すべきか
+
+        組み込み分析の信頼度が閾値未満のメッセージが対象。「了解です」のような
+        短い定型メッセージも信頼度が低くなるため、min_chars未満の本文は対象外とする。
+        """
+        return analysis.confidence_score < self.threshold and len(body) >= self.min_chars
+
+    async def refine(self, body: str, builtin: MessageAnalysis, now: datetime) -> MessageAnalysis:
+        """LLMで再分析（予算内に結果が得られない場合は組み込み分析の結果）"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((body, builtin, now, future))
+        self.escalated += 1
+
+        if len(self._queue) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_wait, self._flush)
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), self.latency_budget)
+        except asyncio.TimeoutError:
+            # 未送信のバッチからは除外され、送信済みの場合は届いた結果が破棄される
+            future.cancel()
+            self.fallback_timeout += 1
+            logger.warning(f"LLM analysis exceeded latency budget ({self.latency_budget}s), using builtin result")
+            return builtin
+
+        if result is None:
+            self.fallback_error += 1
+            return builtin
+
+        self.refined += 1
+        return result
+
+    def _flush(self):
+        """溜まったメッセージを基準日ごとにbatch_size件ずつリクエストとして送信"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        queue, self._queue = self._queue, []
+        # 期限の「今日」「明日」はバッチの基準日から計算されるため、日付をまたぐメッセージは分ける
+        by_date: Dict[date, List[Tuple[str, MessageAnalysis, datetime, asyncio.Future]]] = {}
+        for item in queue:
+            by_date.setdefault(item[2].date(), []).append(item)
+
+        for items in by_date.values():
+            for start in range(0, len(items), self.batch_size):
+                task = asyncio.create_task(self._send(items[start:start + self.batch_size]))
+                self._requests.add(task)
+                task.add_done_callback(self._requests.discard)
+
+    async def _send(self, batch: List[Tuple[str, MessageAnalysis, datetime, asyncio.Future]]):
+        """1回のリクエストで複数メッセージを分析し、各呼び出し元に結果を返す"""
+        results: Dict[int, Dict[str, Any]] = {}
+
+        async with self._semaphore:
+            # 同時リクエスト数の上限で待つ間に予算を超えた呼び出し元の分は送らない
+            batch = [item for item in batch if not item[3].done()]
+            if not batch:
+                return
+
+            self.in_flight += 1
+            started = time.monotonic()
+            try:
+                prompt = build_batch_prompt([body for body, *_ in batch], batch[0][2])
+                text = await asyncio.wait_for(
+                    self.provider.complete(SYSTEM_PROMPT, prompt), timeout=self.request_timeout
+                )
+                results = parse_batch_response(text)
+            except Exception as e:
+                logger.error(f"LLM analysis request failed ({self.provider.name}): {e}")
+            finally:
+                self.in_flight -= 1
+                self.batches += 1
+                self.batched_messages += len(batch)
+                self.total_latency += time.monotonic() - started
+
+        for index, (_, builtin, _, future) in enumerate(batch):
+            if future.done():
+                continue
+            try:
+                future.set_result(merge_llm_result(builtin, results[index]) if index in results else None)
+            except Exception as e:
+                logger.error(f"Invalid LLM analysis result: {e}")
+                future.set_result(None)
+
+    def get_status(self) -> Dict[str, Any]:
+        """エスカレーションの統計を取得"""
+        return {
+            "provider": self.provider.name,
+            "threshold": self.threshold,
+            "escalated": self.escalated,
+            "refined": self.refined,
+            "fallback_timeout": self.fallback_timeout,
+            "fallback_error": self.fallback_error,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_messages / self.batches, 2) if self.batches else None,
+            "avg_latency_ms": round(self.total_latency / self.batches * 1000, 1) if self.batches else None,
+            "in_flight": self.in_flight
+        }
+
+
+def create_llm_escalator(config) -> Optional[LLMEscalator]:
+    """設定に応じたLLMエスカレーターを生成（builtinの場合やSDKがない場合はNone）"""
+    provider_name = getattr(config, "ai_provider", "builtin")
+    if provider_name == "builtin":
+        return None
+
+    try:
+        if provider_name == "openai":
+            provider = OpenAIProvider(
+                config.openai_api_key, config.llm_model or "gpt-3.5-turbo", config.llm_base_url
+            )
+        elif provider_name == "anthropic":
+            provider = AnthropicProvider(config.anthropic_api_key, config.llm_model or "claude-2.1")
+        else:
+            raise ValueError(f"Unknown AI provider: {provider_name}")
+    except ImportError as e:
+        logger.error(f"AI provider '{provider_name}' is not available, using builtin analysis: {e}")
+        return None
+
+    return LLMEscalator(
+        provider,
+        threshold=config.llm_escalation_threshold,
+        min_chars=config.llm_escalation_min_chars,
+        batch_size=config.llm_batch_size,
+        batch_wait=config.llm_batch_wait_ms / 1000,
+        max_concurrency=config.llm_max_concurrency,
+        latency_budget=config.llm_latency_budget_seconds
+    )
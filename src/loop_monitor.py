@@ -0,0 +1,55 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopLagMonitor:
+    """イベントループの遅延を計測
+
+    一定間隔でスリープし、予定した起床時刻からの遅れを遅延として記録する。
+    CPU負荷の高い処理がループを占有していると遅延が大きくなる。
+    """
+
+    def __init__(self, interval: float = 0.5, window: int = 240):
+        self.interval = interval
+        self.samples: deque = deque(maxlen=window)  # 直近の遅延（秒）
+        self.max_lag = 0.0  # 起動後の最大遅延（秒）
+        self.is_running = False
+
+    async def run(self):
+        """計測ループ"""
+        self.is_running = True
+        while self.is_running:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(time.monotonic() - started - self.interval, 0.0)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+            if lag >= 1.0:
+                logger.warning(f"Event loop blocked for {lag:.2f}s")
+
+    def stop(self):
+        """計測を停止"""
+        self.is_running = False
+
+    def get_status(self) -> Dict[str, Any]:
+        """直近の遅延の統計（ミリ秒）"""
+        samples = sorted(self.samples)
+
+        def to_ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "interval_ms": to_ms(self.interval),
+            "samples": len(samples),
+            "last_ms": to_ms(self.samples[-1] if self.samples else None),
+            "avg_ms": to_ms(sum(samples) / len(samples) if samples else None),
+            "p95_ms": to_ms(samples[min(int(len(samples) * 0.95), len(samples) - 1)] if samples else None),
+            "max_recent_ms": to_ms(samples[-1] if samples else None),
+            "max_ms": to_ms(self.max_lag)
+        }
@@ -1,13 +1,23 @@
 import asyncio
+import itertools
 import logging
-from typing import Dict, List, Optional
+import time
+from collections import defaultdict, deque
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 
-from .chatwork_api import ChatWorkAPI
-from .task_analyzer import TaskAnalyzer
+from .chatwork_api import ChatWorkAPI, ChatWorkMessage
+from .task_analyzer import TaskAnalyzer, MessageAnalysis
+from .llm_provider import create_llm_escalator
 from .alert_system import AlertSystem
+from .outbound_queue import OutboundMessageQueue
+from .storage import create_store
+from .dedupe import TimeBucketedDedupe
+from .loop_monitor import EventLoopLagMonitor
+from .event_log import DashboardEventLog, NEW_MESSAGE, ROOM_STATE, STATUS_TICK
+from .room_scheduler import RoomActivityTracker, AdaptiveRoomScheduler, PollTier
 from .config import Config
 
 # 環境変数を読み込み
@@ -26,12 +36,48 @@ class ChatWorkAIManager:
     
     def __init__(self, config: Optional[Config] = None):
         self.config = config or Config()
-        self.chatwork_api = ChatWorkAPI(self.config.chatwork_token)
-        self.task_analyzer = TaskAnalyzer(self.config)
-        self.alert_system = AlertSystem(self.chatwork_api, self.config)
+        self.store = create_store(self.config)
+        self.events = DashboardEventLog()  # ダッシュボードに配信する差分イベント
+        self.chatwork_api = ChatWorkAPI(
+            self.config.chatwork_token,
+            max_rate_limit_retries=self.config.rate_limit_max_retries,
+            delta_polling=self.config.delta_polling,
+            full_reconcile_interval=self.config.full_reconcile_interval,
+            store=self.store,
+            metadata_ttls={
+                "rooms": self.config.rooms_cache_ttl_seconds,
+                "contacts": self.config.contacts_cache_ttl_seconds,
+                "members": self.config.members_cache_ttl_seconds
+            },
+            events=self.events
+        )
+        self.task_analyzer = TaskAnalyzer(self.config, self.store, create_llm_escalator(self.config))
+        self.outbound_queue = OutboundMessageQueue(
+            self.chatwork_api,
+            delivery_enabled=self.config.alert_delivery_enabled,
+            rate_reserve=self.config.outbound_rate_reserve,
+            max_attempts=self.config.outbound_max_attempts,
+            store=self.store
+        )
+        self.alert_system = AlertSystem(
+            self.chatwork_api, self.config, self.store, self.outbound_queue, self.events
+        )
+        self.activity_tracker = RoomActivityTracker(self.config.full_reconcile_interval)
+        self.room_scheduler = None
+        if self.config.adaptive_polling:
+            tiers = {
+                category: PollTier(*intervals)
+                for category, intervals in (self.config.poll_tiers or {}).items()
+            }
+            self.room_scheduler = AdaptiveRoomScheduler(tiers)
         self.is_running = False
-        self.processed_messages = set()
-        self.processed_message_details = []  # 処理済みメッセージの詳細を保存
+        self.processed_messages = TimeBucketedDedupe(self.config.processed_message_ttl_hours * 3600)
+        # 処理済みメッセージの詳細を連番付きで最新100件まで保存
+        self.processed_message_details: deque = deque(maxlen=100)
+        self._processed_detail_seq = itertools.count(1)
+        self.last_poll_cycle: Optional[Dict] = None  # 直近のポーリングサイクルの計測結果
+        self._room_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self.loop_monitor = EventLoopLagMonitor()
         
         logger.info("ChatWork AI Manager initialized")
     
@@ -40,11 +86,18 @@ class ChatWorkAIManager:
         self.is_running = True
         logger.info("Starting ChatWork AI Manager...")
         
+        # 永続化された状態から再開
+        await self.store.open()
+        await self.restore_state()
+        
         # 複数のタスクを並行実行
         tasks = [
             self.monitor_messages(),
             self.alert_system.start_scheduler(),
-            self.periodic_cleanup()
+            self.outbound_queue.run(),
+            self.periodic_cleanup(),
+            self.publish_status_ticks(),
+            self.loop_monitor.run()
         ]
         
         try:
@@ -57,8 +110,25 @@ class ChatWorkAIManager:
         """AIマネージャーを停止"""
         self.is_running = False
         await self.alert_system.stop()
+        self.outbound_queue.stop()
+        self.loop_monitor.stop()
+        self.task_analyzer.shutdown()
+        await self.store.close()
         logger.info("ChatWork AI Manager stopped")
     
+    async def restore_state(self):
+        """永続化された状態を読み込み"""
+        try:
+            await self.chatwork_api.restore_state()
+            await self.alert_system.restore_state()
+            await self.outbound_queue.restore_state()
+            await self.task_analyzer.restore_state()
+            self.processed_messages.update((await self.store.load("processed_messages")).items())
+            self._evict_processed_messages()
+            logger.info(f"Restored {len(self.processed_messages)} processed message IDs")
+        except Exception as e:
+            logger.error(f"Error restoring state: {e}")
+    
     async def monitor_messages(self):
         """リアルタイムメッセージ監視ループ"""
         logger.info("Starting message monitoring...")
@@ -66,48 +136,220 @@ class ChatWorkAIManager:
         while self.is_running:
             try:
                 # 監視対象ルームのメッセージを取得
-                for room_id in self.config.monitored_rooms:
-                    await self._check_room_messages(room_id)
+                room_ids = await self._select_rooms_for_cycle()
+                if room_ids:
+                    await self._poll_rooms(room_ids)
                 
                 # 監視間隔待機
-                await asyncio.sleep(self.config.monitoring_interval)
+                await asyncio.sleep(self._next_cycle_delay())
                 
             except Exception as e:
                 logger.error(f"Error in message monitoring: {e}")
                 await asyncio.sleep(self.config.error_retry_interval)
     
+    async def _select_rooms_for_cycle(self) -> List[str]:
+        """今回のサイクルでメッセージを取得するルームを選択"""
+        room_ids = list(self.config.monitored_rooms)
+        rooms = None
+        
+        if self.room_scheduler:
+            # 新しく監視対象になったルームはカテゴリを判定してスケジューラーに登録
+            categories = None
+            if any(room_id not in self.room_scheduler.rooms for room_id in room_ids):
+                rooms = await self.chatwork_api.get_rooms(use_cache=False)
+                room_info = {str(room["room_id"]): room for room in rooms}
+                categories = {
+                    room_id: self.chatwork_api._determine_room_category(room_info[room_id])
+                    for room_id in room_ids if room_id in room_info
+                }
+            self.room_scheduler.sync_rooms(room_ids, categories)
+            
+            # ポーリング時刻に達したルームのみ取得対象にする
+            room_ids = self.room_scheduler.pop_due()
+        
+        # Webhookで受信しているルームは照合間隔ごとにのみ取得する
+        if self.config.webhook_rooms:
+            skipped = [room_id for room_id in room_ids if not self._is_webhook_reconcile_due(room_id)]
+            if skipped:
+                room_ids = [room_id for room_id in room_ids if room_id not in skipped]
+                if self.room_scheduler:
+                    for room_id in skipped:
+                        self.room_scheduler.record_poll(room_id, active=False)
+        
+        if not room_ids:
+            return []
+        
+        if not self.config.activity_driven_polling:
+            return room_ids
+        
+        # ルーム一覧を1回だけ取得し、更新のあったルームのみ取得対象にする
+        if rooms is None:
+            rooms = await self.chatwork_api.get_rooms(use_cache=False)
+        if not rooms:
+            # ルーム一覧を取得できない場合は全ルームをチェック
+            return room_ids
+        
+        selected = self.activity_tracker.select_rooms(room_ids, rooms)
+        logger.info(f"{len(selected)}/{len(room_ids)} monitored rooms changed since last check")
+        
+        if self.room_scheduler:
+            # 更新のなかったルームはアイドルとして間隔を延ばす
+            for room_id in set(room_ids) - set(selected):
+                self.room_scheduler.record_poll(room_id, active=False)
+        
+        return selected
+    
+    def _is_webhook_reconcile_due(self, room_id: str) -> bool:
+        """Webhook受信ルームの照合ポーリングが必要か判定"""
+        if room_id not in self.config.webhook_rooms:
+            return True
+        
+        last_polled = self.activity_tracker.last_polled.get(room_id)
+        return last_polled is None or time.monotonic() - last_polled >= self.config.webhook_reconcile_interval
+    
+    def _next_cycle_delay(self) -> float:
+        """次のポーリングサイクルまでの待機秒数"""
+        if not self.room_scheduler:
+            return self.config.monitoring_interval
+        
+        # 次にポーリング時刻を迎えるルームまで待機（監視対象の追加に備えて上限あり）
+        next_due_in = self.room_scheduler.next_due_in()
+        if next_due_in is None:
+            return self.config.monitoring_interval
+        return min(max(next_due_in, 1.0), self.config.monitoring_interval)
+    
+    async def _poll_rooms(self, room_ids: List[str]):
+        """ルームを並行数の上限付きでチェック"""
+        concurrency = max(1, self.config.polling_concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        room_times: Dict[str, float] = {}
+        
+        async def check(room_id: str):
+            async with semaphore:
+                started = time.monotonic()
+                try:
+                    await self._check_room_messages(room_id)
+                except Exception as e:
+                    # 1ルームの失敗が他のルームに影響しないようにする
+                    logger.error(f"Error polling room {room_id}: {e}")
+                finally:
+                    room_times[room_id] = time.monotonic() - started
+        
+        cycle_started = time.monotonic()
+        await asyncio.gather(*(check(room_id) for room_id in room_ids))
+        wall_time = time.monotonic() - cycle_started
+        sum_room_time = sum(room_times.values())
+        
+        self.last_poll_cycle = {
+            "rooms": len(room_ids),
+            "concurrency": concurrency,
+            "wall_time": round(wall_time, 3),
+            "sum_room_time": round(sum_room_time, 3),
+            "speedup": round(sum_room_time / wall_time, 2) if wall_time > 0 else None,
+            "slowest_room": max(room_times, key=room_times.get) if room_times else None,
+            "completed_at": datetime.now().isoformat()
+        }
+        
+        logger.info(f"Polled {len(room_ids)} rooms in {wall_time:.2f}s "
+                    f"(sum of room times {sum_room_time:.2f}s, concurrency={concurrency})")
+    
     async def _check_room_messages(self, room_id: str):
         """特定ルームのメッセージをチェック（削除検出機能付き）"""
-        try:
-            # 最新メッセージを取得（force=1で強制更新、削除検出も実行）
-            all_messages = await self.chatwork_api.get_messages(room_id, force=1)
-            
-            # 新しいメッセージのみを取得
-            new_messages = await self.chatwork_api.get_new_messages(room_id)
-            
-            for message in new_messages:
-                message_id = f"{room_id}_{message.message_id}"
-                
-                # 既に処理済みの場合はスキップ
-                if message_id in self.processed_messages:
-                    continue
+        # 同一ルームのチェックは直列化してメッセージの処理順序を保つ
+        async with self._room_locks[room_id]:
+            processed_count = 0
+            reply_needed = False
+            try:
+                # 1回の取得で削除検出・キャッシュ更新・新着抽出をまとめて行う
+                new_messages = await asyncio.wait_for(
+                    self.chatwork_api.get_new_messages(room_id),
+                    timeout=self.config.room_check_timeout
+                )
+                # 取得に失敗した場合（例外）は記録せず、次のサイクルで再度選択されるようにする
+                self.activity_tracker.mark_polled(room_id)
                 
-                # メッセージを処理
-                await self.process_message(message)
-                self.processed_messages.add(message_id)
+                # 既に処理済みのメッセージはスキップ
+                new_messages = [
+                    message for message in new_messages
+                    if f"{room_id}_{message.message_id}" not in self.processed_messages
+                ]
                 
-                logger.info(f"Processed message {message_id} in room {room_id}")
+                # 新着をまとめて分析（件数が多い場合はプロセスプールで実行される）
+                analyses = await self.task_analyzer.analyze_many(new_messages) if new_messages else []
                 
-        except Exception as e:
-            logger.error(f"Error checking room {room_id}: {e}")
+                for message, analysis in zip(new_messages, analyses):
+                    message_id = f"{room_id}_{message.message_id}"
+                    
+                    # メッセージを処理
+                    analysis = await self.process_message(message, analysis)
+                    self._mark_processed(message_id)
+                    processed_count += 1
+                    if analysis and analysis.requires_reply:
+                        reply_needed = True
+                    
+                    logger.info(f"Processed message {message_id} in room {room_id}")
+                    
+            except asyncio.TimeoutError:
+                logger.warning(f"Timed out fetching messages for room {room_id}")
+            except Exception as e:
+                logger.error(f"Error checking room {room_id}: {e}")
+            finally:
+                if self.room_scheduler:
+                    self.room_scheduler.record_poll(room_id, active=processed_count > 0, hot=reply_needed)
+                self._publish_room_state(room_id, processed_count, reply_needed)
+    
+    def _publish_room_state(self, room_id: str, processed_count: int, reply_needed: bool):
+        """ルームのポーリング結果をダッシュボードに通知
+        
+        ポーリングのたびに発行され次の結果で置き換わるため、再送用のログには残さない。
+        """
+        schedule = self.room_scheduler.rooms.get(room_id) if self.room_scheduler else None
+        self.events.publish(ROOM_STATE, {
+            "room_id": room_id,
+            "processed": processed_count,
+            "reply_needed": reply_needed,
+            "polled_at": datetime.now().isoformat(),
+            "interval": schedule.interval if schedule else None
+        }, transient=True)
     
-    async def process_message(self, message):
-        """個別メッセージの処理"""
+    async def handle_webhook_message(self, message: ChatWorkMessage) -> bool:
+        """Webhookで受信したメッセージを処理（処理した場合はTrue）"""
+        room_id = message.room_id
+        
+        async with self._room_locks[room_id]:
+            message_id = f"{room_id}_{message.message_id}"
+            if message_id in self.processed_messages:
+                return False
+            
+            # Webhookには送信者名が含まれないため、キャッシュ済みのメッセージから補完
+            for cached in self.chatwork_api.cached_messages.get(room_id, {}).values():
+                if cached.account.account_id == message.account.account_id:
+                    message.account = cached.account
+                    break
+            
+            self.chatwork_api.record_pushed_message(message)
+            await self.process_message(message)
+            self._mark_processed(message_id)
+            
+            logger.info(f"Processed webhook message {message_id} in room {room_id}")
+            return True
+    
+    def _mark_processed(self, message_id: str):
+        """処理済みとして記録"""
+        self.processed_messages.add(message_id)
+        self.store.put("processed_messages", message_id, time.time())
+    
+    async def process_message(self, message, analysis: Optional[MessageAnalysis] = None) -> Optional[MessageAnalysis]:
+        """個別メッセージの処理（分析結果を返す。分析済みの場合はanalysisを渡す）"""
         try:
             logger.info(f"Processing message from {message.account.name}")
             
+            # 返信にあたるメッセージは対応する未処理アラートを解決
+            self.alert_system.resolve_replies(message)
+            
             # AI分析でタスク抽出
-            analysis = await self.task_analyzer.analyze(message)
+            if analysis is None:
+                analysis = await self.task_analyzer.analyze(message)
             
             logger.info(f"Analysis result: requires_reply={analysis.requires_reply}, "
                        f"tasks={len(analysis.tasks)}, priority={analysis.priority}")
@@ -135,11 +377,18 @@ class ChatWorkAIManager:
                     "summary": analysis.summary
                 }
             }
-            self.processed_message_details.append(message_detail)
+            self.processed_message_details.append((next(self._processed_detail_seq), message_detail))
             
-            # 最新100件のみ保持（メモリ効率のため）
-            if len(self.processed_message_details) > 100:
-                self.processed_message_details = self.processed_message_details[-100:]
+            self.events.publish(NEW_MESSAGE, {
+                "room_id": message.room_id,
+                "message_id": message.message_id,
+                "sender": message.account.name,
+                "body": message.body[:100] + ("..." if len(message.body) > 100 else ""),
+                "timestamp": message.send_time,
+                "priority": analysis.priority,
+                "requires_reply": analysis.requires_reply,
+                "message": self.chatwork_api.read_model.latest_item(message)
+            })
             
             # 返信が必要な場合はアラートシステムに登録
             if analysis.requires_reply:
@@ -152,9 +401,12 @@ class ChatWorkAIManager:
             # 高優先度の場合は即座に通知（現在は無効化）
             # if analysis.priority == "high":
             #     await self._send_immediate_notification(message, analysis)
+            
+            return analysis
                 
         except Exception as e:
             logger.error(f"Error processing message: {e}")
+            return None
     
     async def _create_tasks_from_analysis(self, message, analysis):
         """分析結果からタスクを自動作成"""
@@ -193,14 +445,9 @@ class ChatWorkAIManager:
         while self.is_running:
             try:
                 # 古い処理済みメッセージIDを削除（メモリ効率化）
-                current_time = datetime.now()
-                cutoff_time = current_time - timedelta(hours=24)
+                evicted = self._evict_processed_messages()
                 
-                # 実際の実装では、メッセージIDに時刻情報を含めるか、
-                # 別途タイムスタンプを管理する必要があります
-                # ここでは簡略化
-                
-                logger.info("Performed periodic cleanup")
+                logger.info(f"Performed periodic cleanup (evicted {evicted} processed message IDs)")
                 
                 # 1時間ごとにクリーンアップ
                 await asyncio.sleep(3600)
@@ -209,20 +456,65 @@ class ChatWorkAIManager:
                 logger.error(f"Error in periodic cleanup: {e}")
                 await asyncio.sleep(3600)
     
+    async def publish_status_ticks(self):
+        """ダッシュボードの接続中に定期的にステータスを配信"""
+        while self.is_running:
+            try:
+                await asyncio.sleep(self.config.status_tick_seconds)
+                if self.events.has_subscribers:
+                    self.events.publish(STATUS_TICK, await self.get_dashboard_status(), transient=True)
+            except Exception as e:
+                logger.error(f"Error publishing status: {e}")
+    
+    def _evict_processed_messages(self) -> int:
+        """保持期間を過ぎた処理済みメッセージIDを破棄"""
+        evicted = self.processed_messages.evict()
+        for message_id in evicted:
+            self.store.delete("processed_messages", message_id)
+        return len(evicted)
+    
     async def get_status(self) -> Dict:
         """システムステータスを取得"""
         return {
             "is_running": self.is_running,
             "processed_messages_count": len(self.processed_messages),
+            "processed_messages_memory": self.processed_messages.get_status(),
             "monitored_rooms": len(self.config.monitored_rooms),
             "pending_alerts": await self.alert_system.get_pending_count(),
+            "outbound_queue": self.outbound_queue.get_status(),
+            "rate_limit": self.chatwork_api.rate_limiter.get_status(),
+            "metadata_cache": self.chatwork_api.metadata_cache.get_status(),
+            "storage": self.store.get_status(),
+            "read_model": self.chatwork_api.read_model.get_status(),
+            "analysis": self.task_analyzer.get_status(),
+            "event_loop_lag": self.loop_monitor.get_status(),
+            "events": self.events.get_status(),
+            "last_poll_cycle": self.last_poll_cycle,
+            "room_intervals": self.room_scheduler.get_status() if self.room_scheduler else None,
             "last_check": datetime.now().isoformat()
         }
     
+    async def get_dashboard_status(self) -> Dict:
+        """ダッシュボード用のステータス（システム状態とアラートのサマリー）"""
+        status = await self.get_status()
+        return {
+            "system": status,
+            "alerts": self.alert_system.build_summary(),
+            "timestamp": status["last_check"]
+        }
+    
     async def get_processed_messages(self, limit: int = 50) -> List[Dict]:
         """処理済みメッセージの詳細を取得"""
-        # 最新のメッセージから返す
-        return self.processed_message_details[-limit:][::-1]
+        return [detail for _, detail in self.page_processed_messages(limit)]
+    
+    def page_processed_messages(self, limit: int = 50, before: Optional[int] = None) -> List[Tuple[int, Dict]]:
+        """処理済みメッセージの (連番, 詳細) を新しい順に最大limit件取得（beforeより前の連番のみ）"""
+        details = self.processed_message_details
+        if not details or limit <= 0:
+            return []
+        # 連番は連続しているため先頭の連番との差で位置が決まる
+        end = len(details) if before is None else min(max(before - details[0][0], 0), len(details))
+        return [details[i] for i in range(end - 1, max(end - limit, 0) - 1, -1)]
     
     async def manual_check_room(self, room_id: str) -> Dict:
         """特定ルームの手動チェック"""
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# リソースごとの既定の有効期間（秒）
+DEFAULT_TTLS = {
+    "rooms": 30,
+    "contacts": 300,
+    "members": 120
+}
+
+
+def _retrieve_exception(task: asyncio.Task):
+    """待機者が全員キャンセルされた場合に、失敗したリクエストの例外が未回収として報告されないようにする"""
+    if not task.cancelled():
+        task.exception()
+
+
+class MetadataCache:
+    """ルーム一覧・コンタクト・メンバーなどのメタデータのTTL付きキャッシュ
+
+    同じキーを同時に要求した呼び出し元は1回のリクエストの結果を共有する。
+    invalidateした時点で実行中だったリクエストの結果と、失敗したリクエストの
+    結果はキャッシュに保存しない。
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None):
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._entries: Dict[Tuple[str, str], Tuple[float, Any]] = {}  # (リソース, キー) -> (期限, 値)
+        self._in_flight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._generations: Dict[Tuple[str, str], int] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    async def get(self, resource: str, key: str, fetch: Callable[[], Awaitable[Any]], fresh: bool = False) -> Any:
+        """キャッシュから取得（期限切れ・未取得・freshの場合はfetchで取得）"""
+        cache_key = (resource, key)
+        stats = self._stats.setdefault(resource, {"hits": 0, "misses": 0, "coalesced": 0, "invalidations": 0})
+
+        if not fresh:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] > time.monotonic():
+                stats["hits"] += 1
+                return entry[1]
+
+            task = self._in_flight.get(cache_key)
+            if task is not None:
+                stats["coalesced"] += 1
+                return await asyncio.shield(task)
+
+        stats["misses"] += 1
+        # 世代はタスクの開始前にinvalidateされても検出できるよう、ここで確定する
+        generation = self._generations.get(cache_key, 0)
+        task = asyncio.ensure_future(self._fetch(cache_key, fetch, generation))
+        task.add_done_callback(_retrieve_exception)
+        self._in_flight[cache_key] = task
+        # 呼び出し元がキャンセルされても他の待機者のためにリクエストは継続する
+        return await asyncio.shield(task)
+
+    async def _fetch(self, cache_key: Tuple[str, str], fetch: Callable[[], Awaitable[Any]], generation: int) -> Any:
+        try:
+            value = await fetch()
+            if self._generations.get(cache_key, 0) == generation:
+                self._entries[cache_key] = (time.monotonic() + self.ttls.get(cache_key[0], 0), value)
+            return value
+        finally:
+            if self._in_flight.get(cache_key) is asyncio.current_task():
+                del self._in_flight[cache_key]
+
+    def invalidate(self, resource: str, key: Optional[str] = None):
+        """キャッシュを破棄（keyを省略した場合はリソースの全キー）"""
+        keys = [
+            cache_key for cache_key in set(self._entries) | set(self._in_flight)
+            if cache_key[0] == resource and (key is None or cache_key[1] == key)
+        ]
+        if key is not None and (resource, key) not in keys:
+            keys.append((resource, key))
+
+        for cache_key in keys:
+            self._entries.pop(cache_key, None)
+            self._in_flight.pop(cache_key, None)
+            self._generations[cache_key] = self._generations.get(cache_key, 0) + 1
+
+        self._stats.setdefault(resource, {"hits": 0, "misses": 0, "coalesced": 0, "invalidations": 0})
+        self._stats[resource]["invalidations"] += 1
+
+    def get_status(self) -> Dict[str, Any]:
+        """リソースごとのヒット・ミス数を取得"""
+        status = {}
+        for resource, stats in self._stats.items():
+            lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+            status[resource] = {
+                **stats,
+                "entries": sum(1 for cache_key in self._entries if cache_key[0] == resource),
+                "ttl_seconds": self.ttls.get(resource),
+                "hit_rate": round((stats["hits"] + stats["coalesced"]) / lookups, 3) if lookups else None
+            }
+        return status
@@ -0,0 +1,209 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Dict, List, Any, Optional, Tuple
+from dataclasses import dataclass, asdict
+
+from .dedupe import TimeBucketedDedupe
+from .storage import StateStore
+
+logger = logging.getLogger(__name__)
+
+# 永続化に使う名前空間
+QUEUE_NAMESPACE = "outbound_queue"
+SENT_NAMESPACE = "outbound_sent"
+
+# 優先度ごとの送信順（小さいほど先に送信）
+PRIORITY_RANKS = {"high": 0, "normal": 1, "low": 2}
+
+
+@dataclass
+class OutboundMessage:
+    """送信待ちのメッセージ"""
+    key: str  # 冪等キー（同じキーのメッセージは1回だけ送信される）
+    room_id: str
+    body: str
+    priority: str = "normal"
+    enqueued_at: float = 0.0
+    attempts: int = 0
+    not_before: float = 0.0  # 再試行を待機している場合の送信可能時刻
+
+
+class OutboundMessageQueue:
+    """優先度付き・レート制限考慮の送信キュー
+
+    メッセージは優先度順（同じ優先度は追加順）に1件ずつ送信する。高優先度以外の
+    メッセージはレート制限の残りがrate_reserve未満の間は送信を控え、ポーリングの
+    ための枠を残す。送信に失敗したメッセージは間隔を延ばしながらmax_attempts回まで
+    再試行する。送信済みの冪等キーは一定期間記録し、同じキーの再追加や再起動後の
+    再送を防ぐ。delivery_enabledがFalseの場合は送信せずにログへ出力する。
+    """
+
+    def __init__(self, chatwork_api, delivery_enabled: bool = False, rate_reserve: int = 30,
+                 max_attempts: int = 5, store: Optional[StateStore] = None,
+                 sent_ttl_seconds: int = 86400):
+        self.chatwork_api = chatwork_api
+        self.delivery_enabled = delivery_enabled
+        self.rate_reserve = rate_reserve
+        self.max_attempts = max(1, max_attempts)
+        self.store = store or StateStore()
+        self._messages: Dict[str, OutboundMessage] = {}
+        self._ready: List[Tuple[int, int, str]] = []  # (優先度順, 追加順, キー)
+        self._delayed: List[Tuple[float, int, str]] = []  # (送信可能時刻, 追加順, キー)
+        self._sent = TimeBucketedDedupe(sent_ttl_seconds)
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self.is_running = False
+        self.sent_count = 0
+        self.failed_count = 0
+        self.duplicate_count = 0
+        self.retry_count = 0
+
+    def enqueue(self, room_id: str, body: str, priority: str = "normal", key: Optional[str] = None) -> bool:
+        """メッセージを追加（同じキーが送信済み・送信待ちの場合は追加せずFalse）"""
+        key = key or f"{room_id}:{time.time_ns()}"
+        if key in self._messages or key in self._sent:
+            self.duplicate_count += 1
+            logger.info(f"Skipped duplicate outbound message {key}")
+            return False
+
+        message = OutboundMessage(
+            key=key,
+            room_id=room_id,
+            body=body,
+            priority=priority if priority in PRIORITY_RANKS else "normal",
+            enqueued_at=time.time()
+        )
+        self._push(message)
+        self.store.put(QUEUE_NAMESPACE, key, asdict(message))
+        return True
+
+    def _push(self, message: OutboundMessage):
+        """送信待ちに登録（再試行待ちの場合は待機用のヒープに入れる）"""
+        self._messages[message.key] = message
+        if message.not_before > time.time():
+            heapq.heappush(self._delayed, (message.not_before, next(self._sequence), message.key))
+        else:
+            heapq.heappush(self._ready, (PRIORITY_RANKS[message.priority], next(self._sequence), message.key))
+        self._wakeup.set()
+
+    async def restore_state(self):
+        """永続化された送信待ちメッセージと送信済みキーを読み込み"""
+        self._sent.update((await self.store.load(SENT_NAMESPACE)).items())
+        for key in self._sent.evict():
+            self.store.delete(SENT_NAMESPACE, key)
+
+        records = await self.store.load(QUEUE_NAMESPACE)
+        for key, record in sorted(records.items(), key=lambda item: item[1].get("enqueued_at", 0)):
+            if key in self._sent:
+                # 送信後、キューから削除される前に停止した
+                self.store.delete(QUEUE_NAMESPACE, key)
+                continue
+            try:
+                self._push(OutboundMessage(**record))
+            except Exception as e:
+                logger.error(f"Error restoring outbound message {key}: {e}")
+                self.store.delete(QUEUE_NAMESPACE, key)
+
+        logger.info(f"Restored {len(self._messages)} outbound messages")
+
+    async def run(self):
+        """送信ループ"""
+        self.is_running = True
+        while self.is_running:
+            try:
+                self._promote_delayed()
+                wait = self._seconds_until_sendable()
+                if wait > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=wait if wait != float("inf") else None)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                _, _, key = heapq.heappop(self._ready)
+                await self._deliver(self._messages[key])
+
+            except Exception as e:
+                logger.error(f"Error in outbound queue: {e}")
+                await asyncio.sleep(1)
+
+    def stop(self):
+        """送信ループを停止"""
+        self.is_running = False
+        self._wakeup.set()
+
+    def _promote_delayed(self):
+        """送信可能時刻に達した再試行待ちのメッセージを送信待ちに戻す"""
+        now = time.time()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, sequence, key = heapq.heappop(self._delayed)
+            message = self._messages[key]
+            heapq.heappush(self._ready, (PRIORITY_RANKS[message.priority], sequence, key))
+
+    def _seconds_until_sendable(self) -> float:
+        """先頭のメッセージを送信できるまでの秒数（0なら即時、送信待ちがない場合はinf）"""
+        wait = self._delayed[0][0] - time.time() if self._delayed else float("inf")
+        if not self._ready:
+            return max(wait, 0.0)
+
+        rank = self._ready[0][0]
+        if rank == PRIORITY_RANKS["high"]:
+            return 0.0
+
+        # 高優先度以外はポーリング用の枠を残してから送信
+        limiter = self.chatwork_api.rate_limiter
+        shortage = self.rate_reserve - limiter.available()
+        if shortage <= 0:
+            return 0.0
+        return min(wait, max(shortage / limiter.refill_rate, 0.1))
+
+    async def _deliver(self, message: OutboundMessage):
+        """1件送信し、失敗した場合は再試行を予約"""
+        try:
+            if self.delivery_enabled:
+                await self.chatwork_api.send_message(message.room_id, message.body)
+            else:
+                logger.info(f"Outbound message generated (not sent): {message.body[:100]}...")
+        except Exception as e:
+            message.attempts += 1
+            if message.attempts >= self.max_attempts:
+                logger.error(f"Giving up outbound message {message.key} after {message.attempts} attempts: {e}")
+                del self._messages[message.key]
+                self.store.delete(QUEUE_NAMESPACE, message.key)
+                self.failed_count += 1
+                return
+
+            delay = min(5 * 2 ** message.attempts, 300)
+            logger.warning(f"Failed to send outbound message {message.key}, retrying in {delay}s: {e}")
+            message.not_before = time.time() + delay
+            self.retry_count += 1
+            self._push(message)
+            self.store.put(QUEUE_NAMESPACE, message.key, asdict(message))
+            return
+
+        # 送信済みキーを先に記録してから送信待ちから外す
+        sent_at = time.time()
+        self._sent.add(message.key, sent_at)
+        self.store.put(SENT_NAMESPACE, message.key, sent_at)
+        del self._messages[message.key]
+        self.store.delete(QUEUE_NAMESPACE, message.key)
+        self.sent_count += 1
+
+        for key in self._sent.evict():
+            self.store.delete(SENT_NAMESPACE, key)
+
+    def get_status(self) -> Dict[str, Any]:
+        """送信キューの状態を取得"""
+        return {
+            "delivery_enabled": self.delivery_enabled,
+            "queued": len(self._messages),
+            "waiting_retry": len(self._delayed),
+            "sent": self.sent_count,
+            "failed": self.failed_count,
+            "retries": self.retry_count,
+            "duplicates": self.duplicate_count
+        }
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Mapping, Optional
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """ChatWork APIのレート制限ヘッダーに追従する非同期トークンバケット
+
+    ChatWork APIは5分間あたりのリクエスト数を制限しており、各レスポンスの
+    x-ratelimit-limit / x-ratelimit-remaining / x-ratelimit-reset ヘッダーで
+    現在の残量を返す。ローカルのバケットでリクエストを送信前に平準化し、
+    ヘッダーの値でバケットを補正することで429を出さずに枠を使い切る。
+    """
+
+    def __init__(self, limit: int = 300, window_seconds: int = 300):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.tokens = float(limit)
+        self.remaining: Optional[int] = None  # サーバーが返した残りリクエスト数
+        self.reset_at: Optional[float] = None  # 制限がリセットされるUNIX時刻
+        self.rate_limited_count = 0
+        self.waited_seconds = 0.0
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def refill_rate(self) -> float:
+        """1秒あたりのトークン補充量"""
+        return self.limit / self.window_seconds
+
+    async def acquire(self):
+        """リクエスト1回分のトークンを取得（不足時は待機）"""
+        async with self._lock:
+            while True:
+                wait = self._reserve()
+                if wait <= 0:
+                    return
+                self.waited_seconds += wait
+                await asyncio.sleep(wait)
+
+    def _reserve(self) -> float:
+        """トークンを1つ消費する。消費できない場合は必要な待機秒数を返す"""
+        self._refill()
+
+        now = time.time()
+        if self.reset_at is not None and self.reset_at <= now:
+            # サーバー側のウィンドウがリセットされた
+            self.remaining = None
+            self.reset_at = None
+
+        if self.remaining is not None and self.remaining <= 0:
+            # サーバー側の残量が尽きている場合はリセットまで待機
+            return max(self.reset_at - now, 0.0) + 1.0 if self.reset_at else self.window_seconds
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            if self.remaining is not None:
+                self.remaining -= 1
+            return 0.0
+
+        return (1 - self.tokens) / self.refill_rate
+
+    def available(self) -> float:
+        """待機せずに使えるリクエスト数の見積もり"""
+        self._refill()
+        if self.remaining is not None and (self.reset_at is None or self.reset_at > time.time()):
+            return min(self.tokens, float(self.remaining))
+        return self.tokens
+
+    def _refill(self):
+        """経過時間に応じてトークンを補充"""
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self.tokens = min(float(self.limit), self.tokens + elapsed * self.refill_rate)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """レスポンスヘッダーからバケットを補正"""
+        limit = self._parse_header(headers, "x-ratelimit-limit")
+        remaining = self._parse_header(headers, "x-ratelimit-remaining")
+        reset = self._parse_header(headers, "x-ratelimit-reset")
+
+        if limit:
+            self.limit = limit
+        if remaining is not None:
+            self.remaining = remaining
+            # ローカルの見積もりがサーバーより楽観的な場合のみ補正
+            self.tokens = min(self.tokens, float(remaining))
+        if reset is not None:
+            self.reset_at = float(reset)
+
+    def on_rate_limited(self, headers: Mapping[str, str]):
+        """429を受け取った場合の処理（リセットまで全リクエストを止める）"""
+        self.update_from_headers(headers)
+        self.rate_limited_count += 1
+        self.remaining = 0
+        self.tokens = 0.0
+        if self.reset_at is None:
+            # リセット時刻が不明な場合は1ウィンドウ分待機
+            self.reset_at = time.time() + self.window_seconds
+
+        logger.warning(f"Rate limit exceeded, pausing requests until "
+                       f"{datetime.fromtimestamp(self.reset_at).isoformat()}")
+
+    @staticmethod
+    def _parse_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+        """ヘッダー値を整数として取得"""
+        value = headers.get(name)
+        if value is None:
+            return None
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return None
+
+    def get_status(self) -> Dict[str, Any]:
+        """現在のレート制限状況を取得"""
+        self._refill()
+        return {
+            "limit": self.limit,
+            "window_seconds": self.window_seconds,
+            "tokens": round(self.tokens, 2),
+            "remaining": self.remaining,
+            "reset_at": datetime.fromtimestamp(self.reset_at).isoformat() if self.reset_at else None,
+            "rate_limited_count": self.rate_limited_count,
+            "waited_seconds": round(self.waited_seconds, 2)
+        }
@@ -0,0 +1,152 @@
+import bisect
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def message_view(message: Any) -> Dict[str, Any]:
+    """メッセージをAPIレスポンス・イベント用の辞書に変換"""
+    return {
+        "message_id": message.message_id,
+        "account": {
+            "account_id": message.account.account_id,
+            "name": message.account.name,
+            "avatar_image_url": message.account.avatar_image_url
+        },
+        "body": message.body,
+        "send_time": message.send_time,
+        "update_time": message.update_time
+    }
+
+
+class MessageReadModel:
+    """ダッシュボード表示用のメッセージの読み取りモデル
+
+    ポーリングやWebhookで取得したメッセージをルームごとに最新ring_size件まで保持し、
+    全ルームを送信時刻順に並べた索引を併せて更新する。APIはChatWorkに問い合わせず
+    この読み取りモデルから応答する。
+    """
+
+    def __init__(self, ring_size: int = 100):
+        self.ring_size = ring_size
+        self._rooms: Dict[str, "OrderedDict[str, Any]"] = {}  # ルームID -> メッセージID -> メッセージ（古い順）
+        self._index: List[Tuple[int, str, str]] = []  # (送信時刻, ルームID, メッセージID) の昇順
+        self._room_index: Dict[str, List[Tuple[int, str]]] = {}  # ルームID -> (送信時刻, メッセージID) の昇順
+        self.room_names: Dict[str, str] = {}
+        self.updated_at: Dict[str, float] = {}
+        self._invalidated = set()  # 次の読み取りでChatWorkから取得し直すルーム
+
+    def has_room(self, room_id: str) -> bool:
+        """ルームのメッセージを保持しているか"""
+        return room_id in self._rooms
+
+    def ingest(self, room_id: str, messages: Iterable[Any], replace: bool = False, updated_at: Optional[float] = None):
+        """取得したメッセージを反映（replaceの場合は含まれないメッセージを削除）"""
+        ring = self._rooms.setdefault(room_id, OrderedDict())
+        messages = list(messages)
+
+        if replace:
+            current_ids = {message.message_id for message in messages}
+            for message_id in [message_id for message_id in ring if message_id not in current_ids]:
+                self._unindex(ring.pop(message_id))
+
+        for message in messages:
+            previous = ring.get(message.message_id)
+            if previous is not None:
+                if previous.send_time != message.send_time:
+                    self._unindex(previous)
+                    self._index_message(message)
+                ring[message.message_id] = message
+                continue
+            ring[message.message_id] = message
+            self._index_message(message)
+
+        while len(ring) > self.ring_size:
+            _, evicted = ring.popitem(last=False)
+            self._unindex(evicted)
+
+        if updated_at is not None:
+            self.updated_at[room_id] = updated_at
+            self._invalidated.discard(room_id)
+
+    def invalidate(self, room_id: str):
+        """ルームの内容が古くなったことを記録（送信などChatWork側だけが変わった場合）"""
+        self._invalidated.add(room_id)
+
+    def is_stale(self, room_id: str, max_age: Optional[float] = None) -> bool:
+        """ChatWorkから取得し直す必要があるか（max_ageを指定した場合は最終取得からの経過秒数も確認）"""
+        if room_id not in self._rooms or room_id in self._invalidated:
+            return True
+        if max_age is None:
+            return False
+        updated_at = self.updated_at.get(room_id)
+        return updated_at is None or time.time() - updated_at > max_age
+
+    def update_room_names(self, rooms: Iterable[Dict[str, Any]]):
+        """ルーム一覧からルーム名を更新"""
+        for room in rooms:
+            self.room_names[str(room["room_id"])] = room.get("name", "")
+
+    def recent(self, room_id: str, limit: int = 50, before: Optional[Tuple[int, str]] = None) -> List[Any]:
+        """ルームの最新limit件（古い順）。beforeを指定した場合は (送信時刻, メッセージID) がそれより前のもの"""
+        ring = self._rooms.get(room_id)
+        if not ring or limit <= 0:
+            return []
+        ordered = self._room_index[room_id]
+        end = bisect.bisect_left(ordered, tuple(before)) if before is not None else len(ordered)
+        return [ring[message_id] for _, message_id in ordered[max(end - limit, 0):end]]
+
+    def latest(self, limit: int = 50, room_ids: Optional[Iterable[str]] = None,
+               per_room: Optional[int] = None) -> List[Any]:
+        """全ルームの最新メッセージを新しい順に取得（per_roomは1ルームあたりの上限）"""
+        rooms = set(room_ids) if room_ids is not None else None
+        counts: Dict[str, int] = {}
+        result = []
+
+        for _, room_id, message_id in reversed(self._index):
+            if len(result) >= limit:
+                break
+            if rooms is not None and room_id not in rooms:
+                continue
+            if per_room is not None:
+                if counts.get(room_id, 0) >= per_room:
+                    continue
+                counts[room_id] = counts.get(room_id, 0) + 1
+            result.append(self._rooms[room_id][message_id])
+
+        return result
+
+    def latest_item(self, message: Any) -> Dict[str, Any]:
+        """最新メッセージ一覧の1件分の辞書（ルーム名付き）"""
+        item = message_view(message)
+        item.update({
+            "room_id": message.room_id,
+            "room_name": self.room_names.get(message.room_id, f"Room {message.room_id}"),
+            "is_unread": True,  # 簡易的に全て未読として扱う
+            "priority": "normal"  # 簡易的に通常優先度として扱う
+        })
+        return item
+
+    def _index_message(self, message: Any):
+        bisect.insort(self._index, (message.send_time, message.room_id, message.message_id))
+        bisect.insort(self._room_index.setdefault(message.room_id, []), (message.send_time, message.message_id))
+
+    def _unindex(self, message: Any):
+        for ordered, entry in (
+            (self._index, (message.send_time, message.room_id, message.message_id)),
+            (self._room_index.get(message.room_id, []), (message.send_time, message.message_id))
+        ):
+            position = bisect.bisect_left(ordered, entry)
+            if position < len(ordered) and ordered[position] == entry:
+                del ordered[position]
+
+    def get_status(self) -> Dict[str, Any]:
+        """保持件数を取得"""
+        return {
+            "rooms": len(self._rooms),
+            "messages": len(self._index),
+            "ring_size": self.ring_size
+        }
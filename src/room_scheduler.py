@@ -0,0 +1,203 @@
+import heapq
+import itertools
+import logging
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+class RoomActivityTracker:
+    """/rooms のlast_update_timeを前回と比較して更新のあったルームを検出"""
+
+    def __init__(self, reconcile_interval: int = 300):
+        self.reconcile_interval = reconcile_interval  # 更新がなくても取得する間隔（秒）
+        self.snapshot: Dict[str, Any] = {}  # ルーム別の取得済みlast_update_time
+        self.pending: Dict[str, Any] = {}  # 取得待ちルームの最新last_update_time
+        self.last_polled: Dict[str, float] = {}  # ルーム別の最終メッセージ取得時刻（monotonic）
+
+    def select_rooms(self, room_ids: List[str], rooms: List[Dict[str, Any]]) -> List[str]:
+        """メッセージを取得すべきルームを選択
+
+        last_update_timeが前回取得時から変化したルーム、一覧に存在しないルーム、
+        reconcile_interval以上取得していないルームを返す。
+        メンション数・未読数の多いルームを先に並べる。
+        """
+        current = {str(room["room_id"]): room for room in rooms}
+        now = time.monotonic()
+        selected = []
+
+        for room_id in room_ids:
+            room = current.get(room_id)
+            last_polled = self.last_polled.get(room_id)
+
+            if room is None or room_id not in self.snapshot:
+                changed = True
+            else:
+                changed = room.get("last_update_time") != self.snapshot[room_id]
+
+            if changed or last_polled is None or now - last_polled >= self.reconcile_interval:
+                selected.append(room_id)
+                if room is not None:
+                    # 取得に成功した時点でスナップショットに反映する
+                    self.pending[room_id] = room.get("last_update_time")
+
+        selected.sort(key=lambda room_id: (
+            -current.get(room_id, {}).get("mention_num", 0),
+            -current.get(room_id, {}).get("unread_num", 0)
+        ))
+
+        return selected
+
+    def mark_polled(self, room_id: str):
+        """メッセージを取得したことを記録"""
+        self.last_polled[room_id] = time.monotonic()
+        if room_id in self.pending:
+            self.snapshot[room_id] = self.pending.pop(room_id)
+
+    def get_status(self) -> Dict[str, Any]:
+        """トラッカーの状態を取得"""
+        return {
+            "tracked_rooms": len(self.snapshot),
+            "reconcile_interval": self.reconcile_interval
+        }
+
+
+@dataclass
+class PollTier:
+    """カテゴリ別のポーリング間隔（秒）"""
+    min_interval: int
+    max_interval: int
+
+
+# _determine_room_categoryのカテゴリ別デフォルト設定
+DEFAULT_POLL_TIERS: Dict[str, PollTier] = {
+    'クライアント窓口': PollTier(5, 120),
+    'TO': PollTier(10, 300),
+    'projects': PollTier(15, 600),
+    'teams': PollTier(30, 900),
+    'meetings': PollTier(30, 900),
+    'development': PollTier(30, 1800),
+    'announcements': PollTier(60, 3600),
+    'my_chat': PollTier(60, 3600),
+    'others': PollTier(30, 1800)
+}
+
+
+@dataclass
+class RoomSchedule:
+    """ルーム別のポーリングスケジュール"""
+    room_id: str
+    category: str
+    tier: PollTier
+    interval: float
+    next_due: float
+    last_activity_at: Optional[float] = None
+    version: int = 0
+
+
+class AdaptiveRoomScheduler:
+    """次回ポーリング時刻をキーにした優先度付きキューによるルーム別適応スケジューラー
+
+    返信が必要なメッセージがあったルームは間隔をカテゴリの最短値に戻し、
+    新着があったルームは間隔を半分に、更新のないルームは最長値まで
+    指数的に間隔を延ばす。
+    """
+
+    def __init__(self, tiers: Optional[Dict[str, PollTier]] = None):
+        self.tiers = dict(DEFAULT_POLL_TIERS)
+        if tiers:
+            self.tiers.update(tiers)
+        self.rooms: Dict[str, RoomSchedule] = {}
+        self._heap: List[Tuple[float, int, str]] = []  # (next_due, version, room_id)
+        self._versions = itertools.count(1)
+
+    def sync_rooms(self, room_ids: List[str], categories: Optional[Dict[str, str]] = None):
+        """監視対象ルームの増減を反映（新規ルームは即座にポーリング対象）"""
+        categories = categories or {}
+        now = time.monotonic()
+
+        for room_id in room_ids:
+            if room_id not in self.rooms:
+                category = categories.get(room_id, 'others')
+                tier = self.tiers.get(category, self.tiers['others'])
+                self.rooms[room_id] = RoomSchedule(
+                    room_id=room_id,
+                    category=category,
+                    tier=tier,
+                    interval=tier.min_interval,
+                    next_due=now
+                )
+                self._push(self.rooms[room_id])
+
+        # 監視対象から外れたルームはヒープ上のエントリを無効化
+        for room_id in set(self.rooms) - set(room_ids):
+            del self.rooms[room_id]
+
+    def pop_due(self) -> List[str]:
+        """ポーリング時刻に達したルームを取り出す"""
+        now = time.monotonic()
+        due = []
+
+        while self._heap and self._heap[0][0] <= now:
+            _, version, room_id = heapq.heappop(self._heap)
+            schedule = self.rooms.get(room_id)
+            if schedule is None or schedule.version != version:
+                continue  # 無効化済みのエントリ
+            due.append(room_id)
+
+        return due
+
+    def next_due_in(self) -> Optional[float]:
+        """次のルームのポーリングまでの秒数"""
+        while self._heap:
+            next_due, version, room_id = self._heap[0]
+            schedule = self.rooms.get(room_id)
+            if schedule is None or schedule.version != version:
+                heapq.heappop(self._heap)
+                continue
+            return max(next_due - time.monotonic(), 0.0)
+        return None
+
+    def record_poll(self, room_id: str, active: bool, hot: bool = False):
+        """ポーリング結果を反映して次回時刻を再スケジュール
+
+        active: 新着メッセージがあった / hot: 返信が必要なメッセージがあった
+        """
+        schedule = self.rooms.get(room_id)
+        if schedule is None:
+            return
+
+        now = time.monotonic()
+        if hot:
+            schedule.interval = schedule.tier.min_interval
+            schedule.last_activity_at = now
+        elif active:
+            schedule.interval = max(schedule.interval / 2, schedule.tier.min_interval)
+            schedule.last_activity_at = now
+        else:
+            schedule.interval = min(schedule.interval * 2, schedule.tier.max_interval)
+
+        schedule.next_due = now + schedule.interval
+        self._push(schedule)
+
+    def _push(self, schedule: RoomSchedule):
+        """ヒープにエントリを追加（古いエントリはバージョンで無効化）"""
+        schedule.version = next(self._versions)
+        heapq.heappush(self._heap, (schedule.next_due, schedule.version, schedule.room_id))
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """ルーム別の実効ポーリング間隔を取得"""
+        now = time.monotonic()
+        return {
+            room_id: {
+                "category": schedule.category,
+                "interval": schedule.interval,
+                "next_poll_in": round(max(schedule.next_due - now, 0.0), 1),
+                "last_activity_seconds_ago": (
+                    round(now - schedule.last_activity_at, 1) if schedule.last_activity_at else None
+                )
+            }
+            for room_id, schedule in self.rooms.items()
+        }
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore:
+    """状態の永続化レイヤー（基底クラスは何も保存しない）
+
+    書き込みはput/deleteでメモリ上に溜め、バックエンドがまとめて反映する。
+    値はJSONに変換できる形式で渡す。
+    """
+
+    async def open(self):
+        """ストアを開く"""
+
+    async def close(self):
+        """未反映の書き込みを反映してストアを閉じる"""
+
+    def put(self, namespace: str, key: str, value: Any):
+        """値を保存（非同期にまとめて書き込まれる）"""
+
+    def delete(self, namespace: str, key: str):
+        """値を削除（非同期にまとめて書き込まれる）"""
+
+    async def load(self, namespace: str) -> Dict[str, Any]:
+        """名前空間内の全ての値を読み込み"""
+        return {}
+
+    async def flush(self):
+        """未反映の書き込みを反映"""
+
+    def get_status(self) -> Dict[str, Any]:
+        """ストアの状態を取得"""
+        return {"backend": "none"}
+
+
+class SQLiteStateStore(StateStore):
+    """SQLite（WALモード）による状態の永続化
+
+    書き込みは名前空間とキーごとに最新の値だけを保持し、flush_intervalごとに
+    1トランザクションでまとめて書き込む。メッセージ処理のたびにfsyncは発生しない。
+    """
+
+    def __init__(self, path: str, flush_interval: float = 2.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.conn: Optional[sqlite3.Connection] = None
+        self._pending: Dict[Tuple[str, str], Optional[str]] = {}  # Noneは削除
+        self._db_lock = threading.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.last_flush_at: Optional[datetime] = None
+        self.flushed_writes = 0
+
+    async def open(self):
+        """データベースを開いてバックグラウンドの書き込みタスクを開始"""
+        if self.conn is not None:
+            return
+
+        await asyncio.to_thread(self._connect)
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(f"State store opened: {self.path}")
+
+    def _connect(self):
+        """接続とスキーマを初期化"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            "namespace TEXT NOT NULL, "
+            "key TEXT NOT NULL, "
+            "value TEXT NOT NULL, "
+            "updated_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key)"
+            ") WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    async def close(self):
+        """未反映の書き込みを反映して閉じる"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+
+        await self.flush()
+
+        if self.conn is not None:
+            with self._db_lock:
+                self.conn.close()
+            self.conn = None
+
+    def put(self, namespace: str, key: str, value: Any):
+        """値を保存"""
+        self._pending[(namespace, key)] = json.dumps(value, ensure_ascii=False)
+
+    def delete(self, namespace: str, key: str):
+        """値を削除"""
+        self._pending[(namespace, key)] = None
+
+    async def load(self, namespace: str) -> Dict[str, Any]:
+        """名前空間内の全ての値を読み込み（未反映の書き込みも含む）"""
+        await self.flush()
+        rows = await asyncio.to_thread(self._select, namespace)
+        return {key: json.loads(value) for key, value in rows}
+
+    def _select(self, namespace: str):
+        with self._db_lock:
+            return self.conn.execute(
+                "SELECT key, value FROM state WHERE namespace = ?", (namespace,)
+            ).fetchall()
+
+    async def flush(self):
+        """溜まった書き込みを1トランザクションで反映"""
+        async with self._flush_lock:
+            if not self._pending or self.conn is None:
+                return
+
+            batch, self._pending = self._pending, {}
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+                self.last_flush_at = datetime.now()
+                self.flushed_writes += len(batch)
+            except Exception as e:
+                logger.error(f"Error flushing state store: {e}")
+                # 失敗した書き込みは次回に再試行（その間の新しい値を優先）
+                batch.update(self._pending)
+                self._pending = batch
+
+    def _write_batch(self, batch: Dict[Tuple[str, str], Optional[str]]):
+        now = time.time()
+        upserts = [(ns, key, value, now) for (ns, key), value in batch.items() if value is not None]
+        deletes = [(ns, key) for (ns, key), value in batch.items() if value is None]
+
+        with self._db_lock:
+            with self.conn:
+                if upserts:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO state (namespace, key, value, updated_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        upserts
+                    )
+                if deletes:
+                    self.conn.executemany(
+                        "DELETE FROM state WHERE namespace = ? AND key = ?", deletes
+                    )
+
+    async def _flush_loop(self):
+        """定期的に書き込みを反映"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def get_status(self) -> Dict[str, Any]:
+        """ストアの状態を取得"""
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "pending_writes": len(self._pending),
+            "flushed_writes": self.flushed_writes,
+            "last_flush_at": self.last_flush_at.isoformat() if self.last_flush_at else None
+        }
+
+
+def create_store(config) -> StateStore:
+    """設定に応じたストアを生成"""
+    backend = getattr(config, "storage_backend", "sqlite")
+
+    if backend == "sqlite":
+        return SQLiteStateStore(config.storage_path, config.storage_flush_interval)
+    if backend == "none":
+        return StateStore()
+
+    raise ValueError(f"Unknown storage backend: {backend}")
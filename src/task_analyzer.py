@@ -1,15 +1,115 @@
 import re
 import asyncio
+import hashlib
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict, Optional, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 import json
 
 from .chatwork_api import ChatWorkMessage
+from .analysis_cache import AnalysisCache, normalize_body
+from .chatwork_markup import parse_markup
+from .storage import StateStore
+
+try:
+    from re import _parser as _regex_parser  # Python 3.11以降
+except ImportError:
+    import sre_parse as _regex_parser
 
 logger = logging.getLogger(__name__)
 
+# 分析ロジックを変更した場合に上げる（キャッシュ済みの分析結果を無効化する）
+ANALYZER_VERSION = 1
+
+# 数字で始まる期限・見積もり時間のパターンの検索条件（範囲内に数字の字句があること）
+_DIGIT = r'\d'
+
+_CATEGORY_CLASSES = {
+    _regex_parser.CATEGORY_DIGIT: r'\d', _regex_parser.CATEGORY_NOT_DIGIT: r'\D',
+    _regex_parser.CATEGORY_SPACE: r'\s', _regex_parser.CATEGORY_NOT_SPACE: r'\S',
+    _regex_parser.CATEGORY_WORD: r'\w', _regex_parser.CATEGORY_NOT_WORD: r'\W',
+}
+
+_REPEATS = tuple(
+    getattr(_regex_parser, name) for name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+    if hasattr(_regex_parser, name)
+)
+
+
+def _leading_chars(items, same_case: bool = True) -> Optional[tuple]:
+    """構文木の並びにマッチする文字列の先頭になりうる文字
+    
+    (文字クラスの要素の集合, 空文字列にマッチしうるか) を返す。求められない場合はNone。
+    same_caseは、大文字小文字の区別がパターン全体と同じ範囲か（異なる範囲では英字を扱わない）。
+    """
+    chars = set()
+    for op, av in items:
+        if op is _regex_parser.LITERAL:
+            char = chr(av)
+            if not same_case and char.lower() != char.upper():
+                return None
+            chars.add(re.escape(char))
+            return chars, False
+        elif op is _regex_parser.IN:
+            for item_op, item in av:
+                if item_op is _regex_parser.LITERAL and (same_case or chr(item).lower() == chr(item).upper()):
+                    chars.add(re.escape(chr(item)))
+                elif item_op is _regex_parser.CATEGORY and item in _CATEGORY_CLASSES:
+                    chars.add(_CATEGORY_CLASSES[item])
+                elif item_op is _regex_parser.RANGE and same_case:
+                    chars.add(f'{re.escape(chr(item[0]))}-{re.escape(chr(item[1]))}')
+                else:
+                    return None
+            return chars, False
+        elif op is _regex_parser.AT:
+            continue
+        
+        if op is _regex_parser.BRANCH:
+            parts = [_leading_chars(branch.data, same_case) for branch in av[1]]
+        elif op is _regex_parser.SUBPATTERN:
+            _, add_flags, del_flags, subpattern = av
+            scoped = same_case and not (add_flags | del_flags) & re.IGNORECASE
+            parts = [_leading_chars(subpattern.data, scoped)]
+        elif op in _REPEATS:
+            minimum, _, subpattern = av
+            parts = [_leading_chars(subpattern.data, same_case)]
+            if parts[0] is not None and minimum == 0:
+                parts.append((set(), True))
+        else:
+            return None
+        
+        if None in parts:
+            return None
+        for part_chars, _ in parts:
+            chars |= part_chars
+        if not any(nullable for _, nullable in parts):
+            return chars, False
+    return chars, True
+
+
+def _compile_guarded(pattern: str, flags: int = 0) -> re.Pattern:
+    """先頭になりうる文字の先読みを付けてパターンをコンパイル
+    
+    分岐やグループで始まるパターンはreの先頭文字による絞り込みが効かず、本文の位置ごとに
+    全分岐を試すことになる。先頭の文字クラスを求められる場合は先読みとして付け、
+    先頭になりえない位置を1回の判定で読み飛ばす（マッチする範囲は変わらない）。
+    """
+    compiled = re.compile(pattern, flags)
+    try:
+        items = _regex_parser.parse(pattern, flags).data
+        if items and items[0][0] in (_regex_parser.LITERAL, _regex_parser.IN):
+            return compiled  # reが先頭の文字で絞り込む
+        leading = _leading_chars(items)
+        if leading is None or leading[1]:
+            return compiled
+        return re.compile(f"(?=[{''.join(sorted(leading[0]))}])(?:{pattern})", flags)
+    except Exception:
+        # 構文木の形式はPythonのバージョンによって異なるため、解釈できない場合は先読みを付けない
+        return compiled
+
 
 @dataclass
 class TaskInfo:
@@ -35,11 +135,45 @@ class MessageAnalysis:
     confidence_score: float = 0.0
 
 
+def analysis_to_dict(analysis: MessageAnalysis) -> Dict[str, Any]:
+    """MessageAnalysisを保存用の辞書に変換"""
+    # dataclasses.asdictは再帰的なdeepcopyで遅いため、リストだけを複製する
+    return {
+        **vars(analysis),
+        "tasks": [{**vars(task), "assignees": list(task.assignees)} for task in analysis.tasks],
+        "questions": list(analysis.questions),
+        "mentions": list(analysis.mentions)
+    }
+
+
+def analysis_from_dict(data: Dict[str, Any]) -> MessageAnalysis:
+    """保存用の辞書からMessageAnalysisを復元"""
+    return MessageAnalysis(**{
+        **data,
+        "tasks": [TaskInfo(**{**task, "assignees": list(task["assignees"])}) for task in data["tasks"]],
+        "questions": list(data["questions"]),
+        "mentions": list(data["mentions"])
+    })
+
+
+@dataclass
+class _LineScan:
+    """1行分の走査結果"""
+    mention_ids: List[int]
+    tags: set  # (緊急度または感情, キーワード)
+    exclamations: int
+    words: set  # 範囲内の語と数字（期限・見積もり時間の検索条件）
+    searched: bool = False  # 期限・見積もり時間を検索済みか
+    deadline: Optional[tuple] = None  # (期限表現のマッチ, 種類)
+    estimated_time: Optional[str] = None
+
+
 class TaskAnalyzer:
     """タスク分析エンジン"""
     
-    def __init__(self, config):
+    def __init__(self, config, store: Optional[StateStore] = None, llm=None):
         self.config = config
+        self.llm = llm  # 信頼度の低い結果を再分析するLLMEscalator（Noneの場合は組み込み分析のみ）
         
         # タスク関連のパターン
         self.task_patterns = [
@@ -77,215 +211,510 @@ class TaskAnalyzer:
             "positive": ["ありがとう", "素晴らしい", "良い", "いいね", "完璧", "最高", "助かり"],
             "negative": ["問題", "困った", "遅れ", "失敗", "ダメ", "最悪", "緊急", "トラブル"]
         }
+        
+        # 期限パターン（先に並んでいるものを優先）
+        self.deadline_patterns = [
+            (r'(\d{4})[年\/\-](\d{1,2})[月\/\-](\d{1,2})日?', 'full'),
+            (r'(\d{1,2})[月\/](\d{1,2})日?', 'monthday'),
+            (r'(\d{1,2})日', 'day'),
+            (r'今日', 'today'),
+            (r'明日', 'tomorrow'),
+            (r'今週', 'thisweek'),
+            (r'来週', 'nextweek')
+        ]
+        
+        # 見積もり時間パターン（先に並んでいるものを優先）
+        self.time_patterns = [
+            r'(\d+)\s*時間',
+            r'(\d+)\s*分',
+            r'(\d+)\s*日',
+            r'(\d+)\s*週間'
+        ]
+        
+        # バッチ分析時にイベントループへ制御を返す間隔（件数）
+        self.batch_yield_interval = 200
+        
+        # 分析の実行方式（"inline": イベントループ上で実行 /
+        # "process": 待ち件数がpool_threshold以上の場合はプロセスプールで実行）
+        self.executor_mode = getattr(config, "analysis_executor", "inline")
+        self.pool_threshold = getattr(config, "analysis_pool_threshold", 8)
+        self.pool_workers = getattr(config, "analysis_pool_workers", 2)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.queue_depth = 0  # 分析待ち・分析中の件数
+        self.inline_count = 0
+        self.pooled_count = 0
+        
+        self._compile_patterns()
+        
+        # 分析結果のキャッシュ（ANALYSIS_CACHE_PERSISTの場合はストアにも保存）
+        self.cache = AnalysisCache(
+            getattr(config, "analysis_cache_size", 1000),
+            store if getattr(config, "analysis_cache_persist", False) else None
+        )
+    
+    def _compile_patterns(self):
+        """パターンをコンパイル（本文全体を走査し、候補を含む行だけを行単位で処理するため）"""
+        def union(patterns: List[str]) -> str:
+            return '|'.join(f'(?:{pattern})' for pattern in patterns)
+        
+        self._task_re = _compile_guarded(union(self.task_patterns), re.IGNORECASE)
+        self._question_re = _compile_guarded(union(self.question_patterns))
+        self._no_reply_re = _compile_guarded(union(self.no_reply_patterns))
+        self._no_reply_ignorecase_re = _compile_guarded(union(self.no_reply_patterns), re.IGNORECASE)
+        self._mention_re = re.compile(r'\[To:(\d+)\]')
+        self._bullet_re = re.compile(r'^[\s]*[・•●○▪▫□☐\-\*]\s*(.+)', re.MULTILINE)
+        # 質問になりうる文を含む行の絞り込み用（文末の条件を外したもの）
+        self._question_hint_re = _compile_guarded(union(
+            pattern[:-1] if pattern.endswith('$') else pattern for pattern in self.question_patterns
+        ))
+        
+        # 緊急度・感情キーワードごとのタグ（同じキーワードが複数の分類に属する場合は両方）
+        self._keyword_tags: Dict[str, set] = {}
+        for level, keywords in self.urgency_keywords.items():
+            for keyword in keywords:
+                self._keyword_tags.setdefault(keyword, set()).add((level, keyword))
+        for sentiment, keywords in self.sentiment_keywords.items():
+            for keyword in keywords:
+                self._keyword_tags.setdefault(keyword, set()).add((sentiment, keyword))
+        
+        # 期限・見積もり時間は優先順位の順に検索し、最初にマッチした種類の最も前の出現を使う。
+        # 文字列そのもののパターンはその語の字句が、数字で始まるパターンは数字の字句が
+        # 範囲内にある場合だけ検索する（どちらでもないパターンは常に検索）
+        def requirement(pattern: str) -> Optional[str]:
+            if re.escape(pattern) == pattern:
+                return pattern.lower()  # 語の字句は小文字で扱う
+            if pattern.startswith(('\\d', '(\\d')):
+                return _DIGIT
+            return None
+        
+        self._deadline_searches = [
+            (date_type, _compile_guarded(pattern), requirement(pattern)) for pattern, date_type in self.deadline_patterns
+        ]
+        self._estimate_searches = [
+            (_compile_guarded(pattern), requirement(pattern)) for pattern in self.time_patterns
+        ]
+        
+        # 字句として切り出す語（キーワードと文字列そのものの期限・見積もり時間）とそのタグ。
+        # キーワードは小文字化した本文と比較するため、大文字を含むものは一致しない
+        self._word_tags: Dict[str, set] = {
+            keyword: tags for keyword, tags in self._keyword_tags.items() if keyword == keyword.lower()
+        }
+        requirements = [required for _, _, required in self._deadline_searches]
+        requirements += [required for _, required in self._estimate_searches]
+        for required in requirements:
+            if required not in (None, _DIGIT):
+                self._word_tags.setdefault(required, set())
+        words = sorted(self._word_tags, key=len, reverse=True)
+        
+        # 字句の切り出しでは重なった出現を拾えないため、語の途中から始まる
+        # 別の語（(先頭からの位置, 語)）を控えておく
+        self._word_overlaps = {
+            word: [
+                (offset, other) for offset in range(len(word)) for other in words
+                if other != word and (other.startswith(word[offset:]) or word.startswith(other, offset))
+            ]
+            for word in words
+        }
+        
+        # 本文を1回走査して、メンション・感嘆符・数字・語の字句を切り出す結合パターン
+        self._token_re = _compile_guarded(
+            r'(?P<mention>\[To:(?P<account_id>\d+)\])'
+            r'|(?P<exclamation>[!！])'
+            r'|(?P<number>\d+)'
+            r'|(?P<word>(?i:' + '|'.join(re.escape(word) for word in words) + '))'
+        )
+        
+        # 分析した日付によって解釈が変わる期限表現（年を含む日付・日のみの表現以外）
+        self._date_dependent_re = _compile_guarded(union([
+            pattern for pattern, date_type in self.deadline_patterns if date_type not in ('full', 'day')
+        ]))
+        
+        # ルールが変わるとキャッシュキーが変わるようにする
+        rules = [
+            self.task_patterns, self.question_patterns, self.urgency_keywords, self.no_reply_patterns,
+            self.sentiment_keywords, self.deadline_patterns, self.time_patterns
+        ]
+        digest = hashlib.sha1(json.dumps(rules, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+        self.rules_version = f"{ANALYZER_VERSION}:{digest[:16]}"
     
     async def analyze(self, message: ChatWorkMessage) -> MessageAnalysis:
         """メッセージを総合分析"""
         try:
             logger.info(f"Analyzing message from {message.account.name}")
             
-            # 各種分析を並行実行
-            tasks = await asyncio.gather(
-                self._extract_tasks(message.body),
-                self._detect_questions(message.body),
-                self._extract_mentions(message.body),
-                self._determine_priority(message.body),
-                self._extract_deadline(message.body),
-                self._analyze_sentiment(message.body)
-            )
+            analysis = (await self._run_analysis([message.markup.analysis_text], datetime.now()))[0]
             
-            extracted_tasks, questions, mentions, priority, deadline, sentiment = tasks
-            
-            # 返信必要性を判定
-            requires_reply = self._should_respond(message.body, {
-                "mentions": mentions,
-                "questions": questions,
-                "tasks": extracted_tasks,
-                "priority": priority
-            })
-            
-            # サマリーを生成
-            summary = self._generate_summary(message.body, extracted_tasks, questions, priority)
-            
-            # 信頼度スコアを計算
-            confidence_score = self._calculate_confidence_score(
-                message.body, extracted_tasks, questions, mentions
-            )
-            
-            analysis = MessageAnalysis(
-                requires_reply=requires_reply,
-                priority=priority,
-                tasks=extracted_tasks,
-                questions=questions,
-                mentions=mentions,
-                deadline=deadline,
-                sentiment=sentiment,
-                summary=summary,
-                confidence_score=confidence_score
-            )
-            
-            logger.info(f"Analysis completed: {len(extracted_tasks)} tasks, "
-                       f"requires_reply={requires_reply}, priority={priority}")
+            logger.info(f"Analysis completed: {len(analysis.tasks)} tasks, "
+                       f"requires_reply={analysis.requires_reply}, priority={analysis.priority}")
             
             return analysis
             
         except Exception as e:
             logger.error(f"Error analyzing message: {e}")
             # エラー時はデフォルトの分析結果を返す
-            return MessageAnalysis(
-                requires_reply=False,
-                priority="normal",
-                tasks=[],
-                questions=[],
-                mentions=[],
-                summary="分析エラー"
-            )
+            return self._error_analysis()
+    
+    async def analyze_many(self, messages: List[ChatWorkMessage],
+                           now: Optional[datetime] = None) -> List[MessageAnalysis]:
+        """複数メッセージをまとめて分析（結果は入力と同じ順序）
+        
+        期限の解釈にはバッチ全体で同じ基準時刻を使う。
+        """
+        # 引用部分は分析対象から除く
+        texts = [message.markup.analysis_text for message in messages]
+        results = await self._run_analysis(texts, now or datetime.now())
+        
+        logger.info(f"Batch analysis completed: {len(messages)} messages")
+        return results
     
-    async def _extract_tasks(self, text: str) -> List[TaskInfo]:
-        """タスクを抽出"""
-        tasks = []
-        lines = text.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
+    async def _run_analysis(self, bodies: List[str], now: datetime) -> List[MessageAnalysis]:
+        """本文を正規化して分析（キャッシュ済みの結果を再利用し、同じ本文は1回だけ分析）"""
+        today = now.date()
+        keys = []
+        results: Dict[str, Dict[str, Any]] = {}
+        pending: Dict[str, str] = {}  # 分析が必要なキー -> 正規化済みの本文
+        
+        normalized = [normalize_body(body) for body in bodies]
+        for body in normalized:
+            key = self.cache.make_key(self.rules_version, body)
+            keys.append(key)
+            if key in results or key in pending:
                 continue
             
-            # タスクパターンにマッチするかチェック
-            is_task = any(re.search(pattern, line, re.IGNORECASE) for pattern in self.task_patterns)
-            
-            if is_task:
-                task = await self._parse_task_line(line)
-                if task:
-                    tasks.append(task)
+            cached = self.cache.get(key, today)
+            if cached is not None:
+                results[key] = cached
+            else:
+                pending[key] = body
+        
+        if pending:
+            analyses = await self._execute_analysis(list(pending.values()), now)
+            for (key, body), analysis in zip(pending.items(), analyses):
+                results[key] = analysis_to_dict(analysis)
+                analyzed_on = today if self._date_dependent_re.search(body) else None
+                self.cache.put(key, self.rules_version, results[key], analyzed_on)
         
-        # 箇条書きのタスクも検出
-        bullet_tasks = await self._extract_bullet_tasks(text)
-        tasks.extend(bullet_tasks)
+        if self.llm:
+            results.update(await self._escalate(dict(zip(keys, normalized)), results, now))
         
-        return tasks
+        # 呼び出し側での変更が他の結果に影響しないよう毎回復元する
+        return [analysis_from_dict(results[key]) for key in keys]
     
-    async def _parse_task_line(self, line: str) -> Optional[TaskInfo]:
-        """タスク行を解析"""
+    async def _escalate(self, bodies: Dict[str, str], results: Dict[str, Dict[str, Any]],
+                        now: datetime) -> Dict[str, Dict[str, Any]]:
+        """信頼度の低い結果をLLMで再分析（キャッシュには組み込み分析の結果のみを保存）"""
+        targets = {}
+        for key, body in bodies.items():
+            analysis = analysis_from_dict(results[key])
+            if self.llm.should_escalate(body, analysis):
+                targets[key] = self.llm.refine(body, analysis, now)
+        
+        refined = await asyncio.gather(*targets.values())
+        return {key: analysis_to_dict(analysis) for key, analysis in zip(targets, refined)}
+    
+    async def _execute_analysis(self, bodies: List[str], now: datetime) -> List[MessageAnalysis]:
+        """本文を分析（プロセスモードで待ち件数が閾値以上の場合はプロセスプールで実行）"""
+        self.queue_depth += len(bodies)
         try:
-            # 基本的なタスク情報を抽出
-            description = line.strip()
-            
-            # メンションから担当者を抽出
-            mentions = self._extract_mentions_from_text(line)
-            
-            # 期限を抽出
-            deadline = await self._extract_deadline_from_text(line)
-            
-            # 優先度を判定
-            priority = await self._determine_priority_from_text(line)
+            if self.executor_mode == "process" and self.queue_depth >= self.pool_threshold:
+                try:
+                    return await self._analyze_in_pool(bodies, now)
+                except Exception as e:
+                    logger.error(f"Error analyzing in process pool, falling back to inline: {e}")
             
-            # 見積もり時間を抽出
-            estimated_time = self._extract_estimated_time(line)
+            return await self._analyze_inline(bodies, now)
+        finally:
+            self.queue_depth -= len(bodies)
+    
+    async def _analyze_inline(self, bodies: List[str], now: datetime) -> List[MessageAnalysis]:
+        """イベントループ上で分析"""
+        results = []
+        
+        for index, body in enumerate(bodies):
+            results.append(self._analyze_body(body, now))
             
-            return TaskInfo(
-                description=description,
-                assignees=mentions,
-                deadline=deadline,
-                priority=priority,
-                estimated_time=estimated_time
+            # 大きなバッチでもイベントループを占有しない
+            if index % self.batch_yield_interval == self.batch_yield_interval - 1:
+                await asyncio.sleep(0)
+        
+        self.inline_count += len(bodies)
+        return results
+    
+    async def _analyze_in_pool(self, bodies: List[str], now: datetime) -> List[MessageAnalysis]:
+        """プロセスプールで分析（ワーカー数に合わせて分割して並列実行）"""
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        chunk_size = min(self.batch_yield_interval, -(-len(bodies) // self.pool_workers))
+        
+        chunks = await asyncio.gather(*(
+            loop.run_in_executor(pool, _analyze_bodies_in_worker, bodies[start:start + chunk_size], now)
+            for start in range(0, len(bodies), chunk_size)
+        ))
+        
+        self.pooled_count += len(bodies)
+        return [analysis_from_dict(data) for chunk in chunks for data in chunk]
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """プロセスプールを取得（初回利用時に起動）"""
+        if self._pool is None:
+            # イベントループやスレッドを持つプロセスをforkしないようspawnで起動
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.pool_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
             )
-            
+            logger.info(f"Analysis process pool started ({self.pool_workers} workers)")
+        return self._pool
+    
+    def shutdown(self):
+        """プロセスプールを停止"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+    
+    async def restore_state(self):
+        """永続化された分析結果のキャッシュを読み込み"""
+        await self.cache.restore_state(self.rules_version)
+    
+    def get_status(self) -> Dict[str, Any]:
+        """分析の実行状況を取得"""
+        return {
+            "rules_version": self.rules_version,
+            "cache": self.cache.get_status(),
+            "llm": self.llm.get_status() if self.llm else None,
+            "executor": self.executor_mode,
+            "pool_threshold": self.pool_threshold,
+            "pool_workers": self.pool_workers,
+            "pool_running": self._pool is not None,
+            "queue_depth": self.queue_depth,
+            "inline_analyses": self.inline_count,
+            "pooled_analyses": self.pooled_count
+        }
+    
+    def _analyze_body(self, body: str, now: datetime) -> MessageAnalysis:
+        """本文を分析（エラー時はデフォルトの分析結果）"""
+        try:
+            return self._analyze_text(body, now)
         except Exception as e:
-            logger.error(f"Error parsing task line: {e}")
-            return None
+            logger.error(f"Error analyzing message: {e}")
+            return self._error_analysis()
     
-    async def _extract_bullet_tasks(self, text: str) -> List[TaskInfo]:
-        """箇条書きタスクを抽出"""
-        bullet_pattern = r'^[\s]*[・•●○▪▫□☐\-\*]\s*(.+)'
-        tasks = []
+    def _error_analysis(self) -> MessageAnalysis:
+        """分析エラー時のデフォルト結果"""
+        return MessageAnalysis(
+            requires_reply=False,
+            priority="normal",
+            tasks=[],
+            questions=[],
+            mentions=[],
+            summary="分析エラー"
+        )
+    
+    def _analyze_text(self, text: str, now: datetime) -> MessageAnalysis:
+        """本文を結合パターンで1回走査し、行ごとの特徴から分析結果を組み立てる
+        
+        メンション・キーワード・感嘆符は字句の走査で行ごとに集計し、本文全体の分はその合計とする。
+        期限・見積もり時間は検索条件を満たす範囲だけで検索し、行単位の処理は
+        タスク・質問の候補を含む行に限る。
+        """
+        body, lines = self._scan_lines(text)
+        self._search_schedule(text, body, 0, len(text))
+        no_reply = self._no_reply_ignorecase_re.search(text) is not None
+        
+        # 質問を検出（候補を含む行のみ文に分割）
+        questions = []
+        for start, end in self._candidate_lines(self._question_hint_re, text):
+            for sentence in text[start:end].split('。'):
+                sentence = sentence.strip()
+                if sentence and self._question_re.search(sentence):
+                    questions.append(sentence)
         
-        for match in re.finditer(bullet_pattern, text, re.MULTILINE):
-            task_text = match.group(1).strip()
+        def scan_line(start: int, end: int) -> _LineScan:
+            """行（箇条書きの場合はその本文）の走査結果に、本文に含まれる期限・見積もり時間を加える
             
-            # タスクらしい内容かチェック
-            if len(task_text) > 5 and not any(re.search(pattern, task_text) for pattern in self.no_reply_patterns):
-                task = await self._parse_task_line(task_text)
-                if task:
-                    tasks.append(task)
+            箇条書きの記号と空白は字句にも期限・見積もり時間の先頭にもならないため、
+            箇条書きの本文は行全体と同じ結果になる。
+            """
+            scan = lines.get(end)
+            if scan is None:
+                scan = lines[end] = _LineScan([], set(), 0, set())
+            if not scan.searched:
+                self._search_schedule(text, scan, start, end, body)
+            return scan
         
-        return tasks
+        # タスクパターンにマッチする行
+        line_tasks = [
+            self._build_task(text[start:end], scan_line(start, end), now)
+            for start, end in self._candidate_lines(self._task_re, text)
+        ]
+        
+        # 箇条書きのタスク
+        bullet_tasks = []
+        for bullet in self._bullet_re.finditer(text):
+            task_text = bullet.group(1).strip()
+            if len(task_text) > 5 and not self._no_reply_re.search(task_text):
+                bullet_tasks.append(self._build_task(task_text, scan_line(*bullet.span(1)), now))
+        
+        tasks = line_tasks + bullet_tasks
+        mentions = list(set(body.mention_ids))  # 重複除去
+        priority = self._priority_from(body.tags, body.exclamations)
+        deadline = None
+        if body.deadline:
+            deadline = self._parse_deadline_match(*body.deadline, now)
+        sentiment = self._sentiment_from(body.tags)
+        
+        # 返信必要性を判定
+        requires_reply = self._should_respond(no_reply, {
+            "mentions": mentions,
+            "questions": questions,
+            "tasks": tasks,
+            "priority": priority
+        })
+        
+        return MessageAnalysis(
+            requires_reply=requires_reply,
+            priority=priority,
+            tasks=tasks,
+            questions=questions,
+            mentions=mentions,
+            deadline=deadline,
+            sentiment=sentiment,
+            summary=self._generate_summary(text, tasks, questions, priority),
+            confidence_score=self._calculate_confidence_score(text, tasks, questions, mentions)
+        )
     
-    async def _detect_questions(self, text: str) -> List[str]:
-        """質問を検出"""
-        questions = []
-        sentences = re.split(r'[。\n]', text)
+    def _scan_lines(self, text: str) -> tuple:
+        """本文を結合パターンで1回走査し、メンション・キーワード・感嘆符・数字を集計する
         
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
+        (本文全体の走査結果, 行末の位置 -> その行の走査結果) を返す（行は字句のあるもののみ）。
+        字句は改行をまたがない。語の途中から始まる別の語も、その行に含まれるものとして数える。
+        """
+        body = _LineScan([], set(), 0, set())
+        lines = {}
+        line_end = -1
+        scan = None
+        for match in self._token_re.finditer(text):
+            start = match.start()
+            if start > line_end:
+                line_end = text.find('\n', start)
+                if line_end < 0:
+                    line_end = len(text)
+                scan = lines[line_end] = _LineScan([], set(), 0, set())
             
-            if any(re.search(pattern, sentence) for pattern in self.question_patterns):
-                questions.append(sentence)
+            kind = match.lastgroup
+            if kind == "mention":
+                scan.mention_ids.append(int(match.group("account_id")))
+                scan.words.add(_DIGIT)
+            elif kind == "word":
+                word = match.group().lower()
+                scan.tags |= self._word_tags[word]
+                scan.words.add(word)
+                for offset, other in self._word_overlaps[word]:
+                    if text[start + offset:start + offset + len(other)].lower() == other:
+                        scan.tags |= self._word_tags[other]
+                        scan.words.add(other)
+            elif kind == "number":
+                scan.words.add(_DIGIT)
+            else:
+                scan.exclamations += 1
         
-        return questions
+        for scan in lines.values():
+            body.mention_ids += scan.mention_ids
+            body.tags |= scan.tags
+            body.exclamations += scan.exclamations
+            body.words |= scan.words
+        return body, lines
     
-    async def _extract_mentions(self, text: str) -> List[int]:
-        """メンションを抽出"""
-        return self._extract_mentions_from_text(text)
+    @staticmethod
+    def _candidate_lines(pattern, text: str):
+        """パターンにマッチする行の範囲（(開始位置, 終了位置)、改行を含まない）を先頭から順に返す"""
+        match = pattern.search(text)
+        while match:
+            start = text.rfind('\n', 0, match.start()) + 1
+            end = text.find('\n', match.end())
+            if end < 0:
+                yield start, len(text)
+                return
+            yield start, end
+            match = pattern.search(text, end + 1)
     
-    def _extract_mentions_from_text(self, text: str) -> List[int]:
-        """テキストからメンションを抽出"""
-        mention_pattern = r'\[To:(\d+)\]'
-        mentions = []
-        
-        for match in re.finditer(mention_pattern, text):
-            account_id = int(match.group(1))
-            mentions.append(account_id)
+    def _search_schedule(self, text: str, scan: "_LineScan", start: int, end: int,
+                         body: Optional["_LineScan"] = None):
+        """本文のstart〜endの範囲の期限・見積もり時間を検索して走査結果に設定
         
-        return list(set(mentions))  # 重複除去
+        本文全体の走査結果（body）を渡した場合は、本文に含まれない期限・見積もり時間の検索を省略する。
+        """
+        if body is None or body.deadline:
+            scan.deadline = self._find_deadline(text, start, end, scan.words)
+        if body is None or body.estimated_time:
+            scan.estimated_time = self._find_estimate(text, start, end, scan.words)
+        scan.searched = True
     
-    async def _determine_priority(self, text: str) -> str:
-        """優先度を判定"""
-        return await self._determine_priority_from_text(text)
+    def _find_estimate(self, text: str, start: int, end: int, words: set) -> Optional[str]:
+        """範囲内で最も優先順位の高い種類の見積もり時間を探す"""
+        for pattern, required in self._estimate_searches:
+            if required is None or required in words:
+                match = pattern.search(text, start, end)
+                if match:
+                    return match.group(0)
+        return None
+    
+    def _find_deadline(self, text: str, start: int, end: int, words: set) -> Optional[tuple]:
+        """範囲内で最も優先順位の高い種類の期限表現を探す（(マッチ, 種類)、なければNone）"""
+        for date_type, pattern, required in self._deadline_searches:
+            if required is None or required in words:
+                match = pattern.search(text, start, end)
+                if match:
+                    return match, date_type
+        return None
     
-    async def _determine_priority_from_text(self, text: str) -> str:
-        """テキストから優先度を判定"""
-        text_lower = text.lower()
+    def _build_task(self, line: str, scan: "_LineScan", now: datetime) -> TaskInfo:
+        """走査結果からタスク情報を組み立てる"""
+        deadline = None
+        if scan.deadline:
+            deadline = self._parse_deadline_match(*scan.deadline, now)
         
-        for priority, keywords in self.urgency_keywords.items():
-            if any(keyword in text_lower for keyword in keywords):
-                return priority
+        return TaskInfo(
+            description=line.strip(),
+            assignees=list(set(scan.mention_ids)),
+            deadline=deadline,
+            priority=self._priority_from(scan.tags, scan.exclamations),
+            estimated_time=scan.estimated_time
+        )
+    
+    def _priority_from(self, tags: set, exclamations: int) -> str:
+        """キーワードと感嘆符の数から優先度を判定"""
+        if tags:
+            levels = {tag for tag, _ in tags}
+            for priority in self.urgency_keywords:
+                if priority in levels:
+                    return priority
         
         # 複数の疑問符や感嘆符も緊急度の指標
-        if len(re.findall(r'[!！]', text)) >= 2:
+        if exclamations >= 2:
             return "high"
         
         return "normal"
     
-    async def _extract_deadline(self, text: str) -> Optional[int]:
-        """期限を抽出"""
-        return await self._extract_deadline_from_text(text)
-    
-    async def _extract_deadline_from_text(self, text: str) -> Optional[int]:
-        """テキストから期限を抽出"""
-        deadline_patterns = [
-            (r'(\d{4})[年\/\-](\d{1,2})[月\/\-](\d{1,2})日?', 'full'),
-            (r'(\d{1,2})[月\/](\d{1,2})日?', 'monthday'),
-            (r'(\d{1,2})日', 'day'),
-            (r'今日', 'today'),
-            (r'明日', 'tomorrow'),
-            (r'今週', 'thisweek'),
-            (r'来週', 'nextweek')
-        ]
+    def _sentiment_from(self, tags: set) -> str:
+        """感情キーワードの出現数から感情を判定"""
+        positive_count = sum(1 for tag, _ in tags if tag == "positive")
+        negative_count = sum(1 for tag, _ in tags if tag == "negative")
         
-        for pattern, date_type in deadline_patterns:
-            match = re.search(pattern, text)
-            if match:
-                return self._parse_deadline_match(match, date_type)
-        
-        return None
+        if positive_count > negative_count:
+            return "positive"
+        elif negative_count > positive_count:
+            return "negative"
+        else:
+            return "neutral"
+    
+    def _extract_mentions_from_text(self, text: str) -> List[int]:
+        """テキストからメンションを抽出"""
+        return list(set(parse_markup(text).mentions))
     
-    def _parse_deadline_match(self, match, date_type: str) -> Optional[int]:
+    def _parse_deadline_match(self, match, date_type: str, now: datetime) -> Optional[int]:
         """期限マッチを日付に変換"""
         try:
-            now = datetime.now()
-            
             if date_type == 'today':
                 deadline = now.replace(hour=23, minute=59, second=59)
             elif date_type == 'tomorrow':
@@ -319,24 +748,10 @@ class TaskAnalyzer:
             logger.error(f"Error parsing deadline: {e}")
             return None
     
-    async def _analyze_sentiment(self, text: str) -> str:
-        """感情分析"""
-        text_lower = text.lower()
-        
-        positive_count = sum(1 for word in self.sentiment_keywords["positive"] if word in text_lower)
-        negative_count = sum(1 for word in self.sentiment_keywords["negative"] if word in text_lower)
-        
-        if positive_count > negative_count:
-            return "positive"
-        elif negative_count > positive_count:
-            return "negative"
-        else:
-            return "neutral"
-    
-    def _should_respond(self, text: str, analysis_data: Dict) -> bool:
+    def _should_respond(self, no_reply: bool, analysis_data: Dict) -> bool:
         """返信必要性を判定"""
         # 返信不要パターンにマッチする場合
-        if any(re.search(pattern, text, re.IGNORECASE) for pattern in self.no_reply_patterns):
+        if no_reply:
             return False
         
         # 以下の条件のいずれかに該当する場合は返信必要
@@ -385,19 +800,18 @@ class TaskAnalyzer:
             score += 0.2
         
         return min(score, 1.0)
-    
-    def _extract_estimated_time(self, text: str) -> Optional[str]:
-        """見積もり時間を抽出"""
-        time_patterns = [
-            r'(\d+)\s*時間',
-            r'(\d+)\s*分',
-            r'(\d+)\s*日',
-            r'(\d+)\s*週間'
-        ]
-        
-        for pattern in time_patterns:
-            match = re.search(pattern, text)
-            if match:
-                return match.group(0)
-        
-        return None
\ No newline at end of file
+
+
+# プロセスプールのワーカーごとに保持する分析器
+_worker_analyzer: Optional[TaskAnalyzer] = None
+
+
+def _init_worker():
+    """ワーカープロセスの初期化（パターンのコンパイルは1回のみ）"""
+    global _worker_analyzer
+    _worker_analyzer = TaskAnalyzer(None)
+
+
+def _analyze_bodies_in_worker(bodies: List[str], now: datetime) -> List[Dict[str, Any]]:
+    """ワーカープロセスで本文を分析（結果はpickle可能な辞書で返す）"""
+    return [analysis_to_dict(_worker_analyzer._analyze_body(body, now)) for body in bodies]
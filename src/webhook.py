@@ -0,0 +1,63 @@
+import base64
+import hashlib
+import hmac
+import logging
+from typing import Dict, Any, Optional
+
+from .chatwork_api import ChatWorkAccount, ChatWorkMessage
+
+logger = logging.getLogger(__name__)
+
+# メッセージとして処理するWebhookイベント種別
+MESSAGE_EVENT_TYPES = ("message_created", "message_updated", "mention_to_me")
+
+
+def compute_signature(webhook_token: str, body: bytes) -> str:
+    """Webhookリクエストの署名を計算
+
+    ChatWorkはBase64デコードしたWebhookトークンを鍵として
+    リクエストボディのHMAC-SHA256を計算し、Base64エンコードして送信する。
+    """
+    key = base64.b64decode(webhook_token)
+    digest = hmac.new(key, body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def verify_signature(webhook_token: str, body: bytes, signature: Optional[str]) -> bool:
+    """Webhookリクエストの署名を検証"""
+    if not webhook_token or not signature:
+        return False
+
+    try:
+        expected = compute_signature(webhook_token, body)
+    except (ValueError, TypeError) as e:
+        logger.error(f"Invalid webhook token: {e}")
+        return False
+
+    return hmac.compare_digest(expected, signature)
+
+
+def parse_webhook_event(payload: Dict[str, Any]) -> Optional[ChatWorkMessage]:
+    """WebhookペイロードをChatWorkMessageに変換（メッセージ以外のイベントはNone）"""
+    event_type = payload.get("webhook_event_type")
+    if event_type not in MESSAGE_EVENT_TYPES:
+        logger.info(f"Ignoring webhook event type: {event_type}")
+        return None
+
+    event = payload.get("webhook_event", {})
+
+    # mention_to_meイベントは送信者がfrom_account_idに入る
+    account_id = event.get("account_id", event.get("from_account_id"))
+
+    # Webhookには送信者名が含まれないため、呼び出し側で補完する
+    account = ChatWorkAccount(account_id=account_id, name=str(account_id))
+
+    return ChatWorkMessage(
+        message_id=str(event["message_id"]),
+        room_id=str(event["room_id"]),
+        account=account,
+        body=event.get("body", ""),
+        send_time=event.get("send_time", 0),
+        update_time=event.get("update_time", 0)
+    )
+
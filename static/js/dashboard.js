@@ -8,6 +8,16 @@ class Dashboard {
         this.maxReconnectAttempts = 5;
         this.reconnectDelay = 1000;
         
+        // WebSocketイベントの同期位置（再接続時に続きから受け取る）
+        this.eventEpoch = null;
+        this.eventSeq = 0;
+        this.pendingAlerts = [];
+        this.alertsSummary = null;
+        // アラート一覧は先頭ページのみ取得し、続きは「さらに読み込む」で取得する
+        this.alertsPageSize = 100;
+        this.alertsNextCursor = null;
+        this.roomStates = {};
+        
         console.log('🔧 Initializing Dashboard...');
         this.init();
     }
@@ -27,9 +37,11 @@ class Dashboard {
         this.lastSyncTime = Date.now();
         this.syncTimer = null;
         
-        // 初回同期後に定期同期を開始
+        // 初回同期後に定期同期を開始（WebSocketで受信中は不要）
         setTimeout(() => {
-            this.startPeriodicSync();
+            if (!this.isLive()) {
+                this.startPeriodicSync();
+            }
         }, 5000);
         
         console.log('🔄 リアルタイム同期を開始しました (間隔: 15秒)');
@@ -49,7 +61,18 @@ class Dashboard {
         console.log('⏰ 定期同期タイマーを開始');
     }
     
+    isLive() {
+        // WebSocketで差分イベントを受信中か
+        return this.ws !== null && this.ws.readyState === WebSocket.OPEN;
+    }
+    
     async performSilentSync() {
+        if (this.isLive()) {
+            // 差分イベントで更新されるためポーリング不要
+            this.stopRealtimeSync();
+            return;
+        }
+        
         try {
             console.log('🔄 サイレント同期を実行中...');
             
@@ -105,13 +128,53 @@ class Dashboard {
         }
     }
     
+    async fetchAlertsPage(query = '', cursor = null, limit = this.alertsPageSize) {
+        // /api/alerts の1ページ分（件数はsummaryの集計値を使い、全件は辿らない）
+        const params = new URLSearchParams(query);
+        params.set('limit', String(Math.min(limit, 1000)));
+        if (cursor) {
+            params.set('cursor', cursor);
+        }
+        const response = await fetch(`/api/alerts?${params}`);
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.detail || 'Alerts load failed');
+        }
+        return data;
+    }
+    
+    setAlertsPage(data, append = false) {
+        // 取得したページを一覧に反映（appendの場合は読み込み済みの一覧に追加）
+        const alerts = data.pending_alerts || [];
+        if (append) {
+            const loaded = new Set(this.pendingAlerts.map(alert => alert.alert_id));
+            this.pendingAlerts.push(...alerts.filter(alert => !loaded.has(alert.alert_id)));
+        } else {
+            this.pendingAlerts = alerts;
+        }
+        this.alertsNextCursor = data.next_cursor || null;
+    }
+    
+    async loadMoreAlerts() {
+        if (!this.alertsNextCursor) {
+            return;
+        }
+        try {
+            const data = await this.fetchAlertsPage('', this.alertsNextCursor);
+            this.setAlertsPage(data, true);
+            this.applyAlertsSummary(data.summary);
+        } catch (error) {
+            console.error('アラートの追加読み込みエラー:', error);
+            this.showToast('アラートの読み込みに失敗しました', 'error');
+        }
+    }
+    
     async silentLoadAlerts() {
         try {
-            const response = await fetch('/api/alerts');
-            if (response.ok) {
-                const data = await response.json();
-                this.updateAlertsUI(data, true); // silent = true
-            }
+            // 読み込み済みの件数分を1回で取り直す
+            const data = await this.fetchAlertsPage('', null, Math.max(this.pendingAlerts.length, this.alertsPageSize));
+            this.setAlertsPage(data);
+            this.updateAlertsUI(data, true); // silent = true
         } catch (error) {
             console.error('アラート更新エラー:', error);
         }
@@ -168,7 +231,7 @@ class Dashboard {
         // アクティブなタブがアラートの場合のみ詳細表示を更新
         const activeTab = document.querySelector('.tab-btn.active')?.dataset.tab;
         if (activeTab === 'alerts' && data.pending_alerts) {
-            this.updateAlertsDisplay(data.pending_alerts);
+            this.updateAlertsDisplay({pending_alerts: this.pendingAlerts});
         }
     }
     
@@ -308,6 +371,11 @@ class Dashboard {
             this.forceCheckAlerts();
         });
         
+        // アラートの続きを読み込むボタン
+        document.getElementById('loadMoreAlertsBtn').addEventListener('click', () => {
+            this.loadMoreAlerts();
+        });
+        
         // 分析ボタン
         document.getElementById('analyzeBtn').addEventListener('click', () => {
             this.analyzeMessage();
@@ -598,7 +666,9 @@ class Dashboard {
     connectWebSocket() {
         try {
             const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-            const wsUrl = `${protocol}//${window.location.host}/ws`;
+            // 前回受信した位置を渡して続きのイベントから受け取る
+            const resume = this.eventEpoch ? `?epoch=${this.eventEpoch}&since=${this.eventSeq}` : '';
+            const wsUrl = `${protocol}//${window.location.host}/ws${resume}`;
             
             this.ws = new WebSocket(wsUrl);
             
@@ -606,6 +676,8 @@ class Dashboard {
                 console.log('WebSocket connected');
                 this.updateConnectionStatus(true);
                 this.reconnectAttempts = 0;
+                // 以降は差分イベントで更新するためポーリングを停止
+                this.stopRealtimeSync();
             };
             
             this.ws.onmessage = (event) => {
@@ -616,6 +688,10 @@ class Dashboard {
             this.ws.onclose = () => {
                 console.log('WebSocket disconnected');
                 this.updateConnectionStatus(false);
+                // 再接続するまではポーリングで更新
+                if (!this.syncTimer) {
+                    this.startPeriodicSync();
+                }
                 this.scheduleReconnect();
             };
             
@@ -641,12 +717,51 @@ class Dashboard {
     }
     
     handleWebSocketMessage(data) {
+        if (data.seq !== undefined && data.type !== 'snapshot' && data.type !== 'resume') {
+            // 受信済みのイベント（スナップショットと重複した再送分）は無視
+            if (data.seq <= this.eventSeq) {
+                return;
+            }
+            if (data.seq > this.eventSeq + 1) {
+                // 送信が追いつかずイベントが省略された場合は再接続して続きを受け取る
+                console.warn(`イベントの欠番を検出 (${this.eventSeq + 1}〜${data.seq - 1})、再同期します`);
+                this.reconnectAttempts = 0;
+                this.ws.close();
+                return;
+            }
+            this.eventSeq = data.seq;
+        }
+        
         switch (data.type) {
+            case 'snapshot':
+                this.applySnapshot(data);
+                break;
+            case 'resume':
+                this.eventEpoch = data.epoch;
+                console.log(`🔁 イベントを再開 (seq: ${data.seq}, 再送: ${data.data.events}件)`);
+                break;
             case 'new_message':
                 this.handleNewMessage(data.data);
                 break;
+            case 'alert_scheduled':
+            case 'alert_escalated':
+                this.upsertAlert(data.data.alert);
+                this.applyAlertsSummary(data.data.summary);
+                break;
+            case 'alert_resolved':
+                // 未読み込みのページのアラートは一覧にないため、件数のみ反映される
+                this.pendingAlerts = this.pendingAlerts.filter(alert => alert.alert_id !== data.data.alert.alert_id);
+                this.applyAlertsSummary(data.data.summary);
+                break;
+            case 'message_deleted':
+                this.handleMessageDeleted(data.data);
+                break;
+            case 'room_state':
+                this.roomStates[data.data.room_id] = data.data;
+                break;
+            case 'status_tick':
             case 'status_update':
-                this.updateStatus(data.data);
+                this.updateStatusDisplay(data.data);
                 break;
             case 'pong':
                 // Keep-alive response
@@ -656,6 +771,50 @@ class Dashboard {
         }
     }
     
+    applySnapshot(snapshot) {
+        // 接続時のスナップショットで全状態を置き換え
+        this.eventEpoch = snapshot.epoch;
+        this.eventSeq = snapshot.seq;
+        
+        const state = snapshot.data;
+        if (!state) {
+            return;
+        }
+        
+        this.updateStatusDisplay(state.status);
+        
+        this.setAlertsPage(state.alerts || {});
+        this.applyAlertsSummary(state.alerts?.summary);
+        
+        this.latestMessages = state.latest_messages || [];
+        const activeTab = document.querySelector('.tab-btn.active')?.dataset.tab;
+        if (activeTab === 'messages') {
+            this.displayLatestMessages();
+        }
+    }
+    
+    upsertAlert(alert) {
+        const index = this.pendingAlerts.findIndex(item => item.alert_id === alert.alert_id);
+        if (index >= 0) {
+            this.pendingAlerts[index] = alert;
+        } else if (!this.alertsNextCursor) {
+            // 一覧は追加日時の古い順のため、新しいアラートは末尾に入る
+            // （未読み込みのページがある場合は、続きを読み込んだ時に取得される）
+            this.pendingAlerts.push(alert);
+        }
+    }
+    
+    applyAlertsSummary(summary) {
+        // アラートのサマリーと（表示中なら）一覧を反映
+        this.alertsSummary = summary;
+        this.updateAlertsSummaryCards(summary);
+        
+        const activeTab = document.querySelector('.tab-btn.active')?.dataset.tab;
+        if (activeTab === 'alerts') {
+            this.updateAlertsDisplay({pending_alerts: this.pendingAlerts});
+        }
+    }
+    
     handleNewMessage(messageData) {
         // 新しいメッセージの通知
         this.showToast(`新しいメッセージ: ${messageData.sender}`, 'info');
@@ -665,14 +824,34 @@ class Dashboard {
             this.loadChatMessages(this.currentChatRoomId);
         }
         
-        // メッセージタブがアクティブの場合は最新メッセージを更新
+        // 最新メッセージ一覧に追加（APIは再取得しない）
+        if (messageData.message) {
+            const messages = (this.latestMessages || []).filter(msg =>
+                !(msg.room_id === messageData.room_id && msg.message_id === messageData.message_id));
+            messages.push(messageData.message);
+            messages.sort((a, b) => b.send_time - a.send_time);
+            this.latestMessages = messages.slice(0, 50);
+            
+            const activeTab = document.querySelector('.tab-btn.active')?.dataset.tab;
+            if (activeTab === 'messages') {
+                this.displayLatestMessages();
+            }
+        }
+    }
+    
+    handleMessageDeleted(data) {
+        // 削除されたメッセージを最新メッセージ一覧から除外
+        if (this.latestMessages) {
+            this.latestMessages = this.latestMessages.filter(msg =>
+                !(msg.room_id === data.room_id && msg.message_id === data.message_id));
+        }
+        
         const activeTab = document.querySelector('.tab-btn.active')?.dataset.tab;
         if (activeTab === 'messages') {
-            this.loadLatestMessages();
+            this.displayLatestMessages();
+        } else if (activeTab === 'deleted') {
+            this.loadDeletedMessages();
         }
-        
-        // ステータスを更新
-        this.refreshData();
     }
     
     updateConnectionStatus(connected) {
@@ -977,24 +1156,35 @@ class Dashboard {
     async loadAlerts() {
         console.log('🚨 loadAlerts() called');
         try {
-            const response = await fetch('/api/alerts');
-            const data = await response.json();
-            
-            if (response.ok) {
-                console.log('✅ Alerts loaded successfully');
-                this.updateAlertsDisplay(data);
-            } else {
-                throw new Error(data.detail || 'Alerts load failed');
-            }
+            const data = await this.fetchAlertsPage();
+            console.log('✅ Alerts loaded successfully');
+            this.setAlertsPage(data);
+            this.alertsSummary = data.summary;
+            this.updateAlertsDisplay({pending_alerts: this.pendingAlerts});
         } catch (error) {
             console.error('❌ Failed to load alerts:', error);
         }
     }
     
+    updateAlertsMore(shown) {
+        // 未読み込みのアラートがある場合は件数と「さらに読み込む」を表示
+        const more = document.getElementById('alertsMore');
+        if (!more) return;
+        
+        const total = this.alertsSummary?.total ?? shown;
+        more.style.display = this.alertsNextCursor ? 'block' : 'none';
+        const count = document.getElementById('alertsShownCount');
+        if (count) {
+            count.textContent = `${shown} / ${total}件を表示中`;
+        }
+    }
+    
     updateAlertsDisplay(data) {
         const alertsList = document.getElementById('alertsList');
         const noAlerts = document.getElementById('noAlerts');
         
+        this.updateAlertsMore(data.pending_alerts.length);
+        
         if (data.pending_alerts.length === 0) {
             alertsList.style.display = 'none';
             noAlerts.style.display = 'block';
@@ -1275,39 +1465,40 @@ class Dashboard {
     
     async showPendingAlerts() {
         try {
-            const response = await fetch('/api/alerts');
-            const data = await response.json();
+            const data = await this.fetchAlertsPage();
             
-            if (response.ok) {
-                let content = '<div class="detail-list">';
-                
-                if (data.pending_alerts.length === 0) {
-                    content += '<p>未処理のアラートはありません。</p>';
-                } else {
-                    data.pending_alerts.forEach(alert => {
-                        const timeElapsed = this.formatTimeElapsed(new Date(alert.added_at));
-                        content += `
-                            <div class="detail-item alert-item priority-${alert.priority}">
-                                <div class="detail-header">
-                                    <strong>${this.escapeHtml(alert.sender)}</strong>
-                                    <span class="priority-badge priority-${alert.priority}">${alert.priority}</span>
-                                </div>
-                                <div class="detail-body">
-                                    <p>${this.escapeHtml(alert.body.substring(0, 100))}${alert.body.length > 100 ? '...' : ''}</p>
-                                </div>
-                                <div class="detail-footer">
-                                    <span>ルーム: ${alert.room_id}</span>
-                                    <span>経過時間: ${timeElapsed}</span>
-                                    <span>通知回数: ${alert.alerts_sent}</span>
-                                </div>
+            let content = '<div class="detail-list">';
+            
+            if (data.pending_alerts.length === 0) {
+                content += '<p>未処理のアラートはありません。</p>';
+            } else {
+                data.pending_alerts.forEach(alert => {
+                    const timeElapsed = this.formatTimeElapsed(new Date(alert.added_at));
+                    content += `
+                        <div class="detail-item alert-item priority-${alert.priority}">
+                            <div class="detail-header">
+                                <strong>${this.escapeHtml(alert.sender)}</strong>
+                                <span class="priority-badge priority-${alert.priority}">${alert.priority}</span>
                             </div>
-                        `;
-                    });
-                }
-                
-                content += '</div>';
-                this.showModal('未処理アラート一覧', content);
+                            <div class="detail-body">
+                                <p>${this.escapeHtml(alert.body.substring(0, 100))}${alert.body.length > 100 ? '...' : ''}</p>
+                            </div>
+                            <div class="detail-footer">
+                                <span>ルーム: ${alert.room_id}</span>
+                                <span>経過時間: ${timeElapsed}</span>
+                                <span>通知回数: ${alert.alerts_sent}</span>
+                            </div>
+                        </div>
+                    `;
+                });
             }
+            
+            if (data.next_cursor) {
+                content += `<p class="text-muted">古い順に${data.pending_alerts.length}件を表示しています（全${data.total}件）</p>`;
+            }
+            
+            content += '</div>';
+            this.showModal('未処理アラート一覧', content);
         } catch (error) {
             this.showToast('アラート情報の取得に失敗しました', 'error');
         }
@@ -1315,41 +1506,42 @@ class Dashboard {
     
     async showHighPriorityAlerts() {
         try {
-            const response = await fetch('/api/alerts');
-            const data = await response.json();
+            const data = await this.fetchAlertsPage('priority=high');
             
-            if (response.ok) {
-                const highPriorityAlerts = data.pending_alerts.filter(alert => alert.priority === 'high');
-                
-                let content = '<div class="detail-list">';
-                
-                if (highPriorityAlerts.length === 0) {
-                    content += '<p>高優先度のアラートはありません。</p>';
-                } else {
-                    highPriorityAlerts.forEach(alert => {
-                        const timeElapsed = this.formatTimeElapsed(new Date(alert.added_at));
-                        content += `
-                            <div class="detail-item alert-item priority-high">
-                                <div class="detail-header">
-                                    <strong>${this.escapeHtml(alert.sender)}</strong>
-                                    <span class="priority-badge priority-high">🔥 高優先度</span>
-                                </div>
-                                <div class="detail-body">
-                                    <p>${this.escapeHtml(alert.body.substring(0, 150))}${alert.body.length > 150 ? '...' : ''}</p>
-                                </div>
-                                <div class="detail-footer">
-                                    <span>ルーム: ${alert.room_id}</span>
-                                    <span>経過時間: ${timeElapsed}</span>
-                                    <span>エスカレーション: Lv.${alert.escalation_level}</span>
-                                </div>
+            const highPriorityAlerts = data.pending_alerts;
+            
+            let content = '<div class="detail-list">';
+            
+            if (highPriorityAlerts.length === 0) {
+                content += '<p>高優先度のアラートはありません。</p>';
+            } else {
+                highPriorityAlerts.forEach(alert => {
+                    const timeElapsed = this.formatTimeElapsed(new Date(alert.added_at));
+                    content += `
+                        <div class="detail-item alert-item priority-high">
+                            <div class="detail-header">
+                                <strong>${this.escapeHtml(alert.sender)}</strong>
+                                <span class="priority-badge priority-high">🔥 高優先度</span>
                             </div>
-                        `;
-                    });
-                }
-                
-                content += '</div>';
-                this.showModal('高優先度アラート一覧', content);
+                            <div class="detail-body">
+                                <p>${this.escapeHtml(alert.body.substring(0, 150))}${alert.body.length > 150 ? '...' : ''}</p>
+                            </div>
+                            <div class="detail-footer">
+                                <span>ルーム: ${alert.room_id}</span>
+                                <span>経過時間: ${timeElapsed}</span>
+                                <span>エスカレーション: Lv.${alert.escalation_level}</span>
+                            </div>
+                        </div>
+                    `;
+                });
             }
+            
+            if (data.next_cursor) {
+                content += `<p class="text-muted">古い順に${data.pending_alerts.length}件を表示しています（全${data.total}件）</p>`;
+            }
+            
+            content += '</div>';
+            this.showModal('高優先度アラート一覧', content);
         } catch (error) {
             this.showToast('高優先度アラート情報の取得に失敗しました', 'error');
         }
@@ -3016,9 +3208,16 @@ class Dashboard {
         
         // タブ固有の処理
         if (tabName === 'messages') {
-            // 新着メッセージタブの処理
-            this.loadLatestMessages();
+            // 新着メッセージタブの処理（受信中は差分イベントで更新済みの一覧を表示）
+            if (this.isLive() && this.latestMessages) {
+                this.displayLatestMessages();
+            } else {
+                this.loadLatestMessages();
+            }
             this.updateMessageRoomFilter();
+        } else if (tabName === 'alerts' && this.isLive()) {
+            // アラートタブは差分イベントで更新済みの一覧を表示
+            this.updateAlertsDisplay({pending_alerts: this.pendingAlerts});
         } else if (tabName === 'deleted') {
             // 削除ログタブでルーム一覧と削除メッセージを読み込み
             this.loadDeletedRooms();
@@ -0,0 +1,84 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+# リポジトリ直下からsrcパッケージを読み込めるようにする
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class ChatWorkStub:
+    """ChatWork APIのスタブ（受信したリクエストを記録）"""
+
+    def __init__(self):
+        self.requests = []  # (メソッド, パス, クエリ)
+        self.messages = {}  # ルームID -> メッセージのリスト
+        self.rooms = []  # /rooms の応答
+        self.failures = {}  # ルームID -> メッセージ取得時に返すエラーのステータス
+        self.delay = 0.0  # メッセージ取得の応答を遅らせる秒数
+        self.in_flight = 0
+        self.max_in_flight = 0  # 同時に処理中だったメッセージ取得の最大数
+        self.server = None
+
+        self.app = web.Application()
+        self.app.router.add_get("/rooms", self.get_rooms)
+        self.app.router.add_get("/rooms/{room_id}/messages", self.get_messages)
+        self.app.router.add_route("*", "/{path:.*}", self.not_found)
+
+    @property
+    def base_url(self) -> str:
+        return str(self.server.make_url("")).rstrip("/")
+
+    def add_message(self, room_id: str, message_id: str, body: str, send_time: int):
+        self.messages.setdefault(room_id, []).append({
+            "message_id": message_id,
+            "account": {"account_id": 1, "name": "テストユーザー"},
+            "body": body,
+            "send_time": send_time,
+            "update_time": 0
+        })
+
+    def message_requests(self, room_id: str) -> list:
+        return [request for request in self.requests if request[1] == f"/rooms/{room_id}/messages"]
+
+    def add_room(self, room_id: str, last_update_time: int):
+        self.rooms = [room for room in self.rooms if str(room["room_id"]) != room_id]
+        self.rooms.append({"room_id": int(room_id), "name": f"room{room_id}", "type": "group",
+                           "last_update_time": last_update_time, "mention_num": 0, "unread_num": 0})
+
+    async def get_rooms(self, request: web.Request) -> web.Response:
+        self.requests.append((request.method, request.path, dict(request.query)))
+        return web.json_response(self.rooms)
+
+    async def get_messages(self, request: web.Request) -> web.Response:
+        self.requests.append((request.method, request.path, dict(request.query)))
+        if self.delay:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                await asyncio.sleep(self.delay)
+            finally:
+                self.in_flight -= 1
+        status = self.failures.get(request.match_info["room_id"])
+        if status:
+            return web.Response(status=status, text="stubbed failure")
+        messages = self.messages.get(request.match_info["room_id"], [])
+        if not messages:
+            return web.Response(status=204)
+        return web.json_response(messages)
+
+    async def not_found(self, request: web.Request) -> web.Response:
+        self.requests.append((request.method, request.path, dict(request.query)))
+        return web.Response(status=404, text="not stubbed")
+
+
+@pytest_asyncio.fixture
+async def chatwork_stub():
+    stub = ChatWorkStub()
+    stub.server = TestServer(stub.app)
+    await stub.server.start_server()
+    yield stub
+    await stub.server.close()
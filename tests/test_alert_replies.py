@@ -0,0 +1,107 @@
+from datetime import datetime
+
+import pytest
+
+from src.alert_system import AlertSystem, PendingAlert
+from src.chatwork_api import ChatWorkAccount, ChatWorkMessage
+from src.task_analyzer import MessageAnalysis
+
+ROOM = "101"
+BOT = 9000  # APIトークンのアカウント
+REQUESTER = 1  # アラートになったメッセージの送信者
+ASSIGNEE = 2  # そのメッセージの宛先
+OTHER = 3
+
+
+class FakeChatWorkAPI:
+    async def get_me(self):
+        return {"account_id": BOT, "name": "bot"}
+
+
+def make_message(message_id: str, account_id: int, body: str, send_time: int) -> ChatWorkMessage:
+    return ChatWorkMessage(message_id, ROOM, ChatWorkAccount(account_id, f"user{account_id}"), body, send_time, 0)
+
+
+async def alert_system_with_pending() -> AlertSystem:
+    system = AlertSystem(FakeChatWorkAPI(), None)
+    await system.restore_state()
+    message = make_message("500", REQUESTER, f"[To:{ASSIGNEE}] 明日までに確認をお願いします", 1000)
+    analysis = MessageAnalysis(True, "normal", [], [], [ASSIGNEE])
+    system._add_alert(f"{ROOM}_500", PendingAlert(message, analysis, datetime.now()))
+    return system
+
+
+@pytest.mark.asyncio
+async def test_own_account_is_resolved_once_at_restore():
+    system = await alert_system_with_pending()
+    assert system.own_account_id == BOT
+
+
+@pytest.mark.asyncio
+async def test_own_digest_does_not_resolve_alerts():
+    system = await alert_system_with_pending()
+    alerts = list(system.pending_alerts.items())
+    digest = await system._generate_digest_message(alerts)
+    assert f"[To:{ASSIGNEE}]" in digest
+
+    resolved = system.resolve_replies(make_message("501", BOT, digest, 2000))
+
+    assert resolved == []
+    assert f"{ROOM}_500" in system.pending_alerts
+
+
+@pytest.mark.asyncio
+async def test_third_party_mention_does_not_resolve_alerts():
+    system = await alert_system_with_pending()
+
+    resolved = system.resolve_replies(make_message("502", OTHER, f"[To:{REQUESTER}] 横から失礼します", 2000))
+
+    assert resolved == []
+    assert f"{ROOM}_500" in system.pending_alerts
+
+
+@pytest.mark.asyncio
+async def test_tags_inside_info_and_quotes_are_ignored():
+    system = await alert_system_with_pending()
+    body = (
+        f"[info][To:{REQUESTER}][rp aid={REQUESTER} to={ROOM}-500] 転記[/info]"
+        f"[qt][To:{REQUESTER}][rp aid={REQUESTER} to={ROOM}-500][/qt]"
+    )
+
+    assert system.resolve_replies(make_message("503", ASSIGNEE, body, 2000)) == []
+    assert f"{ROOM}_500" in system.pending_alerts
+
+
+@pytest.mark.asyncio
+async def test_assignee_mention_resolves_alert():
+    system = await alert_system_with_pending()
+
+    # 元のメッセージより前の投稿は返信とみなさない
+    assert system.resolve_replies(make_message("400", ASSIGNEE, f"[To:{REQUESTER}] 先日の件", 900)) == []
+
+    resolved = system.resolve_replies(make_message("504", ASSIGNEE, f"[To:{REQUESTER}] 確認しました", 2000))
+
+    assert resolved == [f"{ROOM}_500"]
+    assert system.pending_alerts == {}
+    assert system.auto_resolved_count == 1
+
+
+@pytest.mark.asyncio
+async def test_reply_tag_targeting_the_alert_resolves_it():
+    system = await alert_system_with_pending()
+
+    # 別のメッセージへの返信や、送信者の取り違えは対象外
+    assert system.resolve_replies(make_message("505", OTHER, f"[rp aid={REQUESTER} to={ROOM}-499] 別件", 2000)) == []
+    assert system.resolve_replies(make_message("506", OTHER, f"[rp aid={OTHER} to={ROOM}-500] 自分宛", 2000)) == []
+
+    resolved = system.resolve_replies(make_message("507", OTHER, f"[rp aid={REQUESTER} to={ROOM}-500] 対応します", 2000))
+
+    assert resolved == [f"{ROOM}_500"]
+
+
+@pytest.mark.asyncio
+async def test_load_own_account_failure_is_not_fatal():
+    system = AlertSystem(None, None)
+    await system.load_own_account()  # 取得に失敗しても例外にしない
+
+    assert system.own_account_id is None
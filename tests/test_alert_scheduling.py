@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.alert_system import AlertSystem, PendingAlert
+from src.chatwork_api import ChatWorkAccount, ChatWorkMessage
+from src.task_analyzer import MessageAnalysis
+
+ROOM = "101"
+
+
+class RecordingOutbound:
+    def __init__(self):
+        self.sent = []  # (ルームID, 本文, 優先度, キー)
+
+    def enqueue(self, room_id, body, priority="normal", key=None):
+        self.sent.append((room_id, body, priority, key))
+        return True
+
+
+def make_alert(message_id: str, priority: str, age: timedelta, room_id: str = ROOM) -> PendingAlert:
+    message = ChatWorkMessage(message_id, room_id, ChatWorkAccount(1, "user"), "確認をお願いします", 1000, 0)
+    return PendingAlert(message, MessageAnalysis(True, priority, [], [], []), datetime.now() - age)
+
+
+def alert_system() -> AlertSystem:
+    return AlertSystem(None, None, outbound=RecordingOutbound())
+
+
+@pytest.mark.asyncio
+async def test_overdue_alert_is_sent_and_rescheduled_for_escalation():
+    system = alert_system()
+    system._add_alert(f"{ROOM}_1", make_alert("1", "high", timedelta(minutes=31)))
+    assert system._seconds_until_next_due() == 0
+
+    await system._check_pending_alerts()
+
+    assert len(system.outbound.sent) == 1
+    alert = system.pending_alerts[f"{ROOM}_1"]
+    assert (alert.alerts_sent, alert.escalation_level) == (1, 1)
+    # 次はエスカレーションレベル1の間隔（180分）の後
+    assert system._seconds_until_next_due() == pytest.approx(180 * 60, abs=5)
+
+
+@pytest.mark.asyncio
+async def test_rescheduled_alert_does_not_fire_at_its_old_due_time():
+    system = alert_system()
+    alert_id = f"{ROOM}_1"
+    system._add_alert(alert_id, make_alert("1", "high", timedelta(minutes=40)))
+
+    # 優先度が下がり、送信時刻が追加から24時間後に変わる
+    system._add_alert(alert_id, make_alert("1", "low", timedelta(minutes=40)))
+    assert len(system._due_heap) == 2
+
+    # 送信時刻を過ぎた古いエントリは無効化されているため送らない
+    await system._check_pending_alerts()
+
+    assert system.outbound.sent == []
+    assert len(system._due_heap) == 1
+    assert system._seconds_until_next_due() == pytest.approx((24 * 60 - 40) * 60, abs=5)
+
+
+@pytest.mark.asyncio
+async def test_resolved_alerts_never_fire():
+    system = alert_system()
+    system._add_alert(f"{ROOM}_1", make_alert("1", "high", timedelta(hours=1)))
+    system._add_alert(f"{ROOM}_2", make_alert("2", "normal", timedelta(hours=3)))
+
+    await system.mark_as_replied(ROOM, "1")
+    system._remove_alert(f"{ROOM}_2", reason="auto_resolved")
+    await system._check_pending_alerts()
+
+    assert system.outbound.sent == []
+    assert system._due_heap == []
+    assert system._seconds_until_next_due() is None
+
+
+@pytest.mark.asyncio
+async def test_due_alerts_in_one_room_are_sent_as_one_digest():
+    system = alert_system()
+    system._add_alert(f"{ROOM}_1", make_alert("1", "high", timedelta(minutes=31)))
+    # 30秒後に送信時刻を迎える同じルームのアラートはまとめる
+    system._add_alert(f"{ROOM}_2", make_alert("2", "high", timedelta(minutes=29, seconds=30)))
+    # 他のルームのアラートは送信時刻まで待つ
+    system._add_alert("102_3", make_alert("3", "high", timedelta(minutes=29, seconds=30), room_id="102"))
+
+    await system._check_pending_alerts()
+
+    assert [room_id for room_id, *_ in system.outbound.sent] == [ROOM]
+    assert system.pending_alerts[f"{ROOM}_2"].alerts_sent == 1
+    assert system.pending_alerts["102_3"].alerts_sent == 0
+
+
+def test_repeated_rescheduling_keeps_the_heap_bounded():
+    system = alert_system()
+    for index in range(10):
+        system._add_alert(f"{ROOM}_{index}", make_alert(str(index), "normal", timedelta(0)))
+
+    for _ in range(100):
+        for index in range(10):
+            system._add_alert(f"{ROOM}_{index}", make_alert(str(index), "normal", timedelta(0)))
+
+    assert len(system._due_versions) == 10
+    assert len(system._due_heap) <= 2 * 10 + 64 + 1
@@ -0,0 +1,125 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.alert_system import AlertSystem, PendingAlert
+from src.chatwork_api import ChatWorkAccount, ChatWorkMessage
+from src.task_analyzer import MessageAnalysis
+
+START = datetime(2026, 3, 10, 9, 0)
+PRIORITIES = ("high", "normal", "low")
+
+
+def make_alert(index: int, room_id: str, priority: str, added_at: datetime) -> PendingAlert:
+    message = ChatWorkMessage(str(index), room_id, ChatWorkAccount(index % 7, "user"), "確認お願いします", 0, 0)
+    return PendingAlert(message, MessageAnalysis(True, priority, [], [], []), added_at)
+
+
+def populated_system(count: int = 30, start: datetime = START) -> AlertSystem:
+    """3ルーム・3優先度のアラートを追加日時の順不同で登録"""
+    system = AlertSystem(None, None)
+    for index in range(count):
+        room_id = str(100 + index % 3)
+        # 同じ追加日時のアラートも含める
+        added_at = start + timedelta(minutes=(index * 7) % count // 2)
+        system._add_alert(f"{room_id}_{index}", make_alert(index, room_id, PRIORITIES[index % 3], added_at))
+    return system
+
+
+def assert_counts_match(system: AlertSystem):
+    """集計値がpending_alertsを数え直した結果と一致する"""
+    alerts = system.pending_alerts.values()
+    by_priority = Counter(alert.analysis.priority for alert in alerts)
+    summary = system.build_summary()
+
+    assert summary["total"] == len(system.pending_alerts)
+    assert summary["by_priority"] == {priority: by_priority.get(priority, 0) for priority in PRIORITIES}
+    assert summary["by_room"] == dict(Counter(alert.message.room_id for alert in alerts))
+    if system.pending_alerts:
+        oldest_id = min(system.pending_alerts, key=lambda alert_id: (system.pending_alerts[alert_id].added_at, alert_id))
+        assert summary["oldest_alert"]["message_id"] == system.pending_alerts[oldest_id].message.message_id
+    else:
+        assert summary["oldest_alert"] is None
+
+
+@pytest.mark.asyncio
+async def test_counts_follow_add_resolve_and_expire():
+    system = populated_system(start=datetime.now() - timedelta(hours=1))
+    assert_counts_match(system)
+
+    # 同じIDでの再登録（優先度の変更）は二重に数えない
+    system._add_alert("100_0", make_alert(0, "100", "low", datetime.now()))
+    assert_counts_match(system)
+
+    await system.mark_as_replied("101", "1")
+    system._remove_alert("102_2", reason="auto_resolved")
+    assert_counts_match(system)
+    assert "101" in system.build_summary()["by_room"]
+
+    # 48時間より古いアラートは期限切れとして削除される
+    old = datetime.now() - timedelta(hours=49)
+    system._add_alert("103_900", make_alert(900, "103", "high", old))
+    system._add_alert("100_901", make_alert(901, "100", "normal", old))
+    assert_counts_match(system)
+    expired = await system.clear_old_alerts(hours=48)
+    assert sorted(expired) == ["100_901", "103_900"]
+    assert "103" not in system.build_summary()["by_room"]
+    assert_counts_match(system)
+
+    for alert_id in list(system.pending_alerts):
+        system._remove_alert(alert_id)
+    assert_counts_match(system)
+    assert system.build_summary()["by_room"] == {}
+    assert system.build_summary()["by_priority"] == {"high": 0, "normal": 0, "low": 0}
+
+
+def collect_pages(system: AlertSystem, limit: int, priority=None) -> tuple:
+    """afterに前ページの最後のアラートを指定して全ページを取得"""
+    pages = []
+    after = None
+    while True:
+        page, total = system.get_alerts_page(limit, priority, after)
+        if not page:
+            return pages, total
+        pages.append([alert_id for alert_id, _ in page])
+        alert_id, alert = page[-1]
+        after = (alert.added_at, alert_id)
+
+
+@pytest.mark.parametrize("limit", [1, 4, 7, 100])
+def test_cursor_paging_visits_every_alert_once_in_added_order(limit):
+    system = populated_system()
+    expected = sorted(system.pending_alerts, key=lambda alert_id: (system.pending_alerts[alert_id].added_at, alert_id))
+
+    pages, total = collect_pages(system, limit)
+
+    assert total == 30
+    assert all(len(page) <= limit for page in pages)
+    assert [alert_id for page in pages for alert_id in page] == expected
+
+
+def test_cursor_paging_by_priority():
+    system = populated_system()
+
+    pages, total = collect_pages(system, 3, priority="high")
+
+    alert_ids = [alert_id for page in pages for alert_id in page]
+    assert total == 10
+    assert len(alert_ids) == 10
+    assert all(system.pending_alerts[alert_id].analysis.priority == "high" for alert_id in alert_ids)
+
+
+def test_cursor_stays_valid_when_alerts_are_resolved_between_pages():
+    system = populated_system()
+    expected = sorted(system.pending_alerts, key=lambda alert_id: (system.pending_alerts[alert_id].added_at, alert_id))
+
+    first, _ = system.get_alerts_page(5)
+    # 前ページの最後のアラートとその次のアラートが解決されても続きから読める
+    last_id, last = first[-1]
+    system._remove_alert(last_id)
+    system._remove_alert(expected[5])
+    rest, total = system.get_alerts_page(100, None, (last.added_at, last_id))
+
+    assert total == 28
+    assert [alert_id for alert_id, _ in rest] == expected[6:]
@@ -0,0 +1,105 @@
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.task_analyzer_bench import NOW, to_message
+from src.analysis_cache import STORE_NAMESPACE, AnalysisCache
+from src.task_analyzer import TaskAnalyzer
+from test_message_cache import RecordingStore
+
+TODAY = date(2026, 3, 10)
+VERSION = "v1"
+
+
+def fill(cache: AnalysisCache, *names, analyzed_on=None):
+    for name in names:
+        cache.put(name, VERSION, {"summary": name}, analyzed_on)
+
+
+def test_least_recently_used_entry_is_evicted():
+    store = RecordingStore()
+    cache = AnalysisCache(max_entries=3, store=store)
+    fill(cache, "a", "b", "c")
+
+    assert cache.get("a", TODAY) == {"summary": "a"}  # aを最近使ったものにする
+    fill(cache, "d")
+
+    assert cache.get("b", TODAY) is None
+    assert [cache.get(name, TODAY)["summary"] for name in ("a", "c", "d")] == ["a", "c", "d"]
+    assert cache.evictions == 1
+    assert sorted(store.data[STORE_NAMESPACE]) == ["a", "c", "d"]
+
+
+def test_date_dependent_results_expire_when_the_day_changes():
+    cache = AnalysisCache()
+    fill(cache, "tomorrow", analyzed_on=TODAY)
+    fill(cache, "plain")
+
+    assert cache.get("tomorrow", TODAY) == {"summary": "tomorrow"}
+    next_day = TODAY + timedelta(days=1)
+    assert cache.get("tomorrow", next_day) is None
+    assert cache.get("plain", next_day) == {"summary": "plain"}
+    assert cache.get_status()["expired"] == 1
+
+
+@pytest.mark.asyncio
+async def test_analyzer_reanalyzes_relative_deadlines_on_a_new_day():
+    analyzer = TaskAnalyzer(None)
+    messages = [to_message(1, "明日までに資料の確認をお願いします"), to_message(2, "資料の確認をお願いします")]
+
+    first = await analyzer.analyze_many(messages, NOW)
+    await analyzer.analyze_many(messages, NOW)
+    assert analyzer.inline_count == 2
+
+    later = await analyzer.analyze_many(messages, NOW + timedelta(days=1))
+    # 「明日」だけが再分析され、基準日から解釈し直される
+    assert analyzer.inline_count == 3
+    assert later[0].deadline != first[0].deadline
+    assert later[1] == first[1]
+
+
+def test_changed_rules_do_not_share_cache_keys():
+    body = "資料の確認をお願いします"
+    default = TaskAnalyzer(None)
+    changed = TaskAnalyzer(None)
+    changed.task_patterns = changed.task_patterns + ["追加のパターン"]
+    changed._compile_patterns()
+
+    assert default.rules_version != changed.rules_version
+    assert AnalysisCache.make_key(default.rules_version, body) != AnalysisCache.make_key(changed.rules_version, body)
+
+
+@pytest.mark.asyncio
+async def test_restore_keeps_the_newest_entries_of_the_current_rules():
+    store = RecordingStore({STORE_NAMESPACE: {
+        "old": {"rules_version": VERSION, "date": None, "analysis": {"summary": "old"}, "cached_at": 1},
+        "new": {"rules_version": VERSION, "date": None, "analysis": {"summary": "new"}, "cached_at": 3},
+        "mid": {"rules_version": VERSION, "date": None, "analysis": {"summary": "mid"}, "cached_at": 2},
+        "stale": {"rules_version": "v0", "date": None, "analysis": {"summary": "stale"}, "cached_at": 4},
+    }})
+    cache = AnalysisCache(max_entries=2, store=store)
+
+    await cache.restore_state(VERSION)
+
+    assert cache.get("mid", TODAY) == {"summary": "mid"}
+    assert cache.get("new", TODAY) == {"summary": "new"}
+    assert cache.get("old", TODAY) is None
+    # 上限を超えた分とルールバージョンが異なる分はストアからも消す
+    assert sorted(store.data[STORE_NAMESPACE]) == ["mid", "new"]
+
+
+@pytest.mark.asyncio
+async def test_persisted_cache_is_reused_after_a_restart():
+    store = RecordingStore()
+    config = SimpleNamespace(analysis_cache_persist=True)
+    messages = [to_message(1, "至急、資料の確認をお願いします！")]
+
+    analyzer = TaskAnalyzer(config, store)
+    expected = await analyzer.analyze_many(messages, NOW)
+
+    restarted = TaskAnalyzer(config, store)
+    await restarted.restore_state()
+    assert await restarted.analyze_many(messages, NOW) == expected
+    assert restarted.inline_count == 0
+    assert restarted.cache.hits == 1
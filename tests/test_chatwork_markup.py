@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from src.chatwork_markup import ReplyRef, parse_markup
+
+
+def test_nested_quote_and_info_are_excluded_from_replies_and_analysis():
+    parsed = parse_markup(
+        "[rp aid=11 to=101-5]了解です\n"
+        "[qt][qtmeta aid=12 time=1700000000][To:13]至急[info][rp aid=14 to=101-6]返信[/info][/qt]"
+        "[info][title]連絡[/title][To:15]確認済み[rp aid=16 to=101-7][/info]"
+        "[To:17]お願いします"
+    )
+
+    assert parsed.replies == [ReplyRef(11, "101", "5")]
+    # 引用内の[To:]は宛先に含めず、[info]内の[To:]は返信の判定にだけ使わない
+    assert parsed.mentions == [15, 17]
+    assert parsed.reply_mentions == [17]
+    assert parsed.analysis_text == "了解です\n連絡\n[To:15]確認済み[To:17]お願いします"
+    assert "至急" in parsed.plain_text and "至急" not in parsed.analysis_text
+
+
+def test_to_all_and_delete_tags_outside_quotes_only():
+    assert parse_markup("[toall]全員確認してください").to_all
+    assert not parse_markup("[qt][toall]引用[/qt]").to_all
+    assert parse_markup("[deleted]").has_delete
+    assert not parse_markup("[qt][delete][/qt]").has_delete
+
+
+def test_reply_without_room_or_message_id():
+    assert parse_markup("[rp aid=5]返信").replies == [ReplyRef(5, None, None)]
+    assert parse_markup("[rp aid=abc]返信").replies == []
+
+
+def test_code_block_keeps_tags_as_text():
+    parsed = parse_markup("[code][To:1][qt]例[/qt][/code]")
+
+    assert parsed.mentions == []
+    assert parsed.analysis_text == "[To:1][qt]例[/qt]"
+
+
+@pytest.mark.parametrize("body", [
+    "[qt]閉じられていない引用",
+    "[/qt]開始タグのない終了タグ",
+    "[qt][info]内側が閉じられていない[/qt]後ろの本文",
+    "[To:abc][To:]不正なID",
+    "[重要] 通常の括弧書き [To:12",
+    "[rp aid=1 to=101-5",
+])
+def test_malformed_markup_round_trips_and_never_raises(body):
+    parsed = parse_markup(body)
+
+    assert parsed.to_markup() == body
+
+
+def test_unclosed_inner_tag_is_closed_by_the_outer_one():
+    parsed = parse_markup("[qt][info]内側[/qt][To:3]外側")
+
+    assert parsed.mentions == [3]
+    assert parsed.analysis_text == "[To:3]外側"
+
+
+def test_unclosed_quote_swallows_the_rest_of_the_message():
+    parsed = parse_markup("前[qt][To:1]引用のまま")
+
+    assert parsed.mentions == []
+    assert parsed.analysis_text == "前"
+
+
+@pytest.mark.parametrize("unit", ["[To:", "[rp aid=1", "[rp aid=1 to=1-2 ", "[qt]", "[/qt]", "[qt][info]", "[", "[To:1"])
+def test_adversarial_input_is_parsed_in_linear_time(unit):
+    body = unit * 50000
+
+    started = time.perf_counter()
+    parsed = parse_markup(body)
+    elapsed = time.perf_counter() - started
+
+    # 二乗時間では数分かかる長さ
+    assert elapsed < 2.0
+    assert parsed.to_markup() == body
@@ -0,0 +1,51 @@
+import sys
+
+from src.dedupe import TimeBucketedDedupe
+
+HOUR = 3600
+
+
+def recomputed_memory_bytes(dedupe: TimeBucketedDedupe) -> int:
+    """全キーを走査して求めたメモリ使用量（以前の計算方法）"""
+    size = sys.getsizeof(dedupe._entries) + sys.getsizeof(dedupe._buckets)
+    for bucket, keys in dedupe._buckets.items():
+        size += sys.getsizeof(keys) + sys.getsizeof(bucket)
+        size += sum(sys.getsizeof(key) for key in keys)
+    return size
+
+
+def test_keys_expire_with_their_bucket():
+    dedupe = TimeBucketedDedupe(max_age_seconds=2 * HOUR)
+    dedupe.add("101_1", 0)
+    dedupe.add("101_2", HOUR)
+
+    assert dedupe.evict(2 * HOUR) == []
+    assert dedupe.evict(3 * HOUR) == ["101_1"]
+    assert "101_1" not in dedupe and "101_2" in dedupe
+    assert dedupe.get_status()["evicted"] == 1
+
+
+def test_readded_key_survives_its_old_bucket():
+    dedupe = TimeBucketedDedupe(max_age_seconds=2 * HOUR)
+    dedupe.add("101_1", 0)
+    dedupe.add("101_1", 2 * HOUR)
+
+    assert dedupe.evict(3 * HOUR) == []
+    assert "101_1" in dedupe
+
+
+def test_memory_bytes_is_tracked_across_add_and_evict():
+    dedupe = TimeBucketedDedupe(max_age_seconds=2 * HOUR)
+    for hour in range(6):
+        for index in range(50):
+            dedupe.add(f"{100 + index % 3}_{hour * 1000 + index}", hour * HOUR + index)
+        # 既存のキーを新しいバケットに移す
+        dedupe.add(f"100_{(hour - 1) * 1000}", hour * HOUR)
+        assert dedupe.memory_bytes() == recomputed_memory_bytes(dedupe)
+
+        dedupe.evict(hour * HOUR + HOUR - 1)
+        assert dedupe.memory_bytes() == recomputed_memory_bytes(dedupe)
+
+    dedupe.evict(100 * HOUR)
+    assert len(dedupe) == 0
+    assert dedupe._key_bytes == 0
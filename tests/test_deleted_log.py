@@ -0,0 +1,102 @@
+import itertools
+
+import httpx
+import pytest
+
+import web.api_server as api_server
+from src.chatwork_api import ChatWorkAPI, deleted_log_key
+from src.pagination import encode_cursor
+
+
+def deleted_entry(room_id: str, message_id: str, deleted_at: str) -> dict:
+    return {"message_id": message_id, "room_id": room_id, "body": f"本文{message_id}",
+            "sender": "user", "deleted_at": deleted_at}
+
+
+def api_with_deleted_log() -> ChatWorkAPI:
+    """3ルームの削除ログ（ルームをまたいで削除時刻が同じものを含む）"""
+    api = ChatWorkAPI("token")
+    times = [f"2026-03-10T09:{minute:02d}:00" for minute in range(6)]
+    logs = {
+        "101": [deleted_entry("101", str(index), times[index % 6]) for index in range(8)],
+        "102": [deleted_entry("102", str(index), times[(index * 2) % 6]) for index in range(5)],
+        "103": [deleted_entry("103", "1", times[3]), deleted_entry("103", "2", times[3])],
+        "104": [],
+    }
+    api.deleted_messages = {room_id: sorted(log, key=deleted_log_key) for room_id, log in logs.items()}
+    return api
+
+
+def expected_order(api: ChatWorkAPI) -> list:
+    entries = itertools.chain.from_iterable(api.deleted_messages.values())
+    return sorted((deleted_log_key(entry) for entry in entries), reverse=True)
+
+
+def test_merge_returns_newest_first_with_ties_broken_by_room_and_message():
+    api = api_with_deleted_log()
+
+    keys = [deleted_log_key(entry) for entry in api.page_deleted_messages()]
+
+    assert keys == expected_order(api)
+    # 削除時刻が同じ場合はルームID・メッセージIDの降順
+    tied = [key for key in keys if key[0] == "2026-03-10T09:03:00"]
+    assert tied == sorted(tied, reverse=True)
+    assert {room_id for _, room_id, _ in tied} == {"101", "103"}
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 5, 100])
+def test_before_cursor_pages_through_every_entry_once(limit):
+    api = api_with_deleted_log()
+
+    pages = []
+    before = None
+    while True:
+        page = api.page_deleted_messages(limit, before)
+        if not page:
+            break
+        assert len(page) <= limit
+        pages.append(page)
+        before = deleted_log_key(page[-1])
+
+    keys = [deleted_log_key(entry) for page in pages for entry in page]
+    assert keys == expected_order(api)
+
+
+def test_cursor_excludes_the_tied_entry_it_points_at():
+    api = api_with_deleted_log()
+    # 削除時刻が同じ2ルームのうち、先に並ぶルーム103の2件を読み終えた位置
+    before = ("2026-03-10T09:03:00", "103", "1")
+
+    keys = [deleted_log_key(entry) for entry in api.page_deleted_messages(None, before)]
+
+    assert keys == [key for key in expected_order(api) if key < before]
+    assert keys[0] == ("2026-03-10T09:03:00", "101", "3")
+
+
+@pytest.mark.asyncio
+async def test_endpoint_defaults_limit_and_pages_with_cursor(monkeypatch):
+    api = api_with_deleted_log()
+
+    async def get_rooms():
+        return [{"room_id": 101, "name": "開発"}]
+
+    api.get_rooms = get_rooms
+
+    class Manager:
+        chatwork_api = api
+
+    monkeypatch.setattr(api_server, "ai_manager", Manager())
+    transport = httpx.ASGITransport(app=api_server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        data = (await client.get("/api/deleted-messages", params={"limit": 4})).json()
+        assert len(data["deleted_messages"]) == 4
+        assert data["deleted_messages"][0]["room_name"] == "開発"
+
+        rest = (await client.get("/api/deleted-messages", params={"cursor": data["next_cursor"]})).json()
+        assert rest["next_cursor"] is None  # 省略時のlimitは100件
+
+        keys = [deleted_log_key(entry) for entry in data["deleted_messages"] + rest["deleted_messages"]]
+        assert keys == expected_order(api)
+
+        bad = await client.get("/api/deleted-messages", params={"cursor": encode_cursor("only-one")})
+        assert bad.status_code == 400
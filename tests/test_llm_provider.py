@@ -0,0 +1,198 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.llm_provider import LLMEscalator, LLMProvider
+from src.task_analyzer import MessageAnalysis, TaskAnalyzer
+from src.chatwork_api import ChatWorkAccount, ChatWorkMessage
+
+NOW = datetime(2026, 3, 10, 9, 30)
+
+
+class StubProvider(LLMProvider):
+    """受け取ったバッチを記録し、本文ごとの要約を返すスタブ"""
+
+    name = "stub"
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []  # リクエストごとの本文のリスト
+        self.headers = []  # リクエストごとの基準日の行
+        self.active = 0
+        self.max_active = 0
+        self.completed = 0
+
+    async def complete(self, system: str, prompt: str) -> str:
+        header, payload = prompt.split("\n\n", 1)
+        messages = json.loads(payload)
+        self.headers.append(header)
+        self.batches.append([message["body"] for message in messages])
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError("provider unavailable")
+            self.completed += 1
+            return json.dumps([
+                {"index": message["index"], "requires_reply": True, "priority": "high",
+                 "tasks": [], "questions": [], "sentiment": "neutral", "summary": f"LLM: {message['body']}"}
+                for message in messages
+            ], ensure_ascii=False)
+        finally:
+            self.active -= 1
+
+
+def builtin_analysis(summary: str = "通常メッセージ") -> MessageAnalysis:
+    return MessageAnalysis(
+        requires_reply=False, priority="normal", tasks=[], questions=[], mentions=[],
+        summary=summary, confidence_score=0.1
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_escalations_are_batched():
+    provider = StubProvider()
+    escalator = LLMEscalator(provider, batch_size=4, batch_wait=0.05)
+    bodies = [f"メッセージ{index}" for index in range(10)]
+
+    results = await asyncio.gather(*(escalator.refine(body, builtin_analysis(), NOW) for body in bodies))
+
+    # batch_size件に達した時点で送信し、残りはbatch_wait後にまとめて送信
+    assert [len(batch) for batch in provider.batches] == [4, 4, 2]
+    assert sorted(body for batch in provider.batches for body in batch) == sorted(bodies)
+    # 各呼び出し元には自分のメッセージの結果が返る
+    assert [result.summary for result in results] == [f"LLM: {body}" for body in bodies]
+    assert all(result.confidence_score >= 0.9 for result in results)
+
+    status = escalator.get_status()
+    assert status["batches"] == 3
+    assert status["refined"] == 10
+    assert status["avg_batch_size"] == round(10 / 3, 2)
+
+
+@pytest.mark.asyncio
+async def test_batch_wait_flushes_a_partial_batch():
+    provider = StubProvider()
+    escalator = LLMEscalator(provider, batch_size=8, batch_wait=0.01)
+
+    result = await escalator.refine("単独のメッセージ", builtin_analysis(), NOW)
+
+    assert provider.batches == [["単独のメッセージ"]]
+    assert result.summary == "LLM: 単独のメッセージ"
+
+
+@pytest.mark.asyncio
+async def test_requests_are_capped_at_max_concurrency():
+    provider = StubProvider(delay=0.05)
+    escalator = LLMEscalator(provider, batch_size=1, batch_wait=0, max_concurrency=2, latency_budget=5)
+
+    results = await asyncio.gather(*(
+        escalator.refine(f"メッセージ{index}", builtin_analysis(), NOW) for index in range(6)
+    ))
+
+    assert len(provider.batches) == 6
+    assert provider.max_active == 2
+    assert escalator.in_flight == 0
+    assert all(result.summary.startswith("LLM: ") for result in results)
+
+
+@pytest.mark.asyncio
+async def test_latency_budget_falls_back_to_builtin_result():
+    provider = StubProvider(delay=0.2)
+    escalator = LLMEscalator(provider, batch_size=1, batch_wait=0, latency_budget=0.05)
+    builtin = builtin_analysis("組み込み分析")
+
+    started = asyncio.get_running_loop().time()
+    result = await escalator.refine("時間のかかるメッセージ", builtin, NOW)
+    elapsed = asyncio.get_running_loop().time() - started
+
+    assert result is builtin
+    assert elapsed < 0.2
+    assert escalator.get_status()["fallback_timeout"] == 1
+
+    # 遅れて届いた結果は破棄される
+    await asyncio.sleep(0.25)
+    assert provider.completed == 1
+    assert escalator.get_status()["refined"] == 0
+
+
+@pytest.mark.asyncio
+async def test_timed_out_messages_waiting_for_a_slot_are_not_sent():
+    provider = StubProvider(delay=0.2)
+    escalator = LLMEscalator(provider, batch_size=1, batch_wait=0, max_concurrency=1, latency_budget=0.05)
+
+    results = await asyncio.gather(*(
+        escalator.refine(f"メッセージ{index}", builtin_analysis(), NOW) for index in range(3)
+    ))
+    assert all(result.summary == "通常メッセージ" for result in results)
+    assert escalator.get_status()["fallback_timeout"] == 3
+
+    # 送信済みの1件が終わった後、空き待ちだった2件は送信されずに破棄される
+    await asyncio.sleep(0.3)
+    assert provider.batches == [["メッセージ0"]]
+    assert escalator.get_status()["batches"] == 1
+    assert escalator.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_batches_are_split_by_base_date():
+    provider = StubProvider()
+    escalator = LLMEscalator(provider, batch_size=8, batch_wait=0.01)
+    tomorrow = NOW + timedelta(days=1)
+
+    results = await asyncio.gather(
+        escalator.refine("今日のメッセージ", builtin_analysis(), NOW),
+        escalator.refine("翌日のメッセージ", builtin_analysis(), tomorrow),
+        escalator.refine("今日の別のメッセージ", builtin_analysis(), NOW + timedelta(hours=1)),
+    )
+
+    assert provider.batches == [["今日のメッセージ", "今日の別のメッセージ"], ["翌日のメッセージ"]]
+    assert provider.headers == ["基準日: 2026-03-10", "基準日: 2026-03-11"]
+    assert [result.summary for result in results] == [
+        "LLM: 今日のメッセージ", "LLM: 翌日のメッセージ", "LLM: 今日の別のメッセージ"
+    ]
+
+
+def test_provider_must_implement_complete():
+    class IncompleteProvider(LLMProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        IncompleteProvider()
+
+
+@pytest.mark.asyncio
+async def test_provider_error_falls_back_to_builtin_result():
+    escalator = LLMEscalator(StubProvider(fail=True), batch_size=1, batch_wait=0)
+    builtin = builtin_analysis("組み込み分析")
+
+    result = await escalator.refine("エラーになるメッセージ", builtin, NOW)
+
+    assert result is builtin
+    assert escalator.get_status()["fallback_error"] == 1
+
+
+@pytest.mark.asyncio
+async def test_analyzer_escalates_only_low_confidence_messages():
+    provider = StubProvider()
+    analyzer = TaskAnalyzer(None, llm=LLMEscalator(provider, threshold=0.4, min_chars=15, batch_wait=0.01))
+    account = ChatWorkAccount(account_id=1, name="テストユーザー")
+    messages = [
+        # 信頼度が低いためエスカレーションされる
+        ChatWorkMessage("1", "101", account, "先日の打ち合わせの内容について少し考えていました", 0, 0),
+        # 短い定型メッセージは対象外
+        ChatWorkMessage("2", "101", account, "了解です", 0, 0),
+        # タスクとメンションを含むため信頼度が高い
+        ChatWorkMessage("3", "101", account, "[To:5] 明日までに資料の確認をお願いします。いつ頃できそうですか？", 0, 0),
+    ]
+
+    results = await analyzer.analyze_many(messages, NOW)
+
+    assert provider.batches == [["先日の打ち合わせの内容について少し考えていました"]]
+    assert results[0].summary == "LLM: 先日の打ち合わせの内容について少し考えていました"
+    assert not results[1].summary.startswith("LLM: ")
+    assert not results[2].summary.startswith("LLM: ")
@@ -0,0 +1,110 @@
+import pytest
+
+from src.chatwork_api import (
+    ChatWorkAccount, ChatWorkAPI, ChatWorkMessage, MESSAGE_CACHE_SIZE, cached_message_key, message_to_dict
+)
+from src.storage import StateStore
+
+ROOM = "101"
+
+
+class RecordingStore(StateStore):
+    """put/deleteを記録し、反映後の内容をloadで返すストア"""
+
+    def __init__(self, data=None):
+        self.data = {namespace: dict(values) for namespace, values in (data or {}).items()}
+        self.writes = []  # (操作, 名前空間, キー)
+
+    def put(self, namespace, key, value):
+        self.writes.append(("put", namespace, key))
+        self.data.setdefault(namespace, {})[key] = value
+
+    def delete(self, namespace, key):
+        self.writes.append(("delete", namespace, key))
+        self.data.get(namespace, {}).pop(key, None)
+
+    async def load(self, namespace):
+        return dict(self.data.get(namespace, {}))
+
+
+def make_message(message_id: int, update_time: int = 0) -> ChatWorkMessage:
+    return ChatWorkMessage(str(message_id), ROOM, ChatWorkAccount(1, "user"), f"本文{message_id}", 1000 + message_id, update_time)
+
+
+def test_pushed_messages_are_trimmed_and_persisted_one_by_one():
+    store = RecordingStore()
+    api = ChatWorkAPI("token", store=store)
+
+    for message_id in range(1, MESSAGE_CACHE_SIZE + 6):
+        api.record_pushed_message(make_message(message_id))
+
+    cache = api.cached_messages[ROOM]
+    assert len(cache) == MESSAGE_CACHE_SIZE
+    assert list(cache) == [str(message_id) for message_id in range(6, MESSAGE_CACHE_SIZE + 6)]
+
+    # 1回の受信につき書き込みは受信したメッセージと、上限を超えて捨てたメッセージの分だけ
+    assert store.writes[:MESSAGE_CACHE_SIZE] == [
+        ("put", "cached_message", cached_message_key(ROOM, str(message_id)))
+        for message_id in range(1, MESSAGE_CACHE_SIZE + 1)
+    ]
+    assert store.writes[MESSAGE_CACHE_SIZE:MESSAGE_CACHE_SIZE + 2] == [
+        ("delete", "cached_message", cached_message_key(ROOM, "1")),
+        ("put", "cached_message", cached_message_key(ROOM, str(MESSAGE_CACHE_SIZE + 1))),
+    ]
+    assert sorted(store.data["cached_message"]) == sorted(cached_message_key(ROOM, message_id) for message_id in cache)
+
+    # 同じメッセージの再受信は書き込まない
+    writes = len(store.writes)
+    api.record_pushed_message(make_message(MESSAGE_CACHE_SIZE + 5))
+    assert len(store.writes) == writes
+
+
+@pytest.mark.asyncio
+async def test_full_sync_persists_only_the_difference(chatwork_stub):
+    for message_id in (1, 2, 3):
+        chatwork_stub.add_message(ROOM, str(message_id), f"本文{message_id}", 1000 + message_id)
+    store = RecordingStore()
+    api = ChatWorkAPI("token", store=store)
+    api.base_url = chatwork_stub.base_url
+    try:
+        await api.fetch_messages(ROOM, force=1)
+        store.writes.clear()
+
+        # 1件削除・1件編集・1件追加
+        del chatwork_stub.messages[ROOM][0]
+        chatwork_stub.messages[ROOM][0]["update_time"] = 2000
+        chatwork_stub.add_message(ROOM, "4", "本文4", 1004)
+        await api.fetch_messages(ROOM, force=1)
+    finally:
+        await api.close()
+
+    assert sorted(store.writes) == sorted([
+        ("delete", "cached_message", cached_message_key(ROOM, "1")),
+        ("put", "cached_message", cached_message_key(ROOM, "2")),
+        ("put", "cached_message", cached_message_key(ROOM, "4")),
+        ("put", "deleted_messages", ROOM),  # 削除ログ
+    ])
+    assert list(api.cached_messages[ROOM]) == ["2", "3", "4"]
+
+
+@pytest.mark.asyncio
+async def test_restore_orders_messages_and_migrates_the_room_format():
+    messages = [make_message(message_id) for message_id in (9, 10, 11)]
+    store = RecordingStore({
+        "cached_message": {
+            # 保存順は不定のため、送信日時・IDの順に並べ直される
+            cached_message_key(ROOM, "11"): message_to_dict(messages[2]),
+            cached_message_key(ROOM, "9"): message_to_dict(messages[0]),
+            cached_message_key(ROOM, "10"): message_to_dict(messages[1]),
+        },
+        # 以前の形式（ルームごとに全件）
+        "cached_messages": {"202": [message_to_dict(ChatWorkMessage("5", "202", ChatWorkAccount(1, "user"), "旧形式", 1, 0))]},
+    })
+    api = ChatWorkAPI("token", store=store)
+
+    await api.restore_state()
+
+    assert list(api.cached_messages[ROOM]) == ["9", "10", "11"]
+    assert api.cached_messages["202"]["5"].body == "旧形式"
+    assert store.data["cached_messages"] == {}
+    assert cached_message_key("202", "5") in store.data["cached_message"]
@@ -0,0 +1,167 @@
+import asyncio
+import gc
+
+import pytest
+
+import src.metadata_cache as metadata_cache
+from src.metadata_cache import MetadataCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(metadata_cache, "time", clock)
+    return clock
+
+
+class Fetcher:
+    """呼び出し回数を数え、releaseされるまで応答を保留する取得関数"""
+
+    def __init__(self, error: Exception = None):
+        self.calls = 0
+        self.error = error
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self):
+        self.calls += 1
+        call = self.calls
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return f"value{call}"
+
+
+@pytest.mark.asyncio
+async def test_values_are_reused_until_the_ttl_expires(clock):
+    cache = MetadataCache({"rooms": 30})
+    fetch = Fetcher()
+
+    assert await cache.get("rooms", "", fetch) == "value1"
+    clock.now += 29
+    assert await cache.get("rooms", "", fetch) == "value1"
+    clock.now += 1
+    assert await cache.get("rooms", "", fetch) == "value2"
+    # freshの場合は期限内でも取得し直す
+    assert await cache.get("rooms", "", fetch, fresh=True) == "value3"
+
+    status = cache.get_status()["rooms"]
+    assert (status["hits"], status["misses"], status["entries"]) == (1, 3, 1)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_fetch(clock):
+    cache = MetadataCache()
+    fetch = Fetcher()
+    fetch.release.clear()
+
+    waiters = [asyncio.create_task(cache.get("members", "101", fetch)) for _ in range(10)]
+    await asyncio.sleep(0)
+    fetch.release.set()
+
+    assert await asyncio.gather(*waiters) == ["value1"] * 10
+    assert fetch.calls == 1
+    assert cache.get_status()["members"]["coalesced"] == 9
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_shared_fetch(clock):
+    cache = MetadataCache()
+    fetch = Fetcher()
+    fetch.release.clear()
+
+    first = asyncio.create_task(cache.get("contacts", "", fetch))
+    second = asyncio.create_task(cache.get("contacts", "", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    fetch.release.set()
+
+    assert await second == "value1"
+    assert await cache.get("contacts", "", fetch) == "value1"
+    assert fetch.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidated_in_flight_result_is_not_cached(clock):
+    cache = MetadataCache()
+    fetch = Fetcher()
+    fetch.release.clear()
+
+    stale = asyncio.create_task(cache.get("members", "101", fetch))
+    await asyncio.sleep(0)
+    cache.invalidate("members", "101")
+    # 破棄後の要求は実行中のリクエストに相乗りしない
+    fresh = asyncio.create_task(cache.get("members", "101", fetch))
+    await asyncio.sleep(0)
+    fetch.release.set()
+
+    assert await stale == "value1"
+    assert await fresh == "value2"
+    assert await cache.get("members", "101", fetch) == "value2"
+    assert cache.get_status()["members"]["invalidations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_without_key_clears_the_whole_resource(clock):
+    cache = MetadataCache()
+    fetch = Fetcher()
+    await cache.get("members", "101", fetch)
+    await cache.get("members", "102", fetch)
+    await cache.get("rooms", "", fetch)
+
+    cache.invalidate("members")
+
+    assert cache.get_status()["members"]["entries"] == 0
+    assert cache.get_status()["rooms"]["entries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_is_not_cached_and_is_retried(clock):
+    cache = MetadataCache()
+    fetch = Fetcher(error=RuntimeError("boom"))
+    fetch.release.clear()
+
+    waiters = [asyncio.create_task(cache.get("rooms", "", fetch)) for _ in range(3)]
+    await asyncio.sleep(0)
+    fetch.release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+
+    # 待機していた全員に同じエラーが伝わり、次の要求で取得し直す
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache._in_flight == {}
+    fetch.error = None
+    assert await cache.get("rooms", "", fetch) == "value2"
+
+
+@pytest.mark.asyncio
+async def test_failure_with_every_caller_cancelled_is_not_reported_as_unretrieved(clock):
+    loop = asyncio.get_running_loop()
+    unhandled = []
+    loop.set_exception_handler(lambda loop, context: unhandled.append(context))
+    try:
+        cache = MetadataCache()
+        fetch = Fetcher(error=RuntimeError("boom"))
+        fetch.release.clear()
+
+        caller = asyncio.create_task(cache.get("rooms", "", fetch))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.sleep(0)
+        fetch.release.set()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        del caller
+        gc.collect()
+    finally:
+        loop.set_exception_handler(None)
+
+    assert unhandled == []
+    assert cache.get_status()["rooms"]["entries"] == 0
@@ -0,0 +1,170 @@
+import asyncio
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import src.outbound_queue as outbound_queue
+from src.alert_system import AlertSystem, PendingAlert
+from src.chatwork_api import ChatWorkAccount, ChatWorkMessage
+from src.outbound_queue import QUEUE_NAMESPACE, SENT_NAMESPACE, OutboundMessageQueue
+from src.rate_limiter import RateLimiter
+from src.task_analyzer import MessageAnalysis
+from test_message_cache import RecordingStore
+
+
+class FakeChatWorkAPI:
+    """送信したメッセージを記録し、failuresの回数だけ送信に失敗するAPI"""
+
+    def __init__(self, available: float = 300):
+        self.rate_limiter = RateLimiter(limit=300, window_seconds=300)
+        self.rate_limiter.tokens = available
+        self.sent = []  # (ルームID, 本文)
+        self.failures = 0
+
+    async def send_message(self, room_id, body):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("send failed")
+        self.sent.append((room_id, body))
+
+
+def make_queue(api: FakeChatWorkAPI, store=None) -> OutboundMessageQueue:
+    return OutboundMessageQueue(api, delivery_enabled=True, rate_reserve=30, store=store)
+
+
+async def drain(queue: OutboundMessageQueue, count: int):
+    """count件送信されるまで送信ループを動かす"""
+    task = asyncio.create_task(queue.run())
+    try:
+        for _ in range(1000):
+            if queue.sent_count + queue.failed_count >= count:
+                return
+            await asyncio.sleep(0.001)
+        raise AssertionError("送信が終わらない")
+    finally:
+        queue.stop()
+        await task
+
+
+@pytest.mark.asyncio
+async def test_messages_are_sent_by_priority_then_in_enqueue_order():
+    api = FakeChatWorkAPI()
+    queue = make_queue(api)
+    for body, priority in [("low", "low"), ("normal1", "normal"), ("high", "high"),
+                           ("normal2", "normal"), ("unknown", "urgent")]:
+        queue.enqueue("101", body, priority)
+
+    await drain(queue, 5)
+
+    # 未知の優先度はnormalとして扱う
+    assert [body for _, body in api.sent] == ["high", "normal1", "normal2", "unknown", "low"]
+
+
+@pytest.mark.asyncio
+async def test_low_rate_limit_holds_back_everything_but_high_priority():
+    api = FakeChatWorkAPI(available=10)
+    queue = make_queue(api)
+    queue.enqueue("101", "normal", "normal")
+    queue.enqueue("101", "high", "high")
+
+    await drain(queue, 1)
+
+    assert [body for _, body in api.sent] == ["high"]
+    # 残り10件・1件/秒の補充では、予備枠30件に達するまで約20秒待つ
+    assert queue._seconds_until_sendable() == pytest.approx(20, abs=1)
+
+    api.rate_limiter.tokens = 300
+    assert queue._seconds_until_sendable() == 0
+    await drain(queue, 2)
+    assert [body for _, body in api.sent] == ["high", "normal"]
+
+
+@pytest.mark.asyncio
+async def test_failed_send_waits_before_retrying_and_then_gives_up(monkeypatch):
+    api = FakeChatWorkAPI()
+    api.failures = 1
+    queue = make_queue(api)
+    queue.enqueue("101", "retry", "high")
+
+    task = asyncio.create_task(queue.run())
+    for _ in range(100):
+        if queue.retry_count:
+            break
+        await asyncio.sleep(0.001)
+    queue.stop()
+    await task
+
+    # 再試行待ちの間は高優先度でも送信しない
+    message = queue._messages[next(iter(queue._messages))]
+    assert message.attempts == 1
+    assert message.not_before - time.time() == pytest.approx(10, abs=1)
+    assert queue.get_status()["waiting_retry"] == 1
+    assert queue._seconds_until_sendable() == pytest.approx(10, abs=1)
+
+    # 送信可能時刻を過ぎると送信待ちに戻る
+    later = time.time() + 11
+    monkeypatch.setattr(outbound_queue, "time", SimpleNamespace(time=lambda: later, time_ns=time.time_ns))
+    await drain(queue, 1)
+    assert api.sent == [("101", "retry")]
+
+    api.failures = 1
+    gives_up = OutboundMessageQueue(api, delivery_enabled=True, max_attempts=1)
+    gives_up.enqueue("101", "never", "high")
+    await drain(gives_up, 1)
+    assert gives_up.failed_count == 1
+    assert gives_up.get_status()["queued"] == 0
+
+
+def alert(message_id: str, alerts_sent: int = 0) -> PendingAlert:
+    message = ChatWorkMessage(message_id, "101", ChatWorkAccount(1, "user"), "確認をお願いします", 0, 0)
+    pending = PendingAlert(message, MessageAnalysis(True, "high", [], [], []), datetime(2026, 3, 10, 9, 0))
+    pending.alerts_sent = alerts_sent
+    return pending
+
+
+@pytest.mark.asyncio
+async def test_same_digest_is_only_sent_once():
+    alerts = [("101_1", alert("1")), ("101_2", alert("2"))]
+    key = AlertSystem._digest_key("101", alerts)
+    # アラートの順序によらず同じキー、送信回数が変わると別のキー
+    assert AlertSystem._digest_key("101", list(reversed(alerts))) == key
+    assert AlertSystem._digest_key("101", [("101_1", alert("1", 1)), alerts[1]]) != key
+    assert AlertSystem._digest_key("102", alerts) != key
+
+    api = FakeChatWorkAPI()
+    queue = make_queue(api)
+    assert queue.enqueue("101", "digest", "high", key=key)
+    assert not queue.enqueue("101", "digest", "high", key=key)
+    await drain(queue, 1)
+    assert not queue.enqueue("101", "digest", "high", key=key)
+
+    assert api.sent == [("101", "digest")]
+    assert queue.duplicate_count == 2
+
+
+@pytest.mark.asyncio
+async def test_queue_and_sent_keys_survive_a_restart():
+    store = RecordingStore()
+    api = FakeChatWorkAPI()
+    queue = make_queue(api, store)
+    queue.enqueue("101", "sent", "high", key="a")
+    await drain(queue, 1)
+    queue.enqueue("101", "pending-low", "low", key="b")
+    queue.enqueue("101", "pending-normal", "normal", key="c")
+    # 送信後、キューから削除される前に停止した状態
+    store.data[QUEUE_NAMESPACE]["a"] = {"key": "a", "room_id": "101", "body": "sent", "priority": "high",
+                                        "enqueued_at": 0.0, "attempts": 0, "not_before": 0.0}
+    assert set(store.data[SENT_NAMESPACE]) == {"a"}
+
+    restarted_api = FakeChatWorkAPI()
+    restarted = make_queue(restarted_api, store)
+    await restarted.restore_state()
+
+    assert sorted(restarted._messages) == ["b", "c"]
+    assert "a" not in store.data[QUEUE_NAMESPACE]
+    assert not restarted.enqueue("101", "sent", "high", key="a")
+    await drain(restarted, 2)
+    assert [body for _, body in restarted_api.sent] == ["pending-normal", "pending-low"]
+    assert store.data[QUEUE_NAMESPACE] == {}
@@ -0,0 +1,138 @@
+import pytest
+
+from src.config import Config
+from src.main import ChatWorkAIManager
+
+ROOMS = ["101", "102", "103"]
+
+
+def create_manager(stub, **overrides) -> ChatWorkAIManager:
+    settings = dict(
+        chatwork_token="test-token",
+        monitored_rooms=list(ROOMS),
+        storage_backend="none",
+        polling_concurrency=len(ROOMS),
+        activity_driven_polling=False,
+        adaptive_polling=False,
+        delta_polling=False,
+        ai_provider="builtin",
+        alert_delivery_enabled=False,
+        analysis_executor="inline"
+    )
+    settings.update(overrides)
+    manager = ChatWorkAIManager(Config(**settings))
+    manager.chatwork_api.base_url = stub.base_url
+    return manager
+
+
+async def run_cycle(manager: ChatWorkAIManager):
+    """monitor_messagesの1サイクル分（ルーム選択→ポーリング）を実行"""
+    room_ids = await manager._select_rooms_for_cycle()
+    if room_ids:
+        await manager._poll_rooms(room_ids)
+
+
+@pytest.mark.asyncio
+async def test_one_get_per_room_per_cycle(chatwork_stub):
+    for index, room_id in enumerate(ROOMS):
+        chatwork_stub.add_message(room_id, f"{room_id}1", "明日までに資料の確認をお願いします", 1000 + index)
+    manager = create_manager(chatwork_stub)
+    try:
+        for cycle in range(1, 4):
+            await run_cycle(manager)
+            
+            assert len(chatwork_stub.requests) == len(ROOMS) * cycle
+            for room_id in ROOMS:
+                assert len(chatwork_stub.message_requests(room_id)) == cycle
+    finally:
+        await manager.chatwork_api.close()
+    
+    # 取得した1回分の応答から新着の処理まで行われている
+    assert len(manager.processed_messages) == len(ROOMS)
+    assert all(method == "GET" for method, _, _ in chatwork_stub.requests)
+
+
+@pytest.mark.asyncio
+async def test_deletion_detection_reuses_the_same_response(chatwork_stub):
+    chatwork_stub.add_message("101", "1", "作業をお願いします", 1000)
+    chatwork_stub.add_message("101", "2", "レビューをお願いします", 1001)
+    manager = create_manager(chatwork_stub, monitored_rooms=["101"])
+    try:
+        await run_cycle(manager)
+        
+        # 2回目のサイクルまでに1件削除される
+        del chatwork_stub.messages["101"][0]
+        await run_cycle(manager)
+    finally:
+        await manager.chatwork_api.close()
+    
+    assert len(chatwork_stub.message_requests("101")) == 2
+    assert len(chatwork_stub.requests) == 2
+    deleted = await manager.chatwork_api.get_deleted_messages("101")
+    assert [info["message_id"] for info in deleted["101"]] == ["1"]
+
+
+@pytest.mark.asyncio
+async def test_delta_polling_fetches_each_room_once(chatwork_stub):
+    for room_id in ROOMS:
+        chatwork_stub.add_message(room_id, f"{room_id}1", "確認をお願いします", 1000)
+    manager = create_manager(chatwork_stub, delta_polling=True, full_reconcile_interval=3600)
+    try:
+        await run_cycle(manager)
+        await run_cycle(manager)
+    finally:
+        await manager.chatwork_api.close()
+    
+    for room_id in ROOMS:
+        forces = [query["force"] for _, _, query in chatwork_stub.message_requests(room_id)]
+        # 初回は全件照合、以降は差分のみ
+        assert forces == ["1", "0"]
+    assert len(chatwork_stub.requests) == len(ROOMS) * 2
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_is_retried_next_cycle(chatwork_stub):
+    for room_id in ROOMS:
+        chatwork_stub.add_room(room_id, 1000)
+        chatwork_stub.add_message(room_id, f"{room_id}1", "確認をお願いします", 1000)
+    chatwork_stub.failures["101"] = 500
+    manager = create_manager(chatwork_stub, activity_driven_polling=True)
+    try:
+        await run_cycle(manager)
+        assert "101" not in manager.activity_tracker.last_polled
+        assert "101_1011" not in manager.processed_messages
+
+        # ルーム一覧に変化がなくても、取得に失敗したルームだけは再度選択される
+        chatwork_stub.failures.clear()
+        assert await manager._select_rooms_for_cycle() == ["101"]
+        await run_cycle(manager)
+    finally:
+        await manager.chatwork_api.close()
+
+    assert len(chatwork_stub.message_requests("101")) == 2
+    assert len(chatwork_stub.message_requests("102")) == 1
+    assert "101_1011" in manager.processed_messages
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("concurrency", [2, 4])
+async def test_rooms_are_polled_concurrently_up_to_the_limit(chatwork_stub, concurrency):
+    rooms = [str(200 + index) for index in range(8)]
+    for room_id in rooms:
+        chatwork_stub.add_message(room_id, f"{room_id}1", "確認をお願いします", 1000)
+    chatwork_stub.delay = 0.05
+    manager = create_manager(chatwork_stub, monitored_rooms=rooms, polling_concurrency=concurrency)
+    try:
+        await run_cycle(manager)
+    finally:
+        await manager.chatwork_api.close()
+
+    cycle = manager.last_poll_cycle
+    assert cycle["rooms"] == len(rooms)
+    assert cycle["concurrency"] == concurrency
+    # 同時に処理中の取得は上限を超えず、上限まで並行している
+    assert chatwork_stub.max_in_flight == concurrency
+    # 所要時間はルームごとの時間の合計より短い
+    assert cycle["wall_time"] < cycle["sum_room_time"]
+    assert cycle["sum_room_time"] >= chatwork_stub.delay * len(rooms)
+    assert all(f"{room_id}_{room_id}1" in manager.processed_messages for room_id in rooms)
@@ -0,0 +1,134 @@
+import asyncio
+import types
+
+import pytest
+
+import src.rate_limiter as rate_limiter
+from src.rate_limiter import RateLimiter
+
+START = 1_700_000_000.0
+
+
+class FakeClock:
+    """time.time / time.monotonic と asyncio.sleep を置き換える模擬時計"""
+
+    def __init__(self):
+        self.now = START
+        self.sleeps = []
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now - START
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    monkeypatch.setattr(rate_limiter, "asyncio", types.SimpleNamespace(Lock=asyncio.Lock, sleep=clock.sleep))
+    return clock
+
+
+@pytest.mark.asyncio
+async def test_acquire_spends_the_bucket_then_waits_for_refill(clock):
+    limiter = RateLimiter(limit=3, window_seconds=3)  # 1秒に1トークン
+
+    for _ in range(3):
+        await limiter.acquire()
+    assert clock.sleeps == []
+    assert limiter.tokens == 0
+
+    await limiter.acquire()
+    assert clock.sleeps == [pytest.approx(1.0)]
+    assert limiter.waited_seconds == pytest.approx(1.0)
+
+    # 経過時間分だけ補充され、上限を超えない
+    clock.now += 100
+    assert limiter.available() == 3
+
+
+def test_reserve_reports_the_wait_without_consuming(clock):
+    limiter = RateLimiter(limit=2, window_seconds=4)  # 0.5トークン/秒
+    assert limiter._reserve() == 0
+    assert limiter._reserve() == 0
+
+    assert limiter._reserve() == pytest.approx(2.0)
+    clock.now += 1
+    assert limiter._reserve() == pytest.approx(1.0)
+    clock.now += 1
+    assert limiter._reserve() == 0
+    assert limiter.tokens == pytest.approx(0)
+
+
+def test_headers_correct_the_bucket(clock):
+    limiter = RateLimiter(limit=300, window_seconds=300)
+
+    limiter.update_from_headers({
+        "x-ratelimit-limit": "100",
+        "x-ratelimit-remaining": "7",
+        "x-ratelimit-reset": str(int(START + 120)),
+    })
+
+    assert limiter.limit == 100
+    assert limiter.refill_rate == pytest.approx(100 / 300)
+    assert (limiter.remaining, limiter.reset_at) == (7, START + 120)
+    assert limiter.tokens == 7
+    assert limiter.available() == 7
+
+    # サーバーの残量がローカルより多くてもトークンは増やさない
+    limiter.update_from_headers({"x-ratelimit-remaining": "50"})
+    assert limiter.tokens == 7
+    assert limiter.remaining == 50
+
+    # 解釈できないヘッダーは無視する
+    limiter.update_from_headers({"x-ratelimit-limit": "abc", "x-ratelimit-remaining": ""})
+    assert (limiter.limit, limiter.remaining) == (100, 50)
+
+
+def test_server_remaining_is_decremented_and_blocks_at_zero(clock):
+    limiter = RateLimiter(limit=300, window_seconds=300)
+    limiter.update_from_headers({"x-ratelimit-remaining": "1", "x-ratelimit-reset": str(int(START + 60))})
+
+    assert limiter._reserve() == 0
+    assert limiter.remaining == 0
+    # サーバー側の残量が尽きたらリセット時刻（+1秒）まで待つ
+    assert limiter._reserve() == pytest.approx(61.0)
+
+    # リセット時刻を過ぎるとサーバー側の残量は不明に戻る
+    clock.now = START + 60
+    assert limiter._reserve() == 0
+    assert (limiter.remaining, limiter.reset_at) == (None, None)
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_response_pauses_until_reset(clock):
+    limiter = RateLimiter(limit=300, window_seconds=300)
+
+    limiter.on_rate_limited({"x-ratelimit-reset": str(int(START + 30))})
+    assert limiter.rate_limited_count == 1
+    assert limiter.available() == 0
+
+    await limiter.acquire()
+    # リセットまで待ち、リセット後に補充されたトークンで送信する
+    assert sum(clock.sleeps) >= 30
+    assert clock.now >= START + 30
+    assert limiter.remaining is None
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_without_reset_header_waits_one_window(clock):
+    limiter = RateLimiter(limit=300, window_seconds=300)
+
+    limiter.on_rate_limited({})
+    assert limiter.reset_at == START + 300
+
+    await limiter.acquire()
+    assert clock.now >= START + 300
+    assert limiter.get_status()["rate_limited_count"] == 1
@@ -0,0 +1,81 @@
+import random
+
+from src.chatwork_api import ChatWorkAccount, ChatWorkMessage
+from src.read_model import MessageReadModel
+
+
+def make_message(room_id: str, message_id: int, send_time: int) -> ChatWorkMessage:
+    return ChatWorkMessage(str(message_id), room_id, ChatWorkAccount(1, "user"), f"本文{message_id}", send_time, 0)
+
+
+def keys(messages) -> list:
+    return [(message.room_id, message.message_id) for message in messages]
+
+
+def test_each_room_keeps_only_its_newest_messages():
+    model = MessageReadModel(ring_size=3)
+    model.ingest("101", [make_message("101", index, 1000 + index) for index in range(1, 6)])
+    model.ingest("102", [make_message("102", 1, 900)])
+
+    assert [message.message_id for message in model.recent("101")] == ["3", "4", "5"]
+    # 追い出したメッセージは全ルームの索引からも消える
+    assert keys(model.latest()) == [("101", "5"), ("101", "4"), ("101", "3"), ("102", "1")]
+    assert model.get_status()["messages"] == 4
+
+
+def test_global_index_stays_sorted_across_rooms():
+    model = MessageReadModel()
+    rng = random.Random(3)
+    expected = []
+    for room_id in ("101", "102", "103"):
+        messages = [make_message(room_id, index, rng.randrange(1000, 1100)) for index in range(20)]
+        rng.shuffle(messages)
+        model.ingest(room_id, messages)
+        expected += [(message.send_time, room_id, message.message_id) for message in messages]
+
+    assert model._index == sorted(expected)
+    latest = model.latest(limit=100)
+    assert [(message.send_time, message.room_id, message.message_id) for message in latest] == sorted(expected, reverse=True)
+
+
+def test_edited_and_replaced_messages_update_the_index():
+    model = MessageReadModel()
+    model.ingest("101", [make_message("101", 1, 1000), make_message("101", 2, 1001)])
+
+    # 同じメッセージの再取得は重複させず、送信時刻が変われば並べ直す
+    model.ingest("101", [make_message("101", 1, 1005)])
+    assert keys(model.latest()) == [("101", "1"), ("101", "2")]
+
+    # 全件取得で含まれなかったメッセージは削除されたものとして外す
+    model.ingest("101", [make_message("101", 2, 1001)], replace=True)
+    assert keys(model.latest()) == [("101", "2")]
+    assert model._index == [(1001, "101", "2")]
+
+
+def test_recent_pages_backwards_with_before():
+    model = MessageReadModel()
+    # 同じ送信時刻のメッセージはメッセージIDで並ぶ
+    model.ingest("101", [make_message("101", index, 1000 + index // 2) for index in range(10, 20)])
+
+    pages = []
+    before = None
+    while True:
+        page = model.recent("101", limit=3, before=before)
+        if not page:
+            break
+        pages.append([message.message_id for message in page])
+        before = (page[0].send_time, page[0].message_id)
+
+    assert pages == [["17", "18", "19"], ["14", "15", "16"], ["11", "12", "13"], ["10"]]
+    assert model.recent("101", limit=0) == []
+    assert model.recent("999") == []
+
+
+def test_latest_filters_rooms_and_caps_each_room():
+    model = MessageReadModel()
+    for room_id, base in (("101", 1000), ("102", 2000), ("103", 3000)):
+        model.ingest(room_id, [make_message(room_id, index, base + index) for index in range(10)])
+
+    latest = model.latest(limit=8, room_ids=["101", "102"], per_room=3)
+
+    assert keys(latest) == [("102", "9"), ("102", "8"), ("102", "7"), ("101", "9"), ("101", "8"), ("101", "7")]
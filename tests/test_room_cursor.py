@@ -0,0 +1,92 @@
+import pytest
+
+from src.chatwork_api import ChatWorkAccount, ChatWorkAPI, ChatWorkMessage, RoomCursor
+from test_message_cache import RecordingStore
+
+ROOM = "101"
+
+
+def messages(*message_ids) -> list:
+    return [ChatWorkMessage(str(message_id), ROOM, ChatWorkAccount(1, "user"), "本文", 1000, 0)
+            for message_id in message_ids]
+
+
+def ids(result) -> list:
+    return [int(message.message_id) for message in result]
+
+
+def test_advance_returns_only_the_tail_above_the_watermark():
+    cursor = RoomCursor()
+    assert ids(cursor.advance(messages(1, 2, 3))) == [1, 2, 3]
+    assert cursor.high_watermark == 3
+
+    assert ids(cursor.advance(messages(1, 2, 3, 4, 5))) == [4, 5]
+    assert cursor.high_watermark == 5
+
+    # 新着がなければ既読位置は変わらない
+    assert cursor.advance(messages(3, 4, 5)) == []
+    assert cursor.advance([]) == []
+    assert cursor.high_watermark == 5
+
+
+def test_scan_stops_at_the_first_processed_message():
+    cursor = RoomCursor(10)
+
+    class CountingId(str):
+        reads = 0
+
+        def __int__(self):
+            CountingId.reads += 1
+            return int(str(self))
+
+    batch = messages(*range(1, 101))
+    for message in batch:
+        message.message_id = CountingId(message.message_id)
+
+    assert cursor.advance(batch) == batch[10:]
+    # 走査は末尾の90件と既読位置以下の1件で打ち切り、既読位置の更新で新着90件を読む
+    assert CountingId.reads == 91 + 90
+    assert cursor.high_watermark == 100
+
+
+def test_non_monotonic_tail_never_moves_the_watermark_backwards():
+    cursor = RoomCursor(4)
+
+    assert ids(cursor.advance(messages(3, 4, 9, 7))) == [9, 7]
+    assert cursor.high_watermark == 9
+
+    # 同じ応答を再度受け取っても取り出し直さない
+    assert cursor.advance(messages(3, 4, 9, 7)) == []
+
+
+def test_duplicate_ids_are_handled_by_the_watermark():
+    cursor = RoomCursor(4)
+
+    assert ids(cursor.advance(messages(4, 5, 5, 6))) == [5, 5, 6]
+    assert cursor.advance(messages(5, 5, 6, 6)) == []
+    assert cursor.high_watermark == 6
+
+
+@pytest.mark.asyncio
+async def test_cursors_are_persisted_and_restored(chatwork_stub):
+    for message_id in (1, 2, 3):
+        chatwork_stub.add_message(ROOM, str(message_id), "本文", 1000 + message_id)
+    store = RecordingStore()
+    api = ChatWorkAPI("token", store=store)
+    api.base_url = chatwork_stub.base_url
+    try:
+        assert ids(await api.get_new_messages(ROOM)) == [1, 2, 3]
+    finally:
+        await api.close()
+    assert store.data["cursors"] == {ROOM: 3}
+
+    chatwork_stub.add_message(ROOM, "4", "本文", 1004)
+    restarted = ChatWorkAPI("token", store=store)
+    restarted.base_url = chatwork_stub.base_url
+    try:
+        await restarted.restore_state()
+        assert restarted.cursors[ROOM].high_watermark == 3
+        # 再起動前に処理したメッセージは取り出さない
+        assert ids(await restarted.get_new_messages(ROOM)) == [4]
+    finally:
+        await restarted.close()
@@ -0,0 +1,118 @@
+import pytest
+
+import src.room_scheduler as room_scheduler
+from src.config import Config
+from src.room_scheduler import DEFAULT_POLL_TIERS, AdaptiveRoomScheduler, PollTier
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(room_scheduler, "time", clock)
+    return clock
+
+
+def test_idle_rooms_back_off_to_the_tier_maximum(clock):
+    scheduler = AdaptiveRoomScheduler()
+    scheduler.sync_rooms(["1"], {"1": "TO"})
+    tier = DEFAULT_POLL_TIERS["TO"]
+    assert scheduler.pop_due() == ["1"]
+
+    intervals = []
+    for _ in range(8):
+        scheduler.record_poll("1", active=False)
+        intervals.append(scheduler.rooms["1"].interval)
+
+    # 最短間隔から倍々に延び、最長間隔で止まる
+    assert intervals[:5] == [20, 40, 80, 160, 300]
+    assert intervals[-1] == tier.max_interval
+
+
+def test_activity_promotes_the_room_back_toward_the_minimum(clock):
+    scheduler = AdaptiveRoomScheduler()
+    scheduler.sync_rooms(["1"], {"1": "projects"})
+    tier = DEFAULT_POLL_TIERS["projects"]
+    scheduler.rooms["1"].interval = tier.max_interval
+
+    scheduler.record_poll("1", active=True)
+    assert scheduler.rooms["1"].interval == tier.max_interval / 2
+    assert scheduler.rooms["1"].last_activity_at == clock.now
+
+    # 新着が続いても最短間隔を下回らない
+    for _ in range(10):
+        scheduler.record_poll("1", active=True)
+    assert scheduler.rooms["1"].interval == tier.min_interval
+
+    # 返信が必要なメッセージがあれば即座に最短間隔へ戻る
+    scheduler.rooms["1"].interval = tier.max_interval
+    scheduler.record_poll("1", active=True, hot=True)
+    assert scheduler.rooms["1"].interval == tier.min_interval
+
+
+def test_unknown_category_uses_the_others_tier(clock):
+    scheduler = AdaptiveRoomScheduler()
+    scheduler.sync_rooms(["1", "2"], {"1": "存在しないカテゴリ"})
+
+    assert scheduler.rooms["1"].tier == DEFAULT_POLL_TIERS["others"]
+    assert scheduler.rooms["2"].category == "others"
+
+
+def test_heap_pops_rooms_in_next_due_order(clock):
+    scheduler = AdaptiveRoomScheduler()
+    categories = {"a": "クライアント窓口", "b": "announcements", "c": "TO"}
+    scheduler.sync_rooms(list(categories), categories)
+    assert sorted(scheduler.pop_due()) == ["a", "b", "c"]
+    for room_id in categories:
+        scheduler.record_poll(room_id, active=False)
+
+    # 次回時刻: a=+10秒, c=+20秒, b=+120秒
+    assert scheduler.next_due_in() == 10
+    clock.now += 10
+    assert scheduler.pop_due() == ["a"]
+    clock.now += 200
+    assert scheduler.pop_due() == ["c", "b"]
+    assert scheduler.next_due_in() is None
+
+
+def test_rescheduled_and_removed_rooms_drop_their_old_heap_entries(clock):
+    scheduler = AdaptiveRoomScheduler()
+    scheduler.sync_rooms(["1", "2"], {"1": "TO", "2": "TO"})
+    scheduler.pop_due()
+    scheduler.record_poll("1", active=False)  # +20秒
+    scheduler.record_poll("2", active=False)
+
+    # 再スケジュールで古いエントリ（+20秒）は無効化される
+    scheduler.record_poll("1", active=True, hot=True)  # +10秒
+    scheduler.sync_rooms(["1"])
+    assert len(scheduler._heap) == 3
+
+    clock.now += 30
+    assert scheduler.pop_due() == ["1"]
+    assert scheduler._heap == []
+
+
+def test_poll_tiers_json_overrides_the_defaults(monkeypatch, clock):
+    monkeypatch.setenv("POLL_TIERS", '{"TO": [3, 60], "custom": [7, 70]}')
+    config = Config(chatwork_token="test-token", monitored_rooms=["1"])
+
+    assert config.poll_tiers == {"TO": [3, 60], "custom": [7, 70]}
+
+    scheduler = AdaptiveRoomScheduler({
+        category: PollTier(*intervals) for category, intervals in config.poll_tiers.items()
+    })
+    assert scheduler.tiers["TO"] == PollTier(3, 60)
+    assert scheduler.tiers["custom"] == PollTier(7, 70)
+    assert scheduler.tiers["projects"] == DEFAULT_POLL_TIERS["projects"]
+
+
+def test_poll_tiers_is_unset_without_the_environment_variable(monkeypatch):
+    monkeypatch.delenv("POLL_TIERS", raising=False)
+    assert Config(chatwork_token="test-token", monitored_rooms=["1"]).poll_tiers is None
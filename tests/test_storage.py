@@ -0,0 +1,110 @@
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from src.storage import SQLiteStateStore, StateStore, create_store
+from test_polling import create_manager, run_cycle
+
+
+def stored_rows(path) -> dict:
+    """別の接続から見える（コミット済みの）行"""
+    conn = sqlite3.connect(path)
+    try:
+        return {(namespace, key): value for namespace, key, value in conn.execute("SELECT namespace, key, value FROM state")}
+    finally:
+        conn.close()
+
+
+@pytest.mark.asyncio
+async def test_store_opens_in_wal_mode(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / "nested" / "state.db"))
+    await store.open()
+    try:
+        assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        await store.close()
+
+
+@pytest.mark.asyncio
+async def test_writes_are_batched_until_the_flush_interval(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = SQLiteStateStore(path, flush_interval=0.05)
+    await store.open()
+    try:
+        for index in range(50):
+            store.put("processed_messages", f"1_{index}", index)
+        # 同じキーへの書き込みは最新の値だけが残る
+        store.put("processed_messages", "1_0", "latest")
+        store.put("alerts", "gone", 1)
+        store.delete("alerts", "gone")
+
+        assert stored_rows(path) == {}
+        assert store.get_status()["pending_writes"] == 51
+
+        await asyncio.sleep(0.2)
+
+        rows = stored_rows(path)
+        assert len(rows) == 50
+        assert rows[("processed_messages", "1_0")] == '"latest"'
+        assert store.get_status()["pending_writes"] == 0
+        assert store.flushed_writes == 51
+    finally:
+        await store.close()
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_pending_writes(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = SQLiteStateStore(path, flush_interval=3600)
+    await store.open()
+    store.put("alerts", "101_1", {"priority": "high"})
+    await store.close()
+
+    reopened = SQLiteStateStore(path)
+    await reopened.open()
+    try:
+        assert await reopened.load("alerts") == {"101_1": {"priority": "high"}}
+    finally:
+        await reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_manager_state_survives_a_restart(chatwork_stub, tmp_path):
+    chatwork_stub.add_message("101", "1", "明日までに資料の確認をお願いします", 1000)
+    settings = dict(monitored_rooms=["101"], storage_backend="sqlite", storage_path=str(tmp_path / "state.db"))
+
+    manager = create_manager(chatwork_stub, **settings)
+    await manager.store.open()
+    try:
+        await run_cycle(manager)
+    finally:
+        await manager.chatwork_api.close()
+        await manager.store.close()
+    assert "101_1" in manager.processed_messages
+    assert manager.alert_system.pending_alerts
+
+    restarted = create_manager(chatwork_stub, **settings)
+    await restarted.store.open()
+    try:
+        await restarted.restore_state()
+    finally:
+        await restarted.chatwork_api.close()
+        await restarted.store.close()
+
+    assert "101_1" in restarted.processed_messages
+    assert list(restarted.chatwork_api.cached_messages["101"]) == ["1"]
+    assert set(restarted.alert_system.pending_alerts) == set(manager.alert_system.pending_alerts)
+
+
+def test_create_store_selects_the_backend(tmp_path):
+    sqlite_store = create_store(SimpleNamespace(storage_backend="sqlite", storage_path=str(tmp_path / "a.db"),
+                                                storage_flush_interval=2.0))
+    assert isinstance(sqlite_store, SQLiteStateStore)
+    assert sqlite_store.flush_interval == 2.0
+
+    assert type(create_store(SimpleNamespace(storage_backend="none"))) is StateStore
+
+    with pytest.raises(ValueError):
+        create_store(SimpleNamespace(storage_backend="redis"))
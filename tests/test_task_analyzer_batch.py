@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.task_analyzer_bench import NOW, generate_corpus, to_message
+from src.task_analyzer import TaskAnalyzer, analysis_to_dict, normalize_body
+
+
+def dicts(analyses) -> list:
+    return [analysis_to_dict(analysis) for analysis in analyses]
+
+
+@pytest.mark.asyncio
+async def test_analyze_many_matches_one_message_at_a_time():
+    # 同じ本文の重複や引用付きのメッセージも含め、yield間隔をまたぐ件数にする
+    bodies = generate_corpus(450)
+    bodies += [bodies[0], "", "[qt][qtmeta aid=1]至急対応してください[/qt]了解です", bodies[1]]
+    messages = [to_message(index, body) for index, body in enumerate(bodies)]
+
+    batch = await TaskAnalyzer(None).analyze_many(messages, NOW)
+
+    single = TaskAnalyzer(None)
+    expected = [(await single.analyze_many([message], NOW))[0] for message in messages]
+    assert dicts(batch) == dicts(expected)
+    inline = TaskAnalyzer(None)
+    assert dicts(batch) == dicts(inline._analyze_body(normalize_body(message.markup.analysis_text), NOW)
+                                 for message in messages)
+
+
+@pytest.mark.asyncio
+async def test_analyze_many_keeps_input_order_and_returns_independent_results():
+    analyzer = TaskAnalyzer(None)
+    bodies = ["了解です", "至急、明日までに資料の確認をお願いします！", "了解です"]
+
+    results = await analyzer.analyze_many([to_message(index, body) for index, body in enumerate(bodies)], NOW)
+
+    assert [result.requires_reply for result in results] == [False, True, False]
+    assert results[1].priority == "high"
+    # 同じ本文の結果は別のオブジェクトとして返る
+    assert results[0] is not results[2]
+    results[0].tasks.append("変更")
+    assert results[2].tasks == []
+
+
+@pytest.mark.asyncio
+async def test_analyze_many_with_no_messages():
+    analyzer = TaskAnalyzer(None)
+
+    assert await analyzer.analyze_many([], NOW) == []
+    assert analyzer.inline_count == 0
+
+
+@pytest.mark.asyncio
+async def test_deep_queue_is_analyzed_in_the_process_pool_with_identical_results():
+    config = SimpleNamespace(analysis_executor="process", analysis_pool_threshold=8, analysis_pool_workers=2)
+    pooled = TaskAnalyzer(config)
+    messages = [to_message(index, body) for index, body in enumerate(generate_corpus(500, seed=2))]
+    try:
+        results = await pooled.analyze_many(messages, NOW)
+        # 閾値未満の待ち件数はイベントループ上で分析する
+        await pooled.analyze_many([to_message(1000, "閾値未満の新しい本文です")], NOW)
+    finally:
+        pooled.shutdown()
+
+    assert pooled.pooled_count > 0
+    assert pooled.inline_count == 1
+    assert pooled.queue_depth == 0
+    assert dicts(results) == dicts(await TaskAnalyzer(None).analyze_many(messages, NOW))
@@ -0,0 +1,45 @@
+import subprocess
+
+import pytest
+
+from benchmarks.task_analyzer_bench import NOW, generate_corpus, load_baseline, to_message
+from src.task_analyzer import TaskAnalyzer, analysis_to_dict
+
+BASELINE = "e86c0d2"  # 行ごとに正規表現を照合していた実装
+
+
+@pytest.fixture(scope="module")
+def baseline_analyzer():
+    try:
+        return load_baseline(BASELINE)
+    except (OSError, subprocess.CalledProcessError):
+        pytest.skip(f"{BASELINE} をgitから読み込めない")
+
+
+@pytest.mark.asyncio
+async def test_analysis_matches_baseline_on_bench_corpus(baseline_analyzer):
+    analyzer = TaskAnalyzer(None)
+    bodies = generate_corpus(3000)
+
+    for index, body in enumerate(bodies):
+        expected = analysis_to_dict(await baseline_analyzer.analyze(to_message(index, body)))
+        assert analysis_to_dict(analyzer._analyze_body(body, NOW)) == expected, body
+
+
+@pytest.mark.asyncio
+async def test_analysis_matches_baseline_on_edge_cases(baseline_analyzer):
+    analyzer = TaskAnalyzer(None)
+    bodies = [
+        "",
+        "了解です",
+        "[To:12][To:34] 至急、明日までに見積もりをお願いします！！",
+        "URGENT: please review ASAP\n確認お願いします?",
+        "・資料の作成\n- 2時間ほどで対応\n* 来週までに確認",
+        "3/15までに提出してください。所要時間は30分程度です",
+        "いつ頃できそうですか？\nどうでしょうか",
+        "緊急緊急緊急" * 50,
+    ]
+
+    for index, body in enumerate(bodies):
+        expected = analysis_to_dict(await baseline_analyzer.analyze(to_message(index, body)))
+        assert analysis_to_dict(analyzer._analyze_body(body, NOW)) == expected, body
@@ -0,0 +1,150 @@
+import base64
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+
+import web.api_server as api_server
+from src.config import Config
+from src.main import ChatWorkAIManager
+from src.webhook import compute_signature, parse_webhook_event, verify_signature
+
+TOKEN = base64.b64encode(b"webhook-secret").decode("ascii")
+
+
+def event_payload(event_type: str = "message_created", **event) -> dict:
+    webhook_event = {
+        "message_id": "1001",
+        "room_id": 101,
+        "account_id": 5,
+        "body": "明日までに資料の確認をお願いします",
+        "send_time": 1700000000,
+        "update_time": 0
+    }
+    webhook_event.update(event)
+    return {"webhook_setting_id": "1", "webhook_event_type": event_type,
+            "webhook_event_time": 1700000000, "webhook_event": webhook_event}
+
+
+def encode(payload: dict) -> bytes:
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def test_verify_signature():
+    body = encode(event_payload())
+    signature = compute_signature(TOKEN, body)
+
+    assert verify_signature(TOKEN, body, signature)
+    # 改ざんされた本文・別のトークンの署名・署名なし・トークン未設定は拒否する
+    assert not verify_signature(TOKEN, body + b" ", signature)
+    assert not verify_signature(TOKEN, body, compute_signature(base64.b64encode(b"other").decode(), body))
+    assert not verify_signature(TOKEN, body, None)
+    assert not verify_signature(TOKEN, body, "")
+    assert not verify_signature("", body, signature)
+    assert not verify_signature("not base64!", body, signature)
+
+
+def test_parse_webhook_event():
+    message = parse_webhook_event(event_payload())
+    assert (message.room_id, message.message_id, message.account.account_id) == ("101", "1001", 5)
+    assert message.body == "明日までに資料の確認をお願いします"
+    assert message.send_time == 1700000000
+
+    # mention_to_meは送信者がfrom_account_idに入る
+    mention = event_payload("mention_to_me", from_account_id=7, to_account_id=9000)
+    del mention["webhook_event"]["account_id"]
+    assert parse_webhook_event(mention).account.account_id == 7
+
+    assert parse_webhook_event(event_payload("room_created")) is None
+
+
+@pytest_asyncio.fixture
+async def webhook_client(chatwork_stub, monkeypatch):
+    manager = ChatWorkAIManager(Config(
+        chatwork_token="test-token",
+        monitored_rooms=["101"],
+        storage_backend="none",
+        ai_provider="builtin",
+        alert_delivery_enabled=False,
+        analysis_executor="inline",
+        webhook_token=TOKEN,
+        webhook_rooms=["101"]
+    ))
+    manager.chatwork_api.base_url = chatwork_stub.base_url
+    monkeypatch.setattr(api_server, "ai_manager", manager)
+
+    transport = httpx.ASGITransport(app=api_server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client, manager
+    await manager.chatwork_api.close()
+
+
+async def post_event(client: httpx.AsyncClient, payload: dict, signature=...) -> httpx.Response:
+    body = encode(payload)
+    if signature is ...:
+        signature = compute_signature(TOKEN, body)
+    headers = {"Content-Type": "application/json"}
+    if signature is not None:
+        headers["X-ChatWorkWebhookSignature"] = signature
+    return await client.post("/webhook/chatwork", content=body, headers=headers)
+
+
+@pytest.mark.asyncio
+async def test_signed_event_is_processed_once(webhook_client, chatwork_stub):
+    client, manager = webhook_client
+
+    response = await post_event(client, event_payload())
+    assert response.status_code == 200
+    assert response.json() == {"success": True, "processed": True}
+    assert "101_1001" in manager.processed_messages
+    assert "1001" in manager.chatwork_api.cached_messages["101"]
+
+    # 再送されたイベントは処理済みとして無視する
+    response = await post_event(client, event_payload())
+    assert response.json() == {"success": True, "processed": False}
+    # Webhookの受信ではChatWork APIを呼ばない
+    assert chatwork_stub.requests == []
+
+
+@pytest.mark.asyncio
+async def test_invalid_or_missing_signature_is_rejected(webhook_client):
+    client, manager = webhook_client
+
+    assert (await post_event(client, event_payload(), signature="invalid")).status_code == 401
+    assert (await post_event(client, event_payload(), signature=None)).status_code == 401
+    assert len(manager.processed_messages) == 0
+
+
+@pytest.mark.asyncio
+async def test_signature_in_query_parameter_is_accepted(webhook_client):
+    client, manager = webhook_client
+    body = encode(event_payload())
+
+    response = await client.post("/webhook/chatwork", content=body,
+                                 params={"chatwork_webhook_signature": compute_signature(TOKEN, body)})
+
+    assert response.json() == {"success": True, "processed": True}
+
+
+@pytest.mark.asyncio
+async def test_non_message_event_is_acknowledged(webhook_client):
+    client, manager = webhook_client
+
+    response = await post_event(client, event_payload("room_created"))
+
+    assert response.json() == {"success": True, "processed": False}
+    assert len(manager.processed_messages) == 0
+
+
+@pytest.mark.asyncio
+async def test_webhook_message_appears_in_latest_without_polling(webhook_client, chatwork_stub):
+    client, manager = webhook_client
+
+    await post_event(client, event_payload())
+    await post_event(client, event_payload(message_id="1002", body="了解です", send_time=1700000100))
+    latest = (await client.get("/api/latest-messages")).json()["messages"]
+
+    assert [item["message_id"] for item in latest] == ["1002", "1001"]
+    # 読み取りモデルから応答し、メッセージは取得し直さない
+    assert chatwork_stub.message_requests("101") == []
@@ -0,0 +1,236 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+import web.api_server as api_server
+from src.event_log import DashboardEventLog, NEW_MESSAGE
+
+
+class FakeWebSocket:
+    """送信したフレームを記録し、close_clientで切断を受信するクライアント"""
+
+    def __init__(self):
+        self.frames = []
+        self.closed = False
+        self._incoming: asyncio.Queue = asyncio.Queue()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame: str):
+        self.frames.append(json.loads(frame))
+
+    async def receive_text(self) -> str:
+        message = await self._incoming.get()
+        if message is None:
+            raise WebSocketDisconnect()
+        return message
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+
+    def close_client(self):
+        self._incoming.put_nowait(None)
+
+
+class FakeManager:
+    def __init__(self, events: DashboardEventLog):
+        self.events = events
+
+
+@pytest.fixture
+def events(monkeypatch):
+    log = DashboardEventLog(max_events=5)
+    manager = api_server.WebSocketManager()
+    manager.attach(log)
+    monkeypatch.setattr(api_server, "ai_manager", FakeManager(log))
+    monkeypatch.setattr(api_server, "websocket_manager", manager)
+
+    async def get_status():
+        return {"status": "running"}
+
+    async def get_alerts(limit, priority, cursor):
+        return {"pending_alerts": [], "summary": {"total": 0}, "next_cursor": None}
+
+    async def get_latest_messages(limit, refresh):
+        return {"messages": []}
+
+    monkeypatch.setattr(api_server, "get_status", get_status)
+    monkeypatch.setattr(api_server, "get_alerts", get_alerts)
+    monkeypatch.setattr(api_server, "get_latest_messages", get_latest_messages)
+    return log
+
+
+def publish(log: DashboardEventLog, count: int):
+    for _ in range(count):
+        log.publish(NEW_MESSAGE, {"room_id": "1", "message_id": str(log.seq + 1)})
+
+
+async def connect(websocket: FakeWebSocket, **query) -> asyncio.Task:
+    """接続して同期（スナップショットまたは再送）が終わるまで待つ"""
+    task = asyncio.create_task(api_server.websocket_endpoint(websocket, **query))
+    for _ in range(1000):
+        client = api_server.websocket_manager.clients.get(websocket)
+        if client is not None and client.is_live:
+            return task
+        await asyncio.sleep(0)
+    raise AssertionError("WebSocketの同期が終わらない")
+
+
+async def disconnect(websocket: FakeWebSocket, task: asyncio.Task):
+    await asyncio.sleep(0.01)  # 送信キューのフレームを送り切る
+    websocket.close_client()
+    await task
+
+
+def seqs(websocket: FakeWebSocket) -> list:
+    return [frame["seq"] for frame in websocket.frames if frame["type"] == NEW_MESSAGE]
+
+
+@pytest.mark.asyncio
+async def test_resume_replays_events_after_since(events):
+    publish(events, 3)
+    websocket = FakeWebSocket()
+
+    task = await connect(websocket, since=1, epoch=events.epoch)
+    publish(events, 1)
+    await disconnect(websocket, task)
+
+    assert websocket.frames[0]["type"] == "resume"
+    assert websocket.frames[0]["data"] == {"events": 2}
+    assert seqs(websocket) == [2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_resume_at_latest_seq_sends_nothing_to_replay(events):
+    publish(events, 2)
+    websocket = FakeWebSocket()
+
+    task = await connect(websocket, since=2, epoch=events.epoch)
+    await disconnect(websocket, task)
+
+    assert [frame["type"] for frame in websocket.frames] == ["resume"]
+
+
+@pytest.mark.asyncio
+async def test_overflowed_ring_falls_back_to_snapshot(events):
+    publish(events, 8)  # max_events=5のため、seq 1〜3はログから消えている
+    assert events.since(2, events.epoch) is None
+    assert [event["seq"] for event in events.since(3, events.epoch)] == [4, 5, 6, 7, 8]
+    websocket = FakeWebSocket()
+
+    task = await connect(websocket, since=2, epoch=events.epoch)
+    await disconnect(websocket, task)
+
+    assert websocket.frames[0]["type"] == "snapshot"
+    assert websocket.frames[0]["seq"] == 8
+    assert seqs(websocket) == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("since, epoch", [(1, "previous-run"), (1, None), (99, "current")])
+async def test_unknown_epoch_or_future_seq_falls_back_to_snapshot(events, since, epoch):
+    publish(events, 2)
+    epoch = events.epoch if epoch == "current" else epoch
+    websocket = FakeWebSocket()
+
+    task = await connect(websocket, since=since, epoch=epoch)
+    await disconnect(websocket, task)
+
+    snapshot = websocket.frames[0]
+    assert snapshot["type"] == "snapshot"
+    assert (snapshot["epoch"], snapshot["seq"]) == (events.epoch, 2)
+    assert snapshot["data"]["status"] == {"status": "running"}
+
+
+@pytest.mark.asyncio
+async def test_events_published_while_building_the_snapshot_are_delivered(events, monkeypatch):
+    publish(events, 2)
+
+    async def slow_status():
+        # 状態を集めている間にイベントが発行される
+        await asyncio.sleep(0)
+        publish(events, 2)
+        return {"status": "running"}
+
+    monkeypatch.setattr(api_server, "get_status", slow_status)
+    websocket = FakeWebSocket()
+
+    task = await connect(websocket)
+    await disconnect(websocket, task)
+
+    # スナップショットのseqは収集前の値で、収集中のイベントは続けて送られる
+    assert websocket.frames[0]["type"] == "snapshot"
+    assert websocket.frames[0]["seq"] == 2
+    assert seqs(websocket) == [3, 4]
+
+
+class StalledWebSocket(FakeWebSocket):
+    """stall後は送信が完了しないクライアント（閉じられると受信側も切断される）"""
+
+    def __init__(self):
+        super().__init__()
+        self._unblocked = asyncio.Event()
+        self._unblocked.set()
+
+    def stall(self):
+        self._unblocked.clear()
+
+    async def send_text(self, frame: str):
+        await self._unblocked.wait()
+        await super().send_text(frame)
+
+    async def close(self, code: int = 1000):
+        await super().close(code)
+        self.close_code = code
+        self.close_client()
+
+
+@pytest.mark.asyncio
+async def test_stalled_client_is_disconnected_without_holding_back_others(events):
+    api_server.websocket_manager.attach(events, queue_size=4)
+    healthy = FakeWebSocket()
+    stalled = StalledWebSocket()
+    healthy_task = await connect(healthy)
+    stalled_task = await connect(stalled)
+    stalled.stall()
+
+    # 送信タスクが1件を送信中のまま、キューの4件を超えたところで切断される
+    for _ in range(8):
+        publish(events, 1)
+        await asyncio.sleep(0)
+    await asyncio.wait_for(stalled_task, 1)
+
+    assert stalled.closed and stalled.close_code == 1013
+    assert stalled not in api_server.websocket_manager.clients
+    assert api_server.websocket_manager.slow_disconnects == 1
+
+    publish(events, 2)
+    await disconnect(healthy, healthy_task)
+    assert seqs(healthy) == list(range(1, 11))
+    assert api_server.websocket_manager.connection_count == 0
+
+
+@pytest.mark.asyncio
+async def test_drop_policy_keeps_the_stalled_client_and_counts_dropped_frames(events):
+    api_server.websocket_manager.attach(events, queue_size=2, slow_client_policy="drop")
+    healthy = FakeWebSocket()
+    stalled = StalledWebSocket()
+    healthy_task = await connect(healthy)
+    stalled_task = await connect(stalled)
+    stalled.stall()
+
+    for _ in range(6):
+        publish(events, 1)
+        await asyncio.sleep(0)
+
+    client = api_server.websocket_manager.clients[stalled]
+    assert client.dropped == 3  # 送信中の1件とキューの2件以外
+    assert not stalled.closed
+
+    await disconnect(healthy, healthy_task)
+    assert seqs(healthy) == list(range(1, 7))
+    stalled.close_client()
+    await stalled_task
@@ -1,11 +1,12 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, Query
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
 import json
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
 from pydantic import BaseModel
 import uvicorn
 
@@ -15,7 +16,12 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.main import ChatWorkAIManager
 from src.config import Config
-from src.chatwork_api import ChatWorkMessage
+from src.chatwork_api import ChatWorkMessage, deleted_log_key
+from src.read_model import message_view
+from src.alert_system import alert_to_view
+from src.event_log import PROTOCOL_VERSION
+from src.pagination import encode_cursor, decode_cursor
+from src.webhook import verify_signature, parse_webhook_event
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +31,9 @@ class MessageAnalysisRequest(BaseModel):
     account_name: str = "Test User"
     account_id: int = 0
 
+class BatchAnalysisRequest(BaseModel):
+    messages: List[MessageAnalysisRequest]
+
 class RoomCheckRequest(BaseModel):
     room_id: str
 
@@ -56,32 +65,170 @@ class ConfigUpdateRequest(BaseModel):
     normal_priority_threshold_hours: int = 2
 
 # WebSocketマネージャー
+class WebSocketClient:
+    """1接続分の送信キューと送信タスク
+    
+    このクライアントへの送信はすべてキューを経由し、送信タスクだけがソケットに書き込む。
+    同期中（スナップショットや再送分の送信前）に届いたイベントは保留し、go_liveで
+    キューに移す。
+    """
+    
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.pending: Optional[List[Tuple[Optional[int], str]]] = []  # 同期中に保留した (seq, フレーム)
+        self.writer = asyncio.create_task(self._write())
+        self.dropped = 0
+    
+    @property
+    def is_live(self) -> bool:
+        return self.pending is None
+    
+    def offer(self, frame: str) -> bool:
+        """フレームを送信キューに追加（キューが満杯の場合はFalse）"""
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            return False
+    
+    async def _write(self):
+        """キューのフレームを順番に送信"""
+        try:
+            while True:
+                frame = await self.queue.get()
+                await self.websocket.send_text(frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 切断は受信側のループで検出して後片付けする
+            logger.error(f"Error sending to WebSocket: {e}")
+
+
 class WebSocketManager:
+    """ダッシュボードへのイベント配信
+    
+    イベントは1回だけJSONに変換し、クライアントごとの上限付き送信キューに積む。
+    送信はクライアントごとの送信タスクが行うため、発行側も他のクライアントも
+    遅いクライアントを待たない。キューが満杯のクライアントには、ステータスのように
+    次の値で置き換わるイベントは送らずに捨てる。それ以外のイベントはslow_client_policyが
+    "disconnect"なら切断し、"drop"ならそのイベントを送らない。どちらの場合も
+    クライアントはseqの欠番から、前回のepochとseqを指定して再接続し続きを受け取る。
+    """
+    
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.clients: Dict[WebSocket, WebSocketClient] = {}
+        self.queue_size = 256
+        self.slow_client_policy = "disconnect"
+        self.dropped_frames = 0
+        self.slow_disconnects = 0
+        self._events = None
+        self._subscribed = False
     
-    async def connect(self, websocket: WebSocket):
+    def attach(self, events, queue_size: int = 256, slow_client_policy: str = "disconnect"):
+        """イベントログと送信キューの設定を登録"""
+        self._events = events
+        self.queue_size = max(1, queue_size)
+        self.slow_client_policy = slow_client_policy if slow_client_policy in ("disconnect", "drop") else "disconnect"
+    
+    async def connect(self, websocket: WebSocket) -> WebSocketClient:
         await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"WebSocket connected. Total connections: {len(self.active_connections)}")
+        client = WebSocketClient(websocket, self.queue_size)
+        self.clients[websocket] = client
+        if self._events is not None and not self._subscribed:
+            # 接続中のクライアントがいる間だけイベントを購読する
+            self._events.subscribe(self.publish)
+            self._subscribed = True
+        logger.info(f"WebSocket connected. Total connections: {self.connection_count}")
+        return client
+    
+    def send(self, websocket: WebSocket, message: dict) -> bool:
+        """1クライアントに送信（送信キューに積めない場合は切断してFalse）"""
+        client = self.clients.get(websocket)
+        if client is None:
+            return False
+        if client.offer(json.dumps(message)):
+            return True
+        self._disconnect_slow(client)
+        return False
+    
+    def go_live(self, websocket: WebSocket, after_seq: int):
+        """保留していたイベントのうちafter_seqより後のものを送信キューに移して配信対象に加える"""
+        client = self.clients.get(websocket)
+        if client is None or client.is_live:
+            return
+        pending, client.pending = client.pending, None
+        for seq, frame in pending:
+            if seq is not None and seq <= after_seq:
+                continue
+            if not client.offer(frame):
+                self._disconnect_slow(client)
+                return
     
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
+        client = self.clients.pop(websocket, None)
+        if client is not None:
+            client.writer.cancel()
+        if self._subscribed and self.connection_count == 0:
+            self._events.unsubscribe(self.publish)
+            self._subscribed = False
+        logger.info(f"WebSocket disconnected. Total connections: {self.connection_count}")
+    
+    @property
+    def connection_count(self) -> int:
+        return len(self.clients)
+    
+    def publish(self, event: dict):
+        """イベントログのイベントを配信（送信は待たない）"""
+        self._fan_out(json.dumps(event), event.get("seq"))
     
     async def broadcast(self, message: dict):
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(json.dumps(message))
-            except Exception as e:
-                logger.error(f"Error sending to WebSocket: {e}")
-                disconnected.append(connection)
-        
-        # 切断されたコネクションを削除
-        for conn in disconnected:
-            self.disconnect(conn)
+        """全クライアントにメッセージを配信"""
+        self._fan_out(json.dumps(message), message.get("seq"))
+    
+    def _fan_out(self, frame: str, seq: Optional[int]):
+        """JSON変換済みのフレームを各クライアントの送信キューに追加"""
+        for client in list(self.clients.values()):
+            if not client.is_live:
+                if len(client.pending) >= self.queue_size:
+                    self._disconnect_slow(client)
+                else:
+                    client.pending.append((seq, frame))
+                continue
+            
+            if client.offer(frame):
+                continue
+            if seq is None or self.slow_client_policy == "drop":
+                # 置き換わるイベントはそのまま捨て、dropの場合は欠番からクライアントが再同期する
+                client.dropped += 1
+                self.dropped_frames += 1
+            else:
+                self._disconnect_slow(client)
+    
+    def _disconnect_slow(self, client: WebSocketClient):
+        """送信が追いつかないクライアントを切断（再接続時に続きから再送される）"""
+        logger.warning(f"Disconnecting slow WebSocket client ({client.queue.qsize()} frames queued)")
+        self.slow_disconnects += 1
+        self.disconnect(client.websocket)
+        asyncio.create_task(self._close(client.websocket))
+    
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            await websocket.close(code=1013)  # Try Again Later
+        except Exception:
+            pass
+    
+    def get_status(self) -> Dict[str, Any]:
+        """接続数と送信キューの状態を取得"""
+        return {
+            "connections": self.connection_count,
+            "queue_size": self.queue_size,
+            "slow_client_policy": self.slow_client_policy,
+            "queued_frames": sum(client.queue.qsize() for client in self.clients.values()),
+            "dropped_frames": self.dropped_frames,
+            "slow_disconnects": self.slow_disconnects
+        }
 
 # FastAPIアプリケーション
 app = FastAPI(title="ChatWork AI Manager", version="1.0.0")
@@ -120,27 +267,12 @@ async def startup_event():
 async def start_ai_manager():
     """AIマネージャーをバックグラウンドで起動"""
     try:
-        # メッセージ処理時にWebSocketで通知するようにカスタマイズ
-        original_process_message = ai_manager.process_message
-        
-        async def enhanced_process_message(message):
-            result = await original_process_message(message)
-            
-            # WebSocketで通知
-            await websocket_manager.broadcast({
-                "type": "new_message",
-                "data": {
-                    "room_id": message.room_id,
-                    "message_id": message.message_id,
-                    "sender": message.account.name,
-                    "body": message.body[:100] + ("..." if len(message.body) > 100 else ""),
-                    "timestamp": message.send_time
-                }
-            })
-            
-            return result
-        
-        ai_manager.process_message = enhanced_process_message
+        # メッセージ処理・アラート・削除検出などのイベントをWebSocketで配信
+        websocket_manager.attach(
+            ai_manager.events,
+            queue_size=ai_manager.config.ws_client_queue_size,
+            slow_client_policy=ai_manager.config.ws_slow_client_policy
+        )
         await ai_manager.start()
         
     except Exception as e:
@@ -174,14 +306,9 @@ async def get_status():
         raise HTTPException(status_code=503, detail="AI Manager not initialized")
     
     try:
-        status = await ai_manager.get_status()
-        alert_summary = await ai_manager.alert_system.get_pending_alerts_summary()
-        
-        return {
-            "system": status,
-            "alerts": alert_summary,
-            "timestamp": status["last_check"]
-        }
+        status = await ai_manager.get_dashboard_status()
+        status["websocket"] = websocket_manager.get_status()
+        return status
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -209,78 +336,131 @@ async def get_room_categories():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/messages/{room_id}")
-async def get_messages(room_id: str, limit: int = 50):
-    """メッセージ取得"""
+def _decode_page_cursor(cursor: Optional[str], size: int, convert=tuple):
+    """ページングのカーソル（前のページのnext_cursor）を位置の値に戻す（不正な場合は400）"""
+    if cursor is None:
+        return None
+    try:
+        return convert(decode_cursor(cursor, size))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def _room_messages_page(room_id: str, limit: int, refresh: bool, cursor: Optional[str]) -> Dict[str, Any]:
+    """ルームのメッセージを読み取りモデルから取得（refreshの場合や未取得のルームはChatWorkから取得）
+    
+    最新limit件を古い順に返し、next_cursorを指定するとそれより前のlimit件を返す。
+    """
+    before = _decode_page_cursor(cursor, 2)
     if not ai_manager:
         raise HTTPException(status_code=503, detail="AI Manager not initialized")
     
     try:
-        messages = await ai_manager.chatwork_api.get_messages(room_id, force=1)
-        
-        # メッセージを辞書形式に変換
-        message_list = []
-        for msg in messages[-limit:]:  # 最新のメッセージを取得
-            message_list.append({
-                "message_id": msg.message_id,
-                "account": {
-                    "account_id": msg.account.account_id,
-                    "name": msg.account.name,
-                    "avatar_image_url": msg.account.avatar_image_url
-                },
-                "body": msg.body,
-                "send_time": msg.send_time,
-                "update_time": msg.update_time
-            })
-        
-        return {"messages": message_list}
+        chatwork_api = ai_manager.chatwork_api
+        # 監視対象外のルームはポーリングで更新されないため一定時間で取得し直す
+        max_age = None if room_id in ai_manager.config.monitored_rooms else ai_manager.config.read_model_ttl_seconds
+        if refresh or chatwork_api.read_model.is_stale(room_id, max_age):
+            await chatwork_api.get_messages(room_id, force=1)
+        
+        messages = chatwork_api.read_model.recent(room_id, limit + 1, before)
+        next_cursor = None
+        if len(messages) > limit:
+            messages = messages[1:]
+            next_cursor = encode_cursor(messages[0].send_time, messages[0].message_id)
+        return {"messages": [message_view(msg) for msg in messages], "next_cursor": next_cursor}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/messages/{room_id}")
+async def get_messages(room_id: str, limit: int = Query(50, ge=1, le=1000), refresh: bool = False,
+                       cursor: Optional[str] = None):
+    """メッセージ取得"""
+    return await _room_messages_page(room_id, limit, refresh, cursor)
+
 @app.get("/api/alerts")
-async def get_alerts():
-    """アラート一覧取得"""
+async def get_alerts(
+    limit: int = Query(100, ge=1, le=1000),
+    priority: Optional[str] = Query(None, pattern="^(high|normal|low)$"),
+    cursor: Optional[str] = None
+):
+    """アラート一覧取得（追加日時の古い順に最大limit件、cursorにnext_cursorを指定すると続き）"""
+    position = _decode_page_cursor(cursor, 2, lambda values: (datetime.fromisoformat(values[0]), values[1]))
     if not ai_manager:
         raise HTTPException(status_code=503, detail="AI Manager not initialized")
     
     try:
         summary = await ai_manager.alert_system.get_pending_alerts_summary()
-        
-        # 詳細なアラート情報も含める
-        pending_alerts = []
-        for alert_id, alert in ai_manager.alert_system.pending_alerts.items():
-            pending_alerts.append({
-                "alert_id": alert_id,
-                "room_id": alert.message.room_id,
-                "message_id": alert.message.message_id,
-                "sender": alert.message.account.name,
-                "body": alert.message.body[:200],
-                "priority": alert.analysis.priority,
-                "added_at": alert.added_at.isoformat(),
-                "alerts_sent": alert.alerts_sent,
-                "escalation_level": alert.escalation_level
-            })
+        alerts, total = ai_manager.alert_system.get_alerts_page(limit + 1, priority, position)
+        next_cursor = None
+        if len(alerts) > limit:
+            alerts = alerts[:limit]
+            alert_id, alert = alerts[-1]
+            next_cursor = encode_cursor(alert.added_at.isoformat(), alert_id)
         
         return {
             "summary": summary,
-            "pending_alerts": pending_alerts,
+            "pending_alerts": [alert_to_view(alert_id, alert) for alert_id, alert in alerts],
+            "total": total,
+            "limit": limit,
+            "next_cursor": next_cursor,
             "total_deleted_messages": sum(len(msgs) for msgs in ai_manager.chatwork_api.deleted_messages.values())
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/processed-messages")
-async def get_processed_messages(limit: int = 50):
-    """処理済みメッセージの詳細取得"""
+async def get_processed_messages(limit: int = Query(50, ge=1, le=1000), cursor: Optional[str] = None):
+    """処理済みメッセージの詳細取得（新しい順、cursorにnext_cursorを指定すると続き）"""
+    before = _decode_page_cursor(cursor, 1, lambda values: int(values[0]))
     if not ai_manager:
         raise HTTPException(status_code=503, detail="AI Manager not initialized")
     
     try:
-        messages = await ai_manager.get_processed_messages(limit)
-        return {"messages": messages, "total": len(messages)}
+        entries = ai_manager.page_processed_messages(limit + 1, before)
+        next_cursor = encode_cursor(entries[limit - 1][0]) if len(entries) > limit else None
+        messages = [detail for _, detail in entries[:limit]]
+        return {"messages": messages, "total": len(messages), "next_cursor": next_cursor}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _build_test_message(request: MessageAnalysisRequest, message_id: str = "test") -> ChatWorkMessage:
+    """分析用のメッセージオブジェクトを作成"""
+    from src.chatwork_api import ChatWorkAccount
+    
+    account = ChatWorkAccount(
+        account_id=request.account_id,
+        name=request.account_name
+    )
+    
+    return ChatWorkMessage(
+        message_id=message_id,
+        room_id="test",
+        account=account,
+        body=request.body,
+        send_time=int(asyncio.get_event_loop().time()),
+        update_time=int(asyncio.get_event_loop().time())
+    )
+
+def _analysis_response(analysis) -> Dict[str, Any]:
+    """分析結果をレスポンス形式に変換"""
+    return {
+        "requires_reply": analysis.requires_reply,
+        "priority": analysis.priority,
+        "tasks": [
+            {
+                "description": task.description,
+                "assignees": task.assignees,
+                "deadline": task.deadline,
+                "priority": task.priority
+            }
+            for task in analysis.tasks
+        ],
+        "questions": analysis.questions,
+        "mentions": analysis.mentions,
+        "sentiment": analysis.sentiment,
+        "summary": analysis.summary,
+        "confidence_score": analysis.confidence_score
+    }
+
 @app.post("/api/analyze")
 async def analyze_message(request: MessageAnalysisRequest):
     """メッセージ分析"""
@@ -289,45 +469,41 @@ async def analyze_message(request: MessageAnalysisRequest):
     
     try:
         # テスト用のメッセージオブジェクトを作成
-        from src.chatwork_api import ChatWorkMessage, ChatWorkAccount
-        
-        account = ChatWorkAccount(
-            account_id=request.account_id,
-            name=request.account_name
-        )
-        
-        message = ChatWorkMessage(
-            message_id="test",
-            room_id="test",
-            account=account,
-            body=request.body,
-            send_time=int(asyncio.get_event_loop().time()),
-            update_time=int(asyncio.get_event_loop().time())
-        )
+        message = _build_test_message(request)
         
         analysis = await ai_manager.task_analyzer.analyze(message)
         
-        return {
-            "requires_reply": analysis.requires_reply,
-            "priority": analysis.priority,
-            "tasks": [
-                {
-                    "description": task.description,
-                    "assignees": task.assignees,
-                    "deadline": task.deadline,
-                    "priority": task.priority
-                }
-                for task in analysis.tasks
-            ],
-            "questions": analysis.questions,
-            "mentions": analysis.mentions,
-            "sentiment": analysis.sentiment,
-            "summary": analysis.summary,
-            "confidence_score": analysis.confidence_score
-        }
+        return _analysis_response(analysis)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# バッチ分析で1回に分析してレスポンスに書き出す件数
+ANALYZE_BATCH_CHUNK_SIZE = 200
+
+@app.post("/api/analyze/batch")
+async def analyze_messages_batch(request: BatchAnalysisRequest):
+    """メッセージの一括分析（結果を1行1件のNDJSONで順次返す）"""
+    if not ai_manager:
+        raise HTTPException(status_code=503, detail="AI Manager not initialized")
+    
+    messages = [
+        _build_test_message(item, message_id=str(index))
+        for index, item in enumerate(request.messages)
+    ]
+    # バッチ全体で期限解釈の基準時刻を揃える
+    now = datetime.now()
+    
+    async def generate():
+        for start in range(0, len(messages), ANALYZE_BATCH_CHUNK_SIZE):
+            chunk = messages[start:start + ANALYZE_BATCH_CHUNK_SIZE]
+            analyses = await ai_manager.task_analyzer.analyze_many(chunk, now=now)
+            yield "".join(
+                json.dumps({"index": start + offset, **_analysis_response(analysis)}, ensure_ascii=False) + "\n"
+                for offset, analysis in enumerate(analyses)
+            )
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 @app.post("/api/rooms/{room_id}/check")
 async def check_room(room_id: str):
     """特定ルームの手動チェック"""
@@ -377,30 +553,30 @@ async def get_deleted_messages_by_room(room_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/deleted-messages")
-async def get_all_deleted_messages():
-    """全ルームの削除メッセージログを取得"""
+async def get_all_deleted_messages(limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None):
+    """全ルームの削除メッセージログを削除時刻の新しい順に最大limit件取得（cursorにnext_cursorを指定するとより古いもの）"""
+    before = _decode_page_cursor(cursor, 3)
     if not ai_manager:
         raise HTTPException(status_code=503, detail="AI Manager not initialized")
     
     try:
-        deleted_messages = await ai_manager.chatwork_api.get_deleted_messages()
+        entries = ai_manager.chatwork_api.page_deleted_messages(limit + 1, before)
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = encode_cursor(*deleted_log_key(entries[-1]))
         
         # ルーム名を取得して情報を充実させる
         rooms = await ai_manager.chatwork_api.get_rooms()
         room_names = {str(room["room_id"]): room["name"] for room in rooms}
         
-        # レスポンスを構築
         result = []
-        for room_id, messages in deleted_messages.items():
-            for msg in messages:
-                msg_info = msg.copy()
-                msg_info["room_name"] = room_names.get(room_id, f"Room {room_id}")
-                result.append(msg_info)
+        for msg in entries:
+            msg_info = msg.copy()
+            msg_info["room_name"] = room_names.get(str(msg["room_id"]), f"Room {msg['room_id']}")
+            result.append(msg_info)
         
-        # 削除時刻でソート（新しい順）
-        result.sort(key=lambda x: x.get("deleted_at", ""), reverse=True)
-        
-        return {"deleted_messages": result}
+        return {"deleted_messages": result, "next_cursor": next_cursor}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -585,32 +761,10 @@ async def update_room_members(room_id: str, request: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/rooms/{room_id}/messages")
-async def get_room_messages(room_id: str, limit: int = 50):
+async def get_room_messages(room_id: str, limit: int = Query(50, ge=1, le=1000), refresh: bool = False,
+                            cursor: Optional[str] = None):
     """ルームのメッセージ一覧を取得"""
-    if not ai_manager:
-        raise HTTPException(status_code=503, detail="AI Manager not initialized")
-    
-    try:
-        messages = await ai_manager.chatwork_api.get_messages(room_id, force=1)
-        
-        # メッセージを辞書形式に変換
-        message_list = []
-        for msg in messages[-limit:]:  # 最新のメッセージを取得
-            message_list.append({
-                "message_id": msg.message_id,
-                "account": {
-                    "account_id": msg.account.account_id,
-                    "name": msg.account.name,
-                    "avatar_image_url": msg.account.avatar_image_url
-                },
-                "body": msg.body,
-                "send_time": msg.send_time,
-                "update_time": msg.update_time
-            })
-        
-        return {"messages": message_list}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await _room_messages_page(room_id, limit, refresh, cursor)
 
 @app.post("/api/rooms/{room_id}/messages")
 async def send_message(room_id: str, request: dict):
@@ -629,68 +783,126 @@ async def send_message(room_id: str, request: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/latest-messages")
-async def get_latest_messages(limit: int = 50):
-    """全ルームから最新メッセージを取得"""
+async def get_latest_messages(limit: int = 50, refresh: bool = False):
+    """全ルームから最新メッセージを取得（監視ループが取得済みのメッセージから応答）"""
     if not ai_manager:
         raise HTTPException(status_code=503, detail="AI Manager not initialized")
     
     try:
-        # 監視中のルームから最新メッセージを取得
+        chatwork_api = ai_manager.chatwork_api
+        read_model = chatwork_api.read_model
         monitored_rooms = list(ai_manager.config.monitored_rooms)
-        all_messages = []
-        
-        # ルーム情報を取得してルーム名を含める
-        rooms = await ai_manager.chatwork_api.get_rooms()
-        room_names = {str(room["room_id"]): room["name"] for room in rooms}
         
-        for room_id in monitored_rooms:
-            try:
-                messages = await ai_manager.chatwork_api.get_messages(room_id, force=1)
-                
-                # 最新の数件のメッセージのみを取得
-                recent_messages = messages[-5:] if len(messages) > 5 else messages
-                
-                for msg in recent_messages:
-                    message_data = {
-                        "message_id": msg.message_id,
-                        "room_id": msg.room_id,
-                        "room_name": room_names.get(msg.room_id, f"Room {msg.room_id}"),
-                        "account": {
-                            "account_id": msg.account.account_id,
-                            "name": msg.account.name,
-                            "avatar_image_url": msg.account.avatar_image_url
-                        },
-                        "body": msg.body,
-                        "send_time": msg.send_time,
-                        "update_time": msg.update_time,
-                        "is_unread": True,  # 簡易的に全て未読として扱う
-                        "priority": "normal"  # 簡易的に通常優先度として扱う
-                    }
-                    all_messages.append(message_data)
-                    
-            except Exception as e:
-                logger.error(f"Error getting messages for room {room_id}: {e}")
-                continue
-        
-        # 送信時間でソート（新しい順）
-        all_messages.sort(key=lambda x: x["send_time"], reverse=True)
-        
-        # 制限数まで切り詰め
-        latest_messages = all_messages[:limit]
+        # refreshの場合と、まだ取得していないルームはChatWorkから並行して取得
+        rooms_to_fetch = [
+            room_id for room_id in monitored_rooms if refresh or read_model.is_stale(room_id)
+        ]
+        fetches = [chatwork_api.get_messages(room_id, force=1) for room_id in rooms_to_fetch]
+        if refresh or not read_model.room_names:
+            fetches.append(chatwork_api.get_rooms(use_cache=not refresh))
+        if fetches:
+            await asyncio.gather(*fetches)
+        
+        # 各ルームの最新5件までを新しい順に並べて制限数まで取得
+        latest_messages = [
+            read_model.latest_item(msg)
+            for msg in read_model.latest(limit, room_ids=monitored_rooms, per_room=5)
+        ]
         
         return {"messages": latest_messages}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# =====================
+# Webhook エンドポイント
+# =====================
+
+@app.post("/webhook/chatwork")
+async def chatwork_webhook(request: Request):
+    """ChatWork Webhookの受信"""
+    if not ai_manager:
+        raise HTTPException(status_code=503, detail="AI Manager not initialized")
+    
+    if not ai_manager.config.webhook_token:
+        raise HTTPException(status_code=404, detail="Webhook is not configured")
+    
+    body = await request.body()
+    signature = (request.headers.get("X-ChatWorkWebhookSignature")
+                 or request.query_params.get("chatwork_webhook_signature"))
+    
+    if not verify_signature(ai_manager.config.webhook_token, body, signature):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+    
+    try:
+        message = parse_webhook_event(json.loads(body))
+        if message is None:
+            return {"success": True, "processed": False}
+        
+        processed = await ai_manager.handle_webhook_message(message)
+        return {"success": True, "processed": processed}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # =====================
 # WebSocket エンドポイント
 # =====================
 
+# スナップショットに含めるアラート数（ダッシュボードの1ページ分）
+SNAPSHOT_ALERTS_LIMIT = 100
+
+async def _build_snapshot() -> Dict[str, Any]:
+    """ダッシュボードの全状態（ステータス・アラート・最新メッセージ）のスナップショット
+    
+    epochとseqは最初のawaitより前に読む。状態を集める間に発行されたイベントは
+    スナップショットに反映済みでもseqより後のイベントとして再度送られるが、
+    クライアントでの反映は同じイベントを2回受け取っても結果が変わらない。
+    """
+    events = ai_manager.events
+    epoch, seq = events.epoch, events.seq
+    # アラートは先頭ページと集計値のみ（続きはクライアントがnext_cursorで取得する）
+    return {
+        "type": "snapshot",
+        "protocol": PROTOCOL_VERSION,
+        "epoch": epoch,
+        "seq": seq,
+        "data": {
+            "status": await get_status(),
+            "alerts": await get_alerts(limit=SNAPSHOT_ALERTS_LIMIT, priority=None, cursor=None),
+            "latest_messages": (await get_latest_messages(limit=50, refresh=False))["messages"]
+        }
+    }
+
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket接続"""
+async def websocket_endpoint(websocket: WebSocket, since: Optional[int] = None, epoch: Optional[str] = None):
+    """WebSocket接続
+    
+    接続時にスナップショット（type=snapshot）を送信し、以降は差分イベントを送信する。
+    前回受け取ったepochとseqを ?epoch=...&since=... で指定すると、続きのイベントが
+    ログに残っている場合はスナップショットの代わりにそれ以降のイベントを再送する。
+    同期中は送信キューが空のため直接送信し、配信対象に加えた後はすべて送信キューを経由する。
+    """
     await websocket_manager.connect(websocket)
     try:
+        if ai_manager:
+            events = ai_manager.events
+            replay = events.since(since, epoch) if since is not None else None
+            if replay is None:
+                snapshot = await _build_snapshot()
+                seq = snapshot["seq"]
+                await websocket.send_text(json.dumps(snapshot))
+            else:
+                seq = replay[-1]["seq"] if replay else since
+                await websocket.send_text(json.dumps({
+                    "type": "resume",
+                    "protocol": PROTOCOL_VERSION,
+                    "epoch": events.epoch,
+                    "seq": since,
+                    "data": {"events": len(replay)}
+                }))
+                for event in replay:
+                    await websocket.send_text(json.dumps(event))
+            websocket_manager.go_live(websocket, seq)
+        
         while True:
             # クライアントからのメッセージを待機
             data = await websocket.receive_text()
@@ -698,10 +910,13 @@ async def websocket_endpoint(websocket: WebSocket):
             
             # ping/pong処理
             if message.get("type") == "ping":
-                await websocket.send_text(json.dumps({"type": "pong"}))
+                websocket_manager.send(websocket, {"type": "pong"})
             
     except WebSocketDisconnect:
         websocket_manager.disconnect(websocket)
+    except Exception as e:
+        logger.error(f"WebSocket error: {e}")
+        websocket_manager.disconnect(websocket)
 
 # =====================
 # 開発用サーバー起動